@@ -1,8 +1,12 @@
 import tkinter as tk
 from tkinter import font
-import json
-import os
-from categories import categories, get_category
+import store
+from background import BackgroundWorker
+from grocery_diff import format_patch
+from name_index import NameIndex
+from datetime import date, timedelta
+from store import saved_recipes, extras_list, checked_off, grocery
+from widgets import CellGrid, SearchList, VirtualList
 
 # --- Constants ------------------------------------------------------------------------
 WINDOW_WIDTH = 1100
@@ -17,6 +21,7 @@ BTN_COLOR = "#636B2F"
 BTN_HOVER = "#4a5022"
 TEXT_LIGHT = "#FFFFFF"
 TEXT_DARK = "#2C2C2C"
+TEXT_MUTED = "#9A9A9A"
 HEADER_BG = "#3D4127"
 
 # Fonts 
@@ -26,65 +31,8 @@ FONT_BODY = ("Helvetica", 11)
 FONT_SMALL = ("Helvetica", 9)
 FONT_BTN = ("Helvetica", 11, "bold")
 
-# Data
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_FILE = os.path.join(BASE_DIR, "data.json")
-
 # ---- Data --------------------------------------------------------------------------------
-saved_recipes = {}
-days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-# Categories and their associated keywords for ingredient classification
-
-meal_plan = {day: { "Breakfast": None, "Lunch": None, "Dinner": None} for day in days}
-# Initialize meal plan with days of the week and meal types set to None
-
-extras_list = []
-checked_off = []
-category_overrides = {}
-
-
-def load_data():
-    # Load data from JSON file if it exists, otherwise start with empty/default values
-    global saved_recipes, meal_plan, extras_list, checked_off, category_overrides
-    if os.path.exists(DATA_FILE):
-        # Try to load data and handle potential JSON decoding errors or other exceptions gracefully
-        try:
-            with open(DATA_FILE, "r") as f:
-                data = json.load(f)
-                saved_recipes = data.get("recipes", {})
-                meal_plan = data.get("meal_plan", meal_plan)
-                extras_list = data.get("extras", [])
-                checked_off = data.get("checked_off", [])
-                category_overrides = data.get("category_overrides", {})
-            print("Data loaded successfully!")
-        except json.JSONDecodeError:
-            print("Warning: Data file corrupted. Starting fresh.")
-        except Exception as e:
-            print(f"Warning: Could not load data ({e}). Starting fresh.")
-
-
-def save_data():
-    # Save current data to JSON file, ensuring that all relevant information is stored for future sessions
-    data = {
-        "recipes": saved_recipes,
-        "meal_plan": meal_plan,
-        "extras": extras_list,
-        "checked_off": checked_off,
-        "category_overrides": category_overrides
-    }
-    try:
-        with open(DATA_FILE, "w") as f:
-            json.dump(data, f, indent=4)
-        print("Data saved successfully!")
-    except Exception as e:
-        print(f"Error saving data: {e}")
-
-
-def get_ingredient_category(ingredient):
-    # First check if there is a user override for this ingredient's category, if so return that. Otherwise, use the get_category function to determine the category based on keywords.
-    if ingredient in category_overrides:
-        return category_overrides[ingredient]
-    return get_category(ingredient)
+# All data, loading/saving and changes live in store.py, shared with the CLI (main.py). The collections are updated in place by load_data.
 
 # ------ App --------------------------------------------------------------------------------
 class MealPlannerApp:
@@ -104,9 +52,24 @@ class MealPlannerApp:
         self.root.configure(bg=BG_MAIN)
         self.root.resizable(False, False)
 
-        load_data()
+        store.writer.use_scheduler(self.root.after, self.root.after_cancel)
+        self.worker = BackgroundWorker(self.root.after, on_busy=self._set_busy)
+        store.use_worker(self.worker)
+        # Loading and saving run on the worker thread; results come back to the main loop via root.after.
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+
+        self.recipe_names = NameIndex()
+        self.recipe_names_revision = None
+        self.grocery_revision = None
+        self.extras_revision = None
+        # The store.grocery_revision each list was last built for; showing a frame rebuilds it only if that moved on.
+        self.grocery_task = None
+        # (revision, task) of the grocery rows being built on the worker, if any.
+        self.current_frame = None
         self._build_layout()
         self.show_frame("home")
+        self._set_loading(True)
+        self.worker.submit(store.read_data, on_done=self._on_data_loaded, on_error=self._on_load_failed)
 
     def _build_layout(self):
         # Header
@@ -122,6 +85,16 @@ class MealPlannerApp:
             font=FONT_TITLE
         ).pack(side='left', padx=20, pady=10)
 
+        # Busy indicator, shown while the worker thread is loading or saving
+        self.busy_label = tk.Label(
+            self.header,
+            text="",
+            bg=HEADER_BG,
+            fg=TEXT_LIGHT,
+            font=FONT_BODY
+        )
+        self.busy_label.pack(side='right', padx=20)
+
         self.body = tk.Frame(self.root, bg=BG_CONTENT)
         self.body.pack(fill='both', expand=True)
 
@@ -163,13 +136,60 @@ class MealPlannerApp:
         self._build_home()
         self._build_planner()
         self._build_recipes()
+        self._build_grocery()
+        self._build_extras()
+
+    def _set_busy(self, busy):
+        self.busy_label.configure(text="⏳ Working..." if busy else "")
+        self.root.configure(cursor="watch" if busy else "")
+
+    def _set_loading(self, loading):
+        # Until the data is loaded only Home can be opened: an edit made before apply_data would be overwritten by it.
+        for frame_name, btn in self.nav_buttons.items():
+            if frame_name != "home":
+                btn.configure(state="disabled" if loading else "normal")
+
+    def _on_data_loaded(self, result):
+        # Runs on the main loop once the worker has read the data file.
+        store.apply_data(*result)
+        self._refresh_planner()
+        self.recipe_search.refresh()
+        self._refresh_frame(self.current_frame)
+        self._set_loading(False)
+
+    def _on_load_failed(self, e):
+        store.report_load_error(e)
+        self._set_loading(False)
+
+    def _on_close(self):
+        # Flush pending changes while Tk is still alive, then close the window.
+        print(store.close())
+        self.root.destroy()
+
+    def _recipe_name_index(self):
+        # One search index over the recipe names, shared by every recipe search box and rebuilt only when recipes are added, renamed or deleted.
+        if self.recipe_names_revision != store.recipe_names_revision:
+            self.recipe_names.set_names(saved_recipes.keys())
+            self.recipe_names_revision = store.recipe_names_revision
+        return self.recipe_names
 
     def show_frame(self, name):
+        if self.current_frame is not None and name != self.current_frame:
+            # Whatever the previous screen was still computing is no longer wanted.
+            self.worker.cancel(self.current_frame)
+        self.current_frame = name
         for frame_name, btn in self.nav_buttons.items():
             btn.configure(bg=BG_SIDEBAR)
         if name in self.nav_buttons:
             self.nav_buttons[name].configure(bg=BTN_COLOR)
+        self._refresh_frame(name)
         self.frames[name].lift()
+
+    def _refresh_frame(self, name):
+        if name == "grocery":
+            self._refresh_grocery()
+        elif name == "extras":
+            self._refresh_extras()
     
     def _build_home(self):
         frame = self.frames["home"]
@@ -186,73 +206,125 @@ class MealPlannerApp:
         stats_frame.pack()
 
         stats = [
-            ("📖", f"{len(saved_recipes)}", "Saved Recipes"),
-            ("📅", f"{sum(1 for d in meal_plan.values() for m in d.values() if m)}", "Meals Planned"),
-            ("🛒", f"{sum(len(saved_recipes.get(m, [])) for d in meal_plan.values() for m in d.values() if m and m in saved_recipes)}", "Ingredients"),
+            ("📖", "recipes", "Saved Recipes"),
+            ("📅", "meals", "Meals Planned"),
+            ("🛒", "ingredients", "Ingredients"),
+            ("🥕", "distinct", "Distinct Ingredients"),
+            ("✅", "checked", "Checked Off"),
         ]
 
-        for icon, count, label in stats:
-            card = tk.Frame(stats_frame, bg=BG_CARD, padx=30, pady=20)
-            card.pack(side='left', padx=15)
+        self.home_counts = {}
+        for icon, key, label in stats:
+            card = tk.Frame(stats_frame, bg=BG_CARD, padx=20, pady=20)
+            card.pack(side='left', padx=10)
             tk.Label(card, text=icon, font=("Helvetica", 28), bg=BG_CARD).pack()
-            tk.Label(card, text=count, font=FONT_TITLE, bg=BG_CARD, fg=BTN_COLOR).pack()
-            tk.Label(card, text=label, font=FONT_BODY, bg=BG_CARD, fg=TEXT_DARK).pack() 
+            self.home_counts[key] = tk.Label(card, text="0", font=FONT_TITLE, bg=BG_CARD, fg=BTN_COLOR)
+            self.home_counts[key].pack()
+            tk.Label(card, text=label, font=FONT_BODY, bg=BG_CARD, fg=TEXT_DARK).pack()
+
+        # The counters are maintained by store.stats from change events; each change relabels only the card it affects.
+        for key, value in store.stats.values.items():
+            self._show_stat(key, value)
+        store.stats.subscribe(self._show_stat)
+
+    def _show_stat(self, key, value):
+        self.home_counts[key].configure(text=f"{value}%" if key == "checked" else f"{value}")
 
     def _build_planner(self):
         frame = self.frames["planner"]
 
+        top_frame = tk.Frame(frame, bg=BG_CONTENT)
+        top_frame.pack(fill="x", padx=20, pady=(20, 10))
+
         tk.Label(
-            frame,
+            top_frame,
             text="Meal Planner",
             font=FONT_TITLE,
             bg=BG_CONTENT,
             fg=TEXT_DARK
-        ).grid(row=0, column=0, columnspan=4, pady=(20,10), padx=20, sticky='w')      
+        ).pack(side="left")
+
+        # Week navigation: the grid always shows one week of the current household
+        for text, weeks in [("Next ▶", 1), ("This Week", 0), ("◀ Prev", -1)]:
+            tk.Button(
+                top_frame,
+                text=text,
+                font=FONT_BTN,
+                bg=BTN_COLOR,
+                fg=TEXT_LIGHT,
+                padx=10,
+                cursor="hand2",
+                command=lambda weeks=weeks: self._show_week(weeks)
+            ).pack(side="right", padx=5)
 
-        for col, header in enumerate(["Day", "Breakfast", "Lunch", "Dinner"]):
+        self.week_label = tk.Label(top_frame, text="", font=FONT_SUBTITLE, bg=BG_CONTENT, fg=BTN_COLOR)
+        self.week_label.pack(side="right", padx=20)
+
+        self.planner_grid = None
+        self.planner_slots = None
+        self._build_planner_grid()
+        frame.configure(bg=BG_CONTENT)
+
+    def _build_planner_grid(self):
+        # One row per day of the shown week and one column per slot type. Rebuilt only when the slot types change;
+        # otherwise the cells stay and _refresh_planner only relabels the ones whose meal changed.
+        if self.planner_grid is not None:
+            self.planner_grid.destroy()
+        self.planner_grid = grid = tk.Frame(self.frames["planner"], bg=BG_CONTENT)
+        grid.pack(fill="both", expand=True, padx=10)
+        self.planner_slots = list(store.plan.slot_types)
+        self.planner_cells = CellGrid()
+
+        for col, header in enumerate(["Day"] + self.planner_slots):
             tk.Label(
-                frame,
+                grid,
                 text=header,
                 font=FONT_SUBTITLE,
                 bg=BG_CONTENT,
                 fg=BTN_COLOR
-            ).grid(row=1, column=col, padx=20, pady=(0,10), sticky='w')
+            ).grid(row=0, column=col, padx=10, pady=(0,10), sticky='w')
 
-        for row, day in enumerate(days,2):     
-            tk.Label(
-                frame,
-                text=day,
+        for row, day in enumerate(store.active_week()):
+            label = tk.Label(
+                grid,
+                text="",
                 font=FONT_BTN,
                 bg=BG_CONTENT,
                 fg=TEXT_DARK,
-                width=10,
+                width=16,
                 anchor='w'
-            ).grid(row=row, column=0, padx=20, pady=5, sticky='w')
+            )
+            label.grid(row=row + 1, column=0, padx=10, pady=5, sticky='w')
+            self.planner_cells.add(("day", row), label, "")
 
-            for col, meal_type in enumerate(["Breakfast", "Lunch", "Dinner"],1):
-                meal = meal_plan[day][meal_type] or "Not Set"
+            for col, meal_type in enumerate(self.planner_slots, 1):
                 btn = tk.Button(
-                    frame,
-                    text=meal,
+                    grid,
+                    text="",
                     font=FONT_BODY,
                     bg=BG_CARD,
                     fg=TEXT_DARK,
                     activebackground=BTN_HOVER,
                     activeforeground=TEXT_LIGHT,
-                    width=18,
+                    width=max(8, 54 // len(self.planner_slots)),
                     anchor='w',
                     padx=10,
                     bd=1,
                     cursor="hand2",
-                    command=lambda d=day, m=meal_type: self._edit_meal_popup(d, m)
+                    command=lambda r=row, m=meal_type: self._edit_meal_popup(store.active_week()[r], m)
                 )
-                btn.grid(row=row, column=col, padx=10, pady=5)
+                btn.grid(row=row + 1, column=col, padx=5, pady=5)
+                self.planner_cells.add((row, meal_type), btn, "")
+        self._refresh_planner()
 
-        frame.configure(bg=BG_CONTENT)
+    def _show_week(self, weeks):
+        # Move the grid (and the grocery list, which covers the shown week) by a number of weeks; 0 goes back to this week.
+        store.select_week(store.current_week + timedelta(weeks=weeks) if weeks else date.today())
+        self._refresh_planner()
 
     def _edit_meal_popup(self, day, meal_type):
         popup = tk.Toplevel(self.root)
-        popup.title(f"{day} - {meal_type.capitalize()}")
+        popup.title(f"{day.strftime('%A')} - {meal_type.capitalize()}")
         popup.geometry("400x500")
         popup.resizable(False, False)
         popup.configure(bg=BG_CONTENT)
@@ -260,7 +332,7 @@ class MealPlannerApp:
 
         tk.Label(
             popup,
-            text=f"Set {meal_type.capitalize()} for {day}",
+            text=f"Set {meal_type.capitalize()} for {day.strftime('%A %d %b')}",
             font=FONT_SUBTITLE,
             bg=BG_CONTENT,
             fg=TEXT_DARK
@@ -297,20 +369,9 @@ class MealPlannerApp:
         listbox.pack(side='left', fill='both', expand=True)
         scrollbar.config(command=listbox.yview) 
 
-        # Populate listbox with recipes
-        def populate_listbox(filter_text=""):
-            listbox.delete(0, tk.END)
-            for recipe in sorted(saved_recipes.keys()):
-                if filter_text.lower() in recipe.lower():
-                    listbox.insert(tk.END, recipe)
-
-        populate_listbox()
-
-        # Search filter
-        def on_search(*args):
-            populate_listbox(search_var.get())
-
-        search_var.trace_add("write",on_search)
+        # Listbox of recipes, filtered as you type
+        recipe_search = SearchList(search_var, listbox, self._recipe_name_index)
+        popup.bind("<Destroy>", lambda event: recipe_search.cancel() if event.widget is popup else None)
 
         # Custom Meal Entry
         tk.Label(
@@ -335,15 +396,13 @@ class MealPlannerApp:
                 meal_name = listbox.get(listbox.curselection())
             else:
                 return  # No selection or input, do nothing
-            meal_plan[day][meal_type] = meal_name
-            save_data()
-            self._refresh_planner()
+            store.set_meal(day, meal_type, meal_name)
+            self._refresh_planner([(day, meal_type)])
             popup.destroy()
 
         def clear_meal():
-            meal_plan[day][meal_type] = None
-            save_data()
-            self._refresh_planner()
+            store.set_meal(day, meal_type, None)
+            self._refresh_planner([(day, meal_type)])
             popup.destroy()
         
         tk.Button(
@@ -379,11 +438,18 @@ class MealPlannerApp:
             command=popup.destroy
         ).pack(side="left", padx=10)
 
-    def _refresh_planner(self):
-        # Refresh the meal planner view to reflect any changes made to the meal plan
-        for widget in self.frames["planner"].winfo_children():
-            widget.destroy()
-        self._build_planner()
+    def _refresh_planner(self, slots=None):
+        # Refresh the meal planner view to reflect changes to the given (date, meal type) slots, or to the whole shown week. Only labels whose text changed are touched.
+        if self.planner_slots != store.plan.slot_types:
+            self._build_planner_grid()
+            return
+        if slots is None:
+            week = store.active_week()
+            self.week_label.configure(text=f"{store.current_household}: {week[0].strftime('%d %b')} – {week[-1].strftime('%d %b %Y')}")
+            self.planner_cells.update({("day", row): day.strftime("%A %d %b") for row, day in enumerate(week)})
+            slots = [(day, meal_type) for day in week for meal_type in self.planner_slots]
+        self.planner_cells.update({(day.weekday(), meal_type): store.meal_at(day, meal_type) or "Not Set"
+                                   for day, meal_type in slots if store.in_active_week(store.current_household, day)})
 
 
     def _build_recipes(self):
@@ -448,19 +514,8 @@ class MealPlannerApp:
         recipe_listbox.pack(side='left', fill='both', expand=True)
         scrollbar.config(command=recipe_listbox.yview)
 
-        # Populate listbox with recipes
-        def populate_listbox(filter_text=""):
-            recipe_listbox.delete(0, tk.END)
-            for recipe in sorted(saved_recipes.keys()):
-                if filter_text.lower() in recipe.lower():
-                    recipe_listbox.insert(tk.END, recipe)
-
-        populate_listbox()
-
-        def on_search(*args):
-            populate_listbox(search_var.get())
-        
-        search_var.trace("w", on_search)
+        # Listbox of recipes, filtered as you type
+        self.recipe_search = SearchList(search_var, recipe_listbox, self._recipe_name_index)
 
         # Right side: Recipe details (to be implemented)
         right_frame = tk.Frame(frame, bg=BG_CARD, padx=20, pady=20)
@@ -478,6 +533,15 @@ class MealPlannerApp:
         ingredients_frame = tk.Frame(right_frame, bg=BG_CARD)
         ingredients_frame.pack(fill='both', expand=True, anchor="w")
 
+        # A fixed pool of ingredient rows, reused for every recipe shown
+        ingredients_list = VirtualList(
+            ingredients_frame,
+            rows=15,
+            make_label=lambda parent: tk.Label(parent, font=FONT_BODY, bg=BG_CARD, fg=TEXT_DARK, anchor="w"),
+            format=lambda ingredient: f"• {ingredient}",
+            pady=2
+        )
+
         # Action buttons (Edit, Delete) - functionality to be implemented
         action_btn_frame = tk.Frame(right_frame, bg=BG_CARD)
         action_btn_frame.pack(pady=(10,0), anchor="w")
@@ -509,32 +573,16 @@ class MealPlannerApp:
         delete_btn.pack(side="left")
 
         def show_ingredients(event):
-            # Clear previous details
-            for widget in ingredients_frame.winfo_children():
-                widget.destroy()
-
             # Get selected recipe
             if not recipe_listbox.curselection():
+                ingredients_list.set_items([])
                 return
             
             recipe_name = recipe_listbox.get(recipe_listbox.curselection())
             selected_label.config(text=recipe_name)
 
             # Display ingredients
-            ingredients = saved_recipes.get(recipe_name, [])
-            print(type(ingredients), ingredients)  # Debugging line to check the structure of ingredients
-            if isinstance(ingredients[0], list):
-                ingredients = ingredients[0]
-            for ingredient in ingredients:
-                tk.Label(
-                    ingredients_frame,
-                    text=f"• {ingredient}",
-                    font=FONT_BODY,
-                    bg=BG_CARD,
-                    fg=TEXT_DARK,
-                    anchor="w"
-                ).pack(pady=2, anchor="w")
-                
+            ingredients_list.set_items(saved_recipes.get(recipe_name, []))
 
             # Enable action buttons
             edit_btn.config(
@@ -549,7 +597,263 @@ class MealPlannerApp:
         frame.grid_columnconfigure(1, weight=1)
 
 
+    def _build_grocery(self):
+        frame = self.frames["grocery"]
+
+        top_frame = tk.Frame(frame, bg=BG_CONTENT)
+        top_frame.pack(fill="x", padx=20, pady=(20, 10))
+
+        tk.Label(
+            top_frame,
+            text="Grocery List",
+            font=FONT_TITLE,
+            bg=BG_CONTENT,
+            fg=TEXT_DARK
+        ).pack(side="left")
+
+        tk.Button(
+            top_frame,
+            text="Uncheck All",
+            font=FONT_BTN,
+            bg=BTN_COLOR,
+            fg=TEXT_LIGHT,
+            padx=15,
+            pady=5,
+            cursor="hand2",
+            command=self._uncheck_all
+        ).pack(side="right")
+
+        tk.Button(
+            top_frame,
+            text="Changes Since Export",
+            font=FONT_BTN,
+            bg=BTN_COLOR,
+            fg=TEXT_LIGHT,
+            padx=15,
+            pady=5,
+            cursor="hand2",
+            command=self._show_changes_popup
+        ).pack(side="right", padx=10)
+
+        self.grocery_summary = tk.Label(frame, text="", font=FONT_BODY, bg=BG_CONTENT, fg=TEXT_DARK)
+        self.grocery_summary.pack(anchor="w", padx=20)
+
+        list_frame = tk.Frame(frame, bg=BG_CARD, padx=20, pady=10)
+        list_frame.pack(fill="both", expand=True, padx=20, pady=10)
+
+        # Rows are ("header", category) or ("item", name, label). Clicking an item checks it off; only its own row is redrawn.
+        self.grocery_list = VirtualList(
+            list_frame,
+            rows=22,
+            make_label=lambda parent: tk.Label(parent, font=FONT_BODY, bg=BG_CARD, fg=TEXT_DARK, anchor="w", cursor="hand2"),
+            format=self._grocery_row_text,
+            style=self._grocery_row_style,
+            styles={
+                "header": {"font": FONT_SUBTITLE, "fg": BTN_COLOR},
+                "item": {"font": FONT_BODY, "fg": TEXT_DARK},
+                "checked": {"font": FONT_BODY, "fg": TEXT_MUTED},
+            },
+            on_click=self._toggle_grocery_row,
+            pady=1
+        )
+        self.grocery_rows_of = {}
+        # Item name -> indices of its rows (an extra can also be a planned ingredient).
+        self.grocery_checked = 0
+
+    def _refresh_grocery(self):
+        # Rebuild the rows from the grocery engine, but only if the plan, recipes, overrides or extras changed since the last
+        # build. Grouping and labelling the ingredients runs on the worker, tagged with the frame so leaving it drops the result.
+        revision = store.grocery_revision
+        if self.grocery_revision == revision:
+            return
+        if self.grocery_task is not None and self.grocery_task[0] == revision and not self.grocery_task[1].cancelled:
+            return
+        task = self.worker.submit(
+            build_grocery_rows, list(extras_list),
+            on_done=lambda result: self._show_grocery_rows(revision, *result),
+            on_error=lambda e: self._grocery_rows_failed(revision, e),
+            tag="grocery"
+        )
+        self.grocery_task = (revision, task)
+
+    def _show_grocery_rows(self, revision, rows, rows_of):
+        self.grocery_task = None
+        if revision != store.grocery_revision:
+            # The list changed while the rows were being built; build them again.
+            self._refresh_grocery()
+            return
+        self.grocery_rows_of = rows_of
+        self.grocery_checked = sum(len(indices) for name, indices in rows_of.items() if name in checked_off)
+        self.grocery_list.set_items(rows)
+        self.grocery_revision = revision
+        self._update_grocery_summary()
+
+    def _grocery_rows_failed(self, revision, e):
+        self.grocery_task = None
+        if revision != store.grocery_revision:
+            # The list was changed on the main thread while the worker was reading it.
+            self._refresh_grocery()
+        else:
+            print(f"Could not build the grocery list: {e}")
+
+    def _grocery_row_text(self, row):
+        if row[0] == "header":
+            return row[1]
+        return f"   {'☑' if row[1] in checked_off else '☐'}  {row[2]}"
+
+    def _grocery_row_style(self, row):
+        if row[0] == "header":
+            return "header"
+        return "checked" if row[1] in checked_off else "item"
+
+    def _toggle_grocery_row(self, index):
+        row = self.grocery_list.items[index]
+        if row[0] != "item":
+            return
+        indices = self.grocery_rows_of[row[1]]
+        self.grocery_checked += len(indices) if store.toggle_checked(row[1]) else -len(indices)
+        for i in indices:
+            self.grocery_list.refresh_item(i)
+        self._update_grocery_summary()
+
+    def _uncheck_all(self):
+        store.clear_checked()
+        self.grocery_checked = 0
+        self.grocery_list.refresh()
+        self._update_grocery_summary()
+
+    def _show_changes_popup(self):
+        # What was added, removed or changed since the list was last exported (store.grocery_changes), one line per item.
+        popup = tk.Toplevel(self.root)
+        popup.title("Changes Since Last Export")
+        popup.geometry("500x400")
+        popup.configure(bg=BG_CONTENT)
+
+        exported = store.grocery_changes.exported
+        changes = store.grocery_changes.changes() if exported is not None else []
+        if exported is None:
+            text = "The grocery list hasn't been exported yet."
+        elif changes is None:
+            text = (f"This week's list hasn't been exported. The last export was {exported['household']}'s list "
+                    f"for the week of {exported['week']}.")
+        elif not changes:
+            text = f"Nothing changed since the export of {exported['at']}."
+        else:
+            text = f"{len(changes)} changes since the export of {exported['at']}:"
+        tk.Label(popup, text=text, font=FONT_SUBTITLE, bg=BG_CONTENT, fg=TEXT_DARK, wraplength=460).pack(anchor="w", padx=20, pady=(20, 10))
+
+        if changes:
+            listbox = tk.Listbox(popup, font=FONT_BODY, height=15)
+            listbox.pack(fill="both", expand=True, padx=20, pady=(0, 20))
+            listbox.insert(tk.END, *format_patch(changes))
+
+    def _update_grocery_summary(self):
+        total = sum(len(indices) for indices in self.grocery_rows_of.values())
+        if not total:
+            text = "No ingredients yet. Plan some meals with saved recipes or add extras."
+        else:
+            text = f"{total} items, {self.grocery_checked} checked off. Click an item to check it off."
+        self.grocery_summary.configure(text=text)
+
+    def _build_extras(self):
+        frame = self.frames["extras"]
+
+        tk.Label(
+            frame,
+            text="Extras & Spices",
+            font=FONT_TITLE,
+            bg=BG_CONTENT,
+            fg=TEXT_DARK
+        ).pack(anchor="w", padx=20, pady=(20, 10))
+
+        add_frame = tk.Frame(frame, bg=BG_CONTENT)
+        add_frame.pack(fill="x", padx=20)
+
+        extra_var = tk.StringVar()
+        extra_entry = tk.Entry(add_frame, textvariable=extra_var, font=FONT_BODY, width=40)
+        extra_entry.pack(side="left", padx=(0, 10))
+
+        def add_extra(event=None):
+            item = extra_var.get().strip()
+            if not item:
+                return
+            store.add_extra(item)
+            self.extras_listbox.insert(tk.END, item)
+            self.extras_revision = store.grocery_revision
+            extra_var.set("")
 
+        extra_entry.bind("<Return>", add_extra)
+        tk.Button(
+            add_frame,
+            text="+ Add Extra",
+            font=FONT_BTN,
+            bg=BTN_COLOR,
+            fg=TEXT_LIGHT,
+            padx=15,
+            pady=5,
+            cursor="hand2",
+            command=add_extra
+        ).pack(side="left")
+
+        list_frame = tk.Frame(frame, bg=BG_CONTENT)
+        list_frame.pack(fill="both", expand=True, padx=20, pady=10)
+
+        scrollbar = tk.Scrollbar(list_frame)
+        scrollbar.pack(side="right", fill="y")
+
+        self.extras_listbox = tk.Listbox(
+            list_frame,
+            font=FONT_BODY,
+            selectbackground=BTN_COLOR,
+            selectforeground=TEXT_LIGHT,
+            yscrollcommand=scrollbar.set,
+            height=20
+        )
+        self.extras_listbox.pack(side="left", fill="both", expand=True)
+        scrollbar.config(command=self.extras_listbox.yview)
+
+        def remove_extra():
+            selection = self.extras_listbox.curselection()
+            if not selection:
+                return
+            store.remove_extra(selection[0])
+            self.extras_listbox.delete(selection[0])
+            self.extras_revision = store.grocery_revision
+
+        tk.Button(
+            frame,
+            text="Remove Selected",
+            font=FONT_BTN,
+            bg="#8B0000",
+            fg=TEXT_LIGHT,
+            padx=15,
+            pady=5,
+            cursor="hand2",
+            command=remove_extra
+        ).pack(anchor="w", padx=20, pady=(0, 20))
+
+    def _refresh_extras(self):
+        # Adding and removing here edits the Listbox in place; it is only reloaded if the extras may have changed elsewhere.
+        if self.extras_revision == store.grocery_revision:
+            return
+        self.extras_listbox.delete(0, tk.END)
+        self.extras_listbox.insert(tk.END, *extras_list)
+        self.extras_revision = store.grocery_revision
+
+
+def build_grocery_rows(extras):
+    # Runs on the worker. Rows are ("header", category) or ("item", name, label); also returns item name -> row indices.
+    rows = []
+    rows_of = {}
+    sections = [(category, [(ingredient, grocery.label(ingredient)) for ingredient in ingredients]) for category, ingredients in grocery.categorized()]
+    if extras:
+        sections.append(("Extras/Spices", [(item, item) for item in extras]))
+    for category, items in sections:
+        rows.append(("header", category))
+        for name, label in items:
+            rows_of.setdefault(name, []).append(len(rows))
+            rows.append(("item", name, label))
+    return rows, rows_of
 
 
     # ----- Run --------------------------------------------------------------------------------
@@ -0,0 +1,105 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+# Background work for the GUI. Slow calls (disk I/O, loading, big aggregations) run on a worker thread; their results
+# come back through a thread-safe queue that the Tk main loop polls with root.after, so callbacks always run on the
+# main thread and the event loop never blocks. Tasks can carry a tag (e.g. the frame that asked for them); cancelling
+# a tag drops results that arrive after the user has moved on.
+
+
+class Task:
+    __slots__ = ("tag", "on_done", "on_error", "cancelled", "future")
+
+    def __init__(self, tag, on_done, on_error):
+        self.tag = tag
+        self.on_done = on_done
+        self.on_error = on_error
+        self.cancelled = False
+        self.future = None
+
+    def cancel(self):
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+
+
+class BackgroundWorker:
+
+    def __init__(self, schedule, poll_ms=50, on_busy=None):
+        # schedule(ms, callback) is root.after; on_busy(busy) is called on the main thread when work starts or finishes.
+        self.schedule = schedule
+        self.poll_ms = poll_ms
+        self.on_busy = on_busy
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="planner-worker")
+        # One thread, so tasks run in the order they were submitted (saves must hit the disk in order).
+        self.results = queue.Queue()
+        self.tasks = []
+        self.polling = False
+
+    def submit(self, function, *args, on_done=None, on_error=None, tag=None):
+        # Run function(*args) on the worker; on_done(result) or on_error(exception) then runs on the main thread.
+        task = Task(tag, on_done, on_error)
+        self.tasks.append(task)
+        task.future = self.executor.submit(self._run, task, function, args)
+        if len(self.tasks) == 1 and self.on_busy is not None:
+            self.on_busy(True)
+        if not self.polling:
+            self.polling = True
+            self.schedule(self.poll_ms, self._poll)
+        return task
+
+    def _run(self, task, function, args):
+        if task.cancelled:
+            self.results.put((task, None, None))
+            return
+        try:
+            self.results.put((task, function(*args), None))
+        except Exception as e:
+            self.results.put((task, None, e))
+
+    def cancel(self, tag):
+        # Drop the results of every unfinished task with this tag; ones that haven't started yet never run.
+        for task in self.tasks:
+            if task.tag == tag:
+                task.cancel()
+
+    def _poll(self):
+        while True:
+            try:
+                task, result, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self._finish(task, result, error)
+        # A task cancelled before it started never reaches the queue.
+        for task in [task for task in self.tasks if task.future.cancelled()]:
+            self._finish(task, None, None)
+        if self.tasks:
+            self.schedule(self.poll_ms, self._poll)
+        else:
+            self.polling = False
+
+    def _finish(self, task, result, error):
+        if task not in self.tasks:
+            return
+        self.tasks.remove(task)
+        if not task.cancelled:
+            if error is not None:
+                if task.on_error is not None:
+                    task.on_error(error)
+                else:
+                    print(f"Background task failed: {error}")
+            elif task.on_done is not None:
+                task.on_done(result)
+        if not self.tasks and self.on_busy is not None:
+            self.on_busy(False)
+
+    @property
+    def busy(self):
+        return bool(self.tasks)
+
+    def shutdown(self):
+        # Wait for queued work (pending saves) to finish, then deliver what is left without the event loop.
+        self.executor.shutdown(wait=True)
+        while not self.results.empty():
+            self._finish(*self.results.get_nowait())
+        self.schedule = lambda ms, callback: None
@@ -0,0 +1,258 @@
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from categories import CategoryCache, categories, classify_many, get_category
+from normalize import clear_caches
+from ingredients import Recipe, ingredient_table
+from name_index import NameIndex
+from recipe_import import parse_file
+from recipe_index import RecipeIndex
+from snapshot import LazyRecipes, build_snapshot, index_path, read_snapshot
+# Benchmarks for the hot paths of the planner. Run with: python benchmark.py [catalog sizes...]
+
+
+def legacy_get_category(ingredient):
+    # The original nested keyword scan, kept here as the baseline the compiled matcher is measured against.
+    ingredient_lower = ingredient.lower()
+    for category, keywords in categories.items():
+        for keyword in keywords:
+            if keyword in ingredient_lower:
+                return category
+    return "Other"
+
+
+def make_catalog(size, seed=42):
+    # Build a catalog of ingredient strings that looks like supplier data: keywords with brand words, quantities and some unknown items mixed in.
+    rng = random.Random(seed)
+    keywords = [keyword for words in categories.values() for keyword in words]
+    fillers = ["organic", "fresh", "large", "store brand", "family pack", "low sodium", "premium", "1 lb", "12 oz", "2 cans"]
+    unknown = ["creatine", "paper towels", "dish soap", "batteries", "foil", "zip bags", "sponges", "napkins"]
+    catalog = []
+    for _ in range(size):
+        if rng.random() < 0.2:
+            item = rng.choice(unknown)
+        else:
+            item = rng.choice(keywords)
+        words = [rng.choice(fillers), item.title()] if rng.random() < 0.6 else [item.title()]
+        catalog.append(" ".join(words))
+    return catalog
+
+
+def time_classifier(classify, catalog):
+    start = time.perf_counter()
+    results = [classify(item) for item in catalog]
+    return time.perf_counter() - start, results
+
+
+def bench_get_category(sizes):
+    print("=== get_category: compiled matcher vs legacy keyword scan ===")
+    for size in sizes:
+        catalog = make_catalog(size)
+        legacy_time, legacy_results = time_classifier(legacy_get_category, catalog)
+        compiled_time, compiled_results = time_classifier(get_category, catalog)
+        if legacy_results != compiled_results:
+            print(f"  {size:>9,} items: MISMATCH between legacy and compiled results!")
+            continue
+        print(f"  {size:>9,} items: legacy {legacy_time:7.3f}s  compiled {compiled_time:7.3f}s  speedup {legacy_time / compiled_time:5.1f}x")
+
+
+def bench_classify_many(sizes):
+    # Supplier catalogs repeat the same strings a lot, so batch classification only has to do the distinct ones.
+    print("=== classify_many: batch vs one-at-a-time get_category ===")
+    for size in sizes:
+        catalog = make_catalog(size)
+        single_time, single_results = time_classifier(get_category, catalog)
+        start = time.perf_counter()
+        batch_results = classify_many(catalog)
+        batch_time = time.perf_counter() - start
+        if single_results != batch_results:
+            print(f"  {size:>9,} items: MISMATCH between single and batch results!")
+            continue
+        print(f"  {size:>9,} items: single {single_time:7.3f}s  batch {batch_time:7.3f}s  speedup {single_time / batch_time:5.1f}x")
+
+
+def bench_category_cache(sizes):
+    # Re-rendering the same lists over and over: every lookup classified again vs through the LRU cache, with its counters.
+    print("=== category lookups: uncached vs CategoryCache, 10 renders ===")
+    for size in sizes:
+        catalog = make_catalog(size)
+        start = time.perf_counter()
+        for _ in range(10):
+            for item in catalog:
+                get_category(item)
+        uncached = time.perf_counter() - start
+        cache = CategoryCache()
+        start = time.perf_counter()
+        for _ in range(10):
+            for item in catalog:
+                cache.get(item, {})
+        cached = time.perf_counter() - start
+        info = cache.info()
+        print(f"  {size:>9,} items: uncached {uncached:7.3f}s  cached {cached:7.3f}s  ({uncached / cached:5.1f}x)  "
+              f"hits {info['hits']:,}  misses {info['misses']:,}  hit rate {info['hits'] / (info['hits'] + info['misses']):.1%}  "
+              f"size {info['size']:,}/{info['maxsize']:,}")
+
+
+def make_library(size, seed=42):
+    # A recipe library of the given size, each recipe with 4-12 ingredients drawn from a generated catalog.
+    rng = random.Random(seed)
+    catalog = make_catalog(5_000, seed)
+    return {f"Recipe {i}": rng.sample(catalog, rng.randint(4, 12)) for i in range(size)}
+
+
+def measure(load):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def bench_lazy_load(sizes):
+    # Startup cost of a snapshot: json.load of the whole file vs the indexed loader that leaves recipes unparsed.
+    print("=== snapshot load: full json.load vs indexed lazy load ===")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            data_file = os.path.join(directory, "data.json")
+            content, index = build_snapshot({"recipes": make_library(size), "plans": {}, "category_overrides": {}})
+            with open(data_file, "wb") as f:
+                f.write(content)
+            with open(index_path(data_file), "w", encoding="utf-8") as f:
+                json.dump(index, f)
+
+            def full_load():
+                with open(data_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+
+            full_time, full_peak, _ = measure(full_load)
+            lazy_time, lazy_peak, data = measure(lambda: read_snapshot(data_file))
+            data["recipes"].clear()
+        print(f"  {size:>9,} recipes: full {full_time:6.3f}s {full_peak / 2**20:7.1f} MiB  lazy {lazy_time:6.3f}s {lazy_peak / 2**20:7.1f} MiB")
+
+
+def retained(load):
+    # Bytes still allocated once load() has returned, i.e. what the result keeps alive.
+    tracemalloc.start()
+    result = load()
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return current, result
+
+
+def bench_recipe_memory(sizes):
+    # Memory kept by a loaded recipe library: json.load lists of str vs interned Recipe objects.
+    print("=== recipe library memory: lists of str vs interned Recipe ===")
+    for size in sizes:
+        text = json.dumps(make_library(size))
+        list_bytes, lists = retained(lambda: json.loads(text))
+        recipe_bytes, recipes = retained(lambda: {name: Recipe(name, ingredients) for name, ingredients in json.loads(text).items()})
+        print(f"  {size:>9,} recipes: lists {list_bytes / 2**20:7.1f} MiB  Recipe {recipe_bytes / 2**20:7.1f} MiB  ({len(ingredient_table):,} distinct ingredients)")
+        del lists, recipes
+
+
+def misspell(word, rng):
+    # Drop, double or swap one letter, the typos seen in real recipe data ("Bannana", "Zuchinni").
+    i = rng.randrange(len(word) - 1)
+    return rng.choice([word[:i] + word[i + 1:], word[:i] + word[i] + word[i:], word[:i] + word[i + 1] + word[i] + word[i + 2:]])
+
+
+def bench_near_category(sizes):
+    # Classifying misspelled keywords, i.e. the near-miss fallback of get_category (see fuzzy.py).
+    print("=== get_category on misspelled keywords (near-miss fallback) ===")
+    rng = random.Random(7)
+    keywords = [keyword for keywords in categories.values() for keyword in keywords if len(keyword) >= 8]
+    for size in sizes:
+        names = [misspell(rng.choice(keywords), rng) for _ in range(size)]
+        elapsed, results = time_classifier(get_category, names)
+        guessed = sum(1 for category in results if category != "Other")
+        print(f"  {size:>9,} names: {elapsed:8.3f}s  ({elapsed / size * 1e6:6.1f} us per name, {guessed / size:6.1%} classified)")
+
+
+def bench_recipe_index(sizes):
+    # Reverse lookups: building the ingredient -> recipes index once, then AND/OR queries and pantry ranking on it.
+    print("=== recipe index: build, AND/OR search, pantry match ===")
+    rng = random.Random(3)
+    for size in sizes:
+        recipes = LazyRecipes(make_library(size))
+        index = RecipeIndex()
+        start = time.perf_counter()
+        index.build(recipes)
+        build = time.perf_counter() - start
+        ingredients = sorted({ingredient for name in rng.sample(list(recipes), min(size, 500)) for ingredient in recipes[name]})
+        start = time.perf_counter()
+        for _ in range(100):
+            a, b, c = rng.sample(ingredients, 3)
+            index.search(f"{a} and {b} or {c}")
+        search = (time.perf_counter() - start) / 100
+        start = time.perf_counter()
+        index.pantry_match(rng.sample(ingredients, min(len(ingredients), 100)))
+        pantry = time.perf_counter() - start
+        print(f"  {size:>9,} recipes: build {build:6.3f}s  search {search * 1e3:7.3f} ms  pantry match {pantry * 1e3:7.1f} ms")
+
+
+def bench_name_search(sizes):
+    # Typing a query one key at a time into a recipe search box: sort + substring scan per keystroke (the old
+    # populate_listbox) vs the trigram NameIndex narrowing its previous result.
+    print("=== recipe name search, per keystroke ===")
+    rng = random.Random(5)
+    words = make_catalog(2_000, 5)
+    for size in sizes:
+        names = [f"{rng.choice(words)} with {rng.choice(words)} #{i}" for i in range(size)]
+        query = rng.choice(names).split(" with ")[0].lower()
+        keystrokes = [query[:i] for i in range(1, len(query) + 1)]
+        start = time.perf_counter()
+        for text in keystrokes:
+            [name for name in sorted(names) if text in name.lower()]
+        legacy = (time.perf_counter() - start) / len(keystrokes)
+        index = NameIndex(names)
+        start = time.perf_counter()
+        for text in keystrokes:
+            index.search(text)
+        indexed = (time.perf_counter() - start) / len(keystrokes)
+        print(f"  {size:>9,} names: legacy {legacy * 1e3:8.2f} ms  indexed {indexed * 1e3:8.2f} ms  ({legacy / indexed:5.1f}x)")
+
+
+def bench_recipe_import(sizes):
+    # Parsing and normalizing a recipe dump (the bulk of a recipe import) in this process vs in the process pool, in recipes/s.
+    print("=== recipe import parsing ===")
+    rng = random.Random(9)
+    words = make_catalog(3_000, 9)
+    quantities = ["1 cup", "2", "200 g", "1/2 tsp", "3 tbsp", ""]
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = os.path.join(directory, f"recipes_{size}.csv")
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                rows = csv.writer(f)
+                rows.writerow(["name", "ingredients"])
+                for i in range(size):
+                    rows.writerow([f"Recipe {i}", ", ".join(f"{rng.choice(quantities)} {rng.choice(words)}".strip() for _ in range(rng.randint(3, 12)))])
+            rates = []
+            for workers in (1, None):
+                clear_caches()
+                start = time.perf_counter()
+                with open(path, "r", encoding="utf-8", newline="") as f:
+                    for _ in parse_file(f, "csv", workers=workers):
+                        pass
+                rates.append(size / (time.perf_counter() - start))
+            print(f"  {size:>9,} recipes: one process {rates[0]:>9,.0f}/s  pool ({os.cpu_count()} CPUs) {rates[1]:>9,.0f}/s")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    bench_get_category(sizes)
+    bench_classify_many(sizes)
+    bench_category_cache(sizes)
+    # Recipe libraries are an order of magnitude smaller than ingredient catalogs.
+    bench_lazy_load([size // 10 for size in sizes])
+    bench_recipe_memory([size // 10 for size in sizes])
+    bench_near_category([size // 10 for size in sizes])
+    bench_recipe_index([size // 10 for size in sizes])
+    bench_name_search([size // 10 for size in sizes])
+    bench_recipe_import([size // 10 for size in sizes])
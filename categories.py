@@ -1,3 +1,9 @@
+import os
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from fuzzy import NGramIndex, tolerance
+
 categories = {
     "Meat & Protein": [
         "beef", "ground beef", "steak", "chicken", "chicken breast", "chicken thigh",
@@ -108,10 +114,156 @@ categories = {
     ]
 }
 
-def get_category(ingredient):
-    ingredient_lower = ingredient.lower()
-    for category, keywords in categories.items():
+category_names = list(categories.keys())
+_NO_MATCH = len(category_names)
+
+
+def _build_matcher(categories):
+    # Build an Aho-Corasick automaton over every keyword so one pass over the ingredient finds all keyword hits.
+    # Each node remembers the lowest category rank ending there, which keeps the old first-match-in-dict-order rule.
+    goto = [{}]
+    best = [_NO_MATCH]
+    for rank, keywords in enumerate(categories.values()):
         for keyword in keywords:
-            if keyword in ingredient_lower:
-                return category
-    return "Other"
\ No newline at end of file
+            node = 0
+            for ch in keyword:
+                if ch not in goto[node]:
+                    goto[node][ch] = len(goto)
+                    goto.append({})
+                    best.append(_NO_MATCH)
+                node = goto[node][ch]
+            best[node] = min(best[node], rank)
+
+    # Breadth-first pass to fill in failure links, flattening them into a full transition table so the scan never follows failure chains.
+    fail = [0] * len(goto)
+    delta = [None] * len(goto)
+    delta[0] = dict(goto[0])
+    queue = deque([0])
+    while queue:
+        node = queue.popleft()
+        for ch, child in goto[node].items():
+            if node:
+                fail[child] = delta[fail[node]].get(ch, 0)
+                best[child] = min(best[child], best[fail[child]])
+                delta[child] = {**delta[fail[child]], **goto[child]}
+            else:
+                delta[child] = {**delta[0], **goto[child]}
+            queue.append(child)
+    return delta, best
+
+
+_delta, _best = _build_matcher(categories)
+
+_rank = {}
+for rank, keywords in reversed(list(enumerate(categories.values()))):
+    _rank.update(dict.fromkeys(keywords, rank))
+_keyword_index = NGramIndex(_rank)
+# Every keyword with the first category listing it, for the near-miss fallback in get_category.
+
+
+@lru_cache(maxsize=50_000)
+def _near_category(ingredient):
+    # The category of the keyword(s) closest to a misspelled ingredient ("zuchinni" -> "zucchini"), or _NO_MATCH if there
+    # is none within tolerance or the closest ones disagree. Cached, since every unknown name ("paper towels") ends up here.
+    matches = _keyword_index.search(ingredient, tolerance(ingredient))
+    ranks = {_rank[keyword] for distance, keyword in matches if distance == matches[0][0]}
+    return ranks.pop() if len(ranks) == 1 else _NO_MATCH
+
+
+def get_category(ingredient):
+    # Walk the automaton once over the lowercased ingredient and keep the earliest category any keyword hit belongs to.
+    # Names no keyword occurs in get the category of the nearest keyword, if it is close enough (see fuzzy.py).
+    node = 0
+    found = _NO_MATCH
+    for ch in ingredient.lower():
+        node = _delta[node].get(ch, 0)
+        if _best[node] < found:
+            found = _best[node]
+            if found == 0:
+                break
+    if found == _NO_MATCH:
+        found = _near_category(ingredient.lower())
+    if found == _NO_MATCH:
+        return "Other"
+    return category_names[found]
+
+
+# Catalogs with at least this many distinct ingredients are classified in a process pool; below it the pool start-up costs more than it saves.
+PARALLEL_THRESHOLD = 200_000
+
+
+def _classify_chunk(chunk):
+    return [get_category(ingredient) for ingredient in chunk]
+
+
+def classify_many(ingredients, workers=None, threshold=PARALLEL_THRESHOLD):
+    # Classify a whole list or column of ingredients in one call. Each distinct string is classified once and the result is returned in input order.
+    ingredients = list(ingredients)
+    distinct = list(dict.fromkeys(ingredients))
+    if workers != 1 and len(distinct) >= threshold:
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(distinct) // (workers * 4))
+        chunks = [distinct[i:i + chunksize] for i in range(0, len(distinct), chunksize)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = [category for chunk in pool.map(_classify_chunk, chunks) for category in chunk]
+    else:
+        results = _classify_chunk(distinct)
+    resolved = dict(zip(distinct, results))
+    return [resolved[ingredient] for ingredient in ingredients]
+
+
+class CategoryCache:
+    # Bounded LRU cache of resolved categories (user override first, then keyword match) so repeat renders cost a single dict lookup.
+    def __init__(self, maxsize=50_000):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, ingredient, overrides):
+        category = self.entries.get(ingredient)
+        if category is not None:
+            self.hits += 1
+            self.entries.move_to_end(ingredient)
+            return category
+        self.misses += 1
+        if ingredient in overrides:
+            category = overrides[ingredient]
+        else:
+            category = get_category(ingredient)
+        self.entries[ingredient] = category
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return category
+
+    def get_many(self, ingredients, overrides):
+        # Resolve a batch of ingredients, classifying all cache misses together with classify_many.
+        ingredients = list(ingredients)
+        missing = [ingredient for ingredient in dict.fromkeys(ingredients) if ingredient not in self.entries]
+        unresolved = [ingredient for ingredient in missing if ingredient not in overrides]
+        resolved = dict(zip(unresolved, classify_many(unresolved)))
+        for ingredient in missing:
+            self.misses += 1
+            self.entries[ingredient] = overrides[ingredient] if ingredient in overrides else resolved[ingredient]
+        self.hits += len(ingredients) - len(missing)
+        results = []
+        for ingredient in ingredients:
+            self.entries.move_to_end(ingredient)
+            results.append(self.entries[ingredient])
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return results
+
+    def invalidate(self, ingredient):
+        # Drop a single entry, e.g. after its category override changed.
+        self.entries.pop(ingredient, None)
+
+    def clear(self):
+        # Drop everything, e.g. after the overrides were reloaded from disk.
+        self.entries.clear()
+
+    def info(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries), "maxsize": self.maxsize}
+
+
+category_cache = CategoryCache()
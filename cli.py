@@ -0,0 +1,196 @@
+import argparse
+import contextlib
+import csv
+import os
+import sys
+import store
+from categories import categories
+from export import WRITERS, export_batch, export_rows, grocery_rows, writer_for
+from plan import parse_date
+from recipe_import import file_format, import_recipes
+# Headless commands for cron jobs and pipelines: the same changes as the menus in main.py, without prompts. Bulk input
+# is read from a file or stdin ("-"), every line goes through store.py like a menu action would, and the whole run is
+# written once at the end (store.commit), so thousands of operations cost one journal append.
+#
+#   python main.py plan set meals.csv              date,slot,meal[,household] per line; an empty meal clears the slot
+#   python main.py plan clear --start 2024-05-13 --end 2024-05-20
+#   python main.py recipe import recipes.csv       also .jsonl, or "Name: ingredient, ingredient, ..." lines
+#   python main.py grocery export list.csv         the extension picks the format
+#   python main.py grocery export out/ --household Home --household Cabin --weeks 4 --format .md
+#   python main.py classify ingredients.txt        "ingredient<TAB>category" per line on stdout
+#
+# Messages go to stderr, so stdout only carries a command's output. Bad input lines are reported with their line number
+# and skipped; the exit status is 1 if there were any.
+
+
+def open_input(path):
+    if path == "-":
+        return contextlib.nullcontext(sys.stdin)
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def report(message):
+    print(message, file=sys.stderr)
+
+
+def bad_line(number, message):
+    report(f"line {number}: {message}")
+
+
+# --- plan -----------------------------------------------------------------------------------
+
+def plan_set(args):
+    errors = 0
+    count = 0
+    with open_input(args.input) as f:
+        for number, row in enumerate(csv.reader(f), 1):
+            if not row or row[0].strip().startswith("#") or not "".join(row).strip():
+                continue
+            if len(row) < 3 or len(row) > 4:
+                bad_line(number, "expected date,slot,meal[,household]")
+                errors += 1
+                continue
+            day, slot, meal = (field.strip() for field in row[:3])
+            household = row[3].strip() if len(row) == 4 and row[3].strip() else args.household
+            try:
+                day = parse_date(day)
+            except ValueError:
+                bad_line(number, f"invalid date '{day}'")
+                errors += 1
+                continue
+            if slot not in store.plan.slot_types:
+                if not args.add_slots:
+                    bad_line(number, f"unknown meal slot '{slot}' (use --add-slots to create it)")
+                    errors += 1
+                    continue
+                store.add_slot_type(slot)
+            store.set_meal(day, slot, meal or None, household)
+            count += 1
+    report(f"{count} meal slots set.")
+    return errors
+
+
+def plan_clear(args):
+    start = parse_date(args.start) if args.start else store.current_week
+    end = parse_date(args.end) if args.end else None
+    before = len(store.plan)
+    store.clear_meal_plan(start, end, args.household)
+    report(f"{before - len(store.plan)} meal slots cleared.")
+    return 0
+
+
+# --- recipe ---------------------------------------------------------------------------------
+
+def recipe_import(args):
+    # Parsing runs in a process pool for large files (see recipe_import.py).
+    format = args.format or (file_format(args.input) if args.input != "-" else "lines")
+    with open_input(args.input) as f:
+        result = import_recipes(f, format, replace=args.replace, workers=args.workers)
+    for number, message in result.errors:
+        bad_line(number, message)
+    for number, name in result.duplicates:
+        bad_line(number, f"a recipe named '{name}' already exists; skipped" + ("" if args.replace else " (use --replace to overwrite it)"))
+    report(f"{result.added} recipes added, {result.replaced} replaced, {len(result.duplicates)} duplicates skipped "
+           f"in {result.seconds:.2f} s ({result.rate:,.0f} recipes/s).")
+    if result.unclassified:
+        report(f"{result.unclassified} new ingredients matched no category (see Override Ingredient Category).")
+    return len(result.errors)
+
+
+# --- grocery --------------------------------------------------------------------------------
+
+def grocery_export(args):
+    households = args.household or [store.current_household]
+    start = parse_date(args.week) if args.week else store.current_week
+    if len(households) > 1 or args.weeks > 1:
+        # Several lists: output is a directory, one file per household and week.
+        extension = args.format or ".txt"
+        os.makedirs(args.output, exist_ok=True)
+        for path, count in export_batch(store.grocery_lists(households, start, args.weeks), args.output, extension):
+            report(f"{path}: {count} items")
+        return 0
+
+    output = args.output
+    if args.format:
+        output = os.path.splitext(output)[0] + args.format
+    if writer_for(output) is None:
+        raise ValueError(f"Unknown export format '{os.path.splitext(output)[1]}' (use one of: {', '.join(sorted(WRITERS))})")
+    store.select_week(start, households[0])
+    count = export_rows(output, grocery_rows(store.grocery, store.extras_list, store.checked_off))
+    if args.mark_exported:
+        store.mark_exported()
+    report(f"{output}: {count} items")
+    return 0
+
+
+# --- classify -------------------------------------------------------------------------------
+
+def classify(args):
+    # Categories for a list of ingredients, overrides included; every ingredient not cached yet is classified in one batch.
+    with open_input(args.input) as f:
+        ingredients = [line.strip() for line in f if line.strip()]
+    out = sys.stdout
+    for ingredient, category in zip(ingredients, store.get_ingredient_categories(ingredients)):
+        out.write(f"{ingredient}\t{category}\n")
+    return 0
+
+
+# --- Entry point ----------------------------------------------------------------------------
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py", description="Grocery Meal Planner (run without arguments for the menu).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    plan = commands.add_parser("plan", help="change the meal plan").add_subparsers(dest="action", required=True)
+    plan_set_parser = plan.add_parser("set", help="set meal slots from CSV lines: date,slot,meal[,household]")
+    plan_set_parser.add_argument("input", nargs="?", default="-", help="input file (default: stdin)")
+    plan_set_parser.add_argument("--household", default=None, help="household for lines that don't name one")
+    plan_set_parser.add_argument("--add-slots", action="store_true", help="create meal slot types that don't exist yet")
+    plan_set_parser.set_defaults(run=plan_set)
+    plan_clear_parser = plan.add_parser("clear", help="empty the meal slots in a date range")
+    plan_clear_parser.add_argument("--start", help="first date (default: Monday of this week)")
+    plan_clear_parser.add_argument("--end", help="date after the last one (default: a week after start)")
+    plan_clear_parser.add_argument("--household", default=None)
+    plan_clear_parser.set_defaults(run=plan_clear)
+
+    recipe = commands.add_parser("recipe", help="change saved recipes").add_subparsers(dest="action", required=True)
+    recipe_import_parser = recipe.add_parser("import", help="add recipes from a CSV, JSON lines or 'Name: ingredient, ...' file")
+    recipe_import_parser.add_argument("input", nargs="?", default="-", help="input file (default: stdin)")
+    recipe_import_parser.add_argument("--format", choices=["csv", "jsonl", "lines"], help="input format (default: from the file extension)")
+    recipe_import_parser.add_argument("--replace", action="store_true", help="replace recipes that already exist instead of skipping them")
+    recipe_import_parser.add_argument("--workers", type=int, default=None, help="parser processes (default: one per CPU)")
+    recipe_import_parser.set_defaults(run=recipe_import)
+
+    grocery = commands.add_parser("grocery", help="grocery list").add_subparsers(dest="action", required=True)
+    grocery_export_parser = grocery.add_parser("export", help="export grocery lists")
+    grocery_export_parser.add_argument("output", help="output file, or a directory for several households or weeks")
+    grocery_export_parser.add_argument("--household", action="append", help="household to export (repeatable)")
+    grocery_export_parser.add_argument("--week", help="any date in the (first) week (default: this week)")
+    grocery_export_parser.add_argument("--weeks", type=int, default=1, help="number of consecutive weeks")
+    grocery_export_parser.add_argument("--format", choices=sorted(WRITERS), help="format (default: from the file extension)")
+    grocery_export_parser.add_argument("--mark-exported", action="store_true", help="report later changes against this export")
+    grocery_export_parser.set_defaults(run=grocery_export)
+
+    classify_parser = commands.add_parser("classify", help=f"print the category ({', '.join(categories)}, Other) of each ingredient line")
+    classify_parser.add_argument("input", nargs="?", default="-", help="input file (default: stdin)")
+    classify_parser.set_defaults(run=classify)
+    return parser
+
+
+def run(argv):
+    args = build_parser().parse_args(argv)
+    with contextlib.redirect_stdout(sys.stderr):
+        store.load_data()
+    try:
+        errors = args.run(args)
+    except (OSError, ValueError) as e:
+        report(f"Error: {e}")
+        return 1
+    finally:
+        with contextlib.redirect_stdout(sys.stderr):
+            store.commit()
+            # The single write for the whole run.
+            store.close()
+    if errors:
+        report(f"{errors} input lines skipped.")
+    return 1 if errors else 0
@@ -0,0 +1,38 @@
+# Change events for the shared data. store.py emits one event per change, after the change is made, and anything that
+# shows derived values (the GUI dashboard, the counters in stats.py) subscribes instead of recomputing from scratch.
+#
+# Events and their details:
+#   slot_set        household, date, slot, old, new, active
+#                                      a meal slot changed from meal old to meal new (either may be None); active is
+#                                      True when the slot is in the household and week being shown
+#   slot_types_changed                 a meal slot type was added
+#   week_selected                      another week or household is being shown
+#   recipe_changed  name, old, new     a recipe's ingredient count went from old to new; old is None for a new recipe,
+#                                      new is None for a deleted one
+#   recipe_renamed  old, new, size
+#   extra_added     item
+#   extra_removed   item
+#   checked         items              items that were not checked off before
+#   unchecked       items              items that were checked off before
+#   checks_cleared
+#   override_set    ingredient, category
+#   grocery_item    name, present      a canonical ingredient joined (present=True) or left the grocery list
+#   loaded                             the data was replaced wholesale
+
+
+class Events:
+
+    def __init__(self):
+        self.listeners = {}
+
+    def subscribe(self, event, callback):
+        # callback(**details) is called for every emitted event of that name, in the order the callbacks subscribed.
+        self.listeners.setdefault(event, []).append(callback)
+        return callback
+
+    def unsubscribe(self, event, callback):
+        self.listeners.get(event, []).remove(callback)
+
+    def emit(self, event, **details):
+        for callback in self.listeners.get(event, ()):
+            callback(**details)
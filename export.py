@@ -0,0 +1,208 @@
+import csv
+import html
+import json
+import os
+from datetime import datetime, timedelta
+from typing import NamedTuple
+# Grocery list export. Rows come from a generator over the grocery engine, a writer for the chosen format turns each
+# row into text, and a ChunkedWriter collects that text and hands it to the file in large chunks, so exporting a long
+# list (or many lists in a batch) never builds the whole document in memory and never makes one small write per line.
+#
+# Writers are looked up by file extension in WRITERS; the @register_writer decorator adds new ones.
+
+CHUNK_SIZE = 64 * 1024
+EXTRAS_CATEGORY = "Extras/Spices"
+
+
+class GroceryRow(NamedTuple):
+    category: str
+    name: str
+    amount: str
+    # The summed quantity for display, "" if none was given.
+    checked: bool
+
+
+def grocery_rows(grocery, extras, checked_off):
+    # Every line of a grocery list in display order: categories alphabetically, then the extras. checked_off is a
+    # dict/set, so the checked flag is a hash lookup per row.
+    for category, ingredients in grocery.categorized():
+        for ingredient in ingredients:
+            yield GroceryRow(category, ingredient, grocery.amount(ingredient), ingredient in checked_off)
+    for item in extras:
+        yield GroceryRow(EXTRAS_CATEGORY, item, "", item in checked_off)
+
+
+class ChunkedWriter:
+    # A file-like object that gathers many small writes and passes them on in chunks of about chunk_size characters.
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.parts = []
+        self.size = 0
+        self.chunks = 0
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.chunk_size:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if self.parts:
+            self.f.write("".join(self.parts))
+            self.parts = []
+            self.size = 0
+            self.chunks += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+
+# --- Writers ----------------------------------------------------------------------------
+# A writer gets the output stream and the list's title; write() is called for every row, in order, and finish() once at
+# the end. Writers remember the category of the previous row to start a new section when it changes.
+
+WRITERS = {}
+
+
+def register_writer(cls):
+    WRITERS[cls.extension] = cls
+    return cls
+
+
+@register_writer
+class TextWriter:
+    extension = ".txt"
+
+    def __init__(self, out, title):
+        self.out = out
+        self.category = None
+        out.write(f"==== {title} ====\n")
+        out.write(f"Generated on: {datetime.now().strftime('%B %d, %Y')}\n")
+        out.write("=" * 30 + "\n")
+
+    def write(self, row):
+        if row.category != self.category:
+            self.category = row.category
+            self.out.write(f"\n{row.category}:\n")
+        label = f"{row.name} ({row.amount})" if row.amount else row.name
+        self.out.write(f" - [{'✓' if row.checked else ' '}] {label}\n")
+
+    def finish(self):
+        pass
+
+
+@register_writer
+class CsvWriter:
+    extension = ".csv"
+
+    def __init__(self, out, title):
+        self.rows = csv.writer(out)
+        self.rows.writerow(["category", "item", "amount", "checked"])
+
+    def write(self, row):
+        self.rows.writerow([row.category, row.name, row.amount, "yes" if row.checked else "no"])
+
+    def finish(self):
+        pass
+
+
+@register_writer
+class JsonWriter:
+    # Streams one JSON document: {"title": ..., "generated": ..., "items": [{...}, ...]}.
+    extension = ".json"
+
+    def __init__(self, out, title):
+        self.out = out
+        self.first = True
+        out.write(f'{{"title": {json.dumps(title)}, "generated": {json.dumps(datetime.now().isoformat(timespec="seconds"))}, "items": [')
+
+    def write(self, row):
+        self.out.write(("\n  " if self.first else ",\n  ") + json.dumps(row._asdict(), ensure_ascii=False))
+        self.first = False
+
+    def finish(self):
+        self.out.write("\n]}\n")
+
+
+@register_writer
+class MarkdownWriter:
+    extension = ".md"
+
+    def __init__(self, out, title):
+        self.out = out
+        self.category = None
+        out.write(f"# {title}\n\n_Generated on {datetime.now().strftime('%B %d, %Y')}_\n")
+
+    def write(self, row):
+        if row.category != self.category:
+            self.category = row.category
+            self.out.write(f"\n## {row.category}\n\n")
+        label = f"{row.name} ({row.amount})" if row.amount else row.name
+        self.out.write(f"- [{'x' if row.checked else ' '}] {label}\n")
+
+    def finish(self):
+        pass
+
+
+@register_writer
+class HtmlWriter:
+    extension = ".html"
+
+    def __init__(self, out, title):
+        self.out = out
+        self.category = None
+        out.write(f"<!DOCTYPE html>\n<html>\n<head><meta charset=\"utf-8\"><title>{html.escape(title)}</title></head>\n<body>\n<h1>{html.escape(title)}</h1>\n")
+
+    def write(self, row):
+        if row.category != self.category:
+            if self.category is not None:
+                self.out.write("</ul>\n")
+            self.category = row.category
+            self.out.write(f"<h2>{html.escape(row.category)}</h2>\n<ul>\n")
+        label = f"{row.name} ({row.amount})" if row.amount else row.name
+        self.out.write(f"<li><input type=\"checkbox\" disabled{' checked' if row.checked else ''}> {html.escape(label)}</li>\n")
+
+    def finish(self):
+        if self.category is not None:
+            self.out.write("</ul>\n")
+        self.out.write("</body>\n</html>\n")
+
+
+# --- Exporting --------------------------------------------------------------------------
+
+def writer_for(path):
+    # The writer class for a file name's extension, or None if there is none for it.
+    return WRITERS.get(os.path.splitext(path)[1].lower())
+
+
+def export_rows(path, rows, title="Grocery List", chunk_size=CHUNK_SIZE):
+    # Stream rows into path in the format its extension names. Returns the number of rows written.
+    writer_class = writer_for(path)
+    if writer_class is None:
+        raise ValueError(f"Unknown export format '{os.path.splitext(path)[1]}' (use one of: {', '.join(sorted(WRITERS))})")
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f, ChunkedWriter(f, chunk_size) as out:
+        writer = writer_class(out, title)
+        for row in rows:
+            writer.write(row)
+            count += 1
+        writer.finish()
+    return count
+
+
+def export_batch(lists, directory, extension=".txt"):
+    # Export many grocery lists in one run, one file per (household, week). lists yields (household, week start,
+    # rows); each list is streamed straight to its file. Returns [(path, row count)].
+    results = []
+    for household, week, rows in lists:
+        safe_household = "".join(c if c.isalnum() or c in "-_" else "_" for c in household)
+        path = os.path.join(directory, f"grocery_{safe_household}_{week.isoformat()}{extension}")
+        title = f"Grocery List: {household}, {week.strftime('%d %b')} – {(week + timedelta(days=6)).strftime('%d %b %Y')}"
+        results.append((path, export_rows(path, rows, title)))
+    return results
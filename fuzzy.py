@@ -0,0 +1,72 @@
+# Near-miss string matching: edit distance and a bigram index to find the vocabulary words within a few edits of a
+# misspelling like "Zuchinni". Only used to guess a category for names no keyword matches (see categories.py); a near
+# match never decides which ingredient something is, since plenty of real ingredients are one edit apart.
+
+
+def edit_distance(a, b, limit):
+    # Optimal string alignment distance (Levenshtein plus adjacent transpositions); stops early once every path exceeds limit.
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = ca != cb
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class NGramIndex:
+    # Bigram index over the vocabulary for near-miss lookups. Each edit changes at most three of a word's padded bigrams,
+    # so a word within t edits of the query shares all but 3t of the query's distinct bigrams; only words passing that count
+    # (and the length) filter get the exact edit distance computed.
+
+    def __init__(self, words=()):
+        self.words = []
+        self.postings = {}
+        for word in words:
+            self.add(word)
+
+    @staticmethod
+    def bigrams(word):
+        padded = f"^{word}$"
+        return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+    def add(self, word):
+        index = len(self.words)
+        self.words.append(word)
+        for bigram in self.bigrams(word):
+            self.postings.setdefault(bigram, []).append(index)
+
+    def search(self, word, tolerance):
+        # (distance, word) pairs within tolerance, closest first (ties in vocabulary order).
+        bigrams = self.bigrams(word)
+        shared = {}
+        for bigram in bigrams:
+            for index in self.postings.get(bigram, ()):
+                shared[index] = shared.get(index, 0) + 1
+        needed = len(bigrams) - 3 * tolerance
+        matches = []
+        for index, count in shared.items():
+            candidate = self.words[index]
+            if count >= needed and abs(len(candidate) - len(word)) <= tolerance:
+                distance = edit_distance(word, candidate, tolerance)
+                if distance <= tolerance:
+                    matches.append((distance, index, candidate))
+        return [(distance, candidate) for distance, _, candidate in sorted(matches)]
+
+
+def tolerance(word):
+    # How many edits a near miss may be away from a keyword. Short words have to match exactly: one edit is all it takes
+    # to get from one real ingredient to another ("batter"/"butter", "paste"/"pasta", "beacon"/"bacon").
+    if len(word) < 7:
+        return 0
+    if len(word) < 8:
+        return 1
+    return 2
@@ -0,0 +1,145 @@
+from ingredients import ingredient_table
+from normalize import canonical_name, parse_ingredient
+from units import format_total
+# Incremental grocery list aggregation. Instead of walking the whole meal plan and every recipe on each render,
+# the GroceryList keeps a reference count per (category, ingredient) and is updated as meal slots and recipes change.
+
+
+def format_amounts(totals):
+    # Summed quantities (unit -> [amount, uses]) for display, e.g. "5" or "21 g, plus 2 unmeasured"; "" if none was given.
+    measured = {unit: amount for unit, (amount, uses) in totals.items() if unit is not None}
+    if not measured:
+        return ""
+    text = format_total(measured)
+    if None in totals:
+        text += f", plus {totals[None][1]} unmeasured"
+    return text
+
+
+class GroceryList:
+    # Counts, categories and per-category sets are keyed by the interned id of each ingredient's canonical name (see
+    # ingredients.py and normalize.py), so "Onions" and "onion" are one line and every update is integer dict work.
+
+    def __init__(self, resolve_categories, on_item=None):
+        # resolve_categories takes a list of ingredient names and returns their categories in the same order.
+        # on_item(name, present) is told when an ingredient joins or leaves the list (not by clear()).
+        self.resolve_categories = resolve_categories
+        self.on_item = on_item
+        self.counts = {}
+        self.category_of = {}
+        self.by_category = {}
+        self.amounts = {}
+        # Canonical id -> unit -> [summed quantity, uses]. Uses without a quantity are kept under the unit None.
+        self.watchers = []
+        # Objects with touch(id) and reset(), told before an ingredient's totals change / before the list is cleared (see grocery_diff.py).
+
+    def clear(self):
+        for watcher in self.watchers:
+            watcher.reset()
+        self.counts.clear()
+        self.amounts.clear()
+        self.category_of.clear()
+        self.by_category.clear()
+
+    def rebuild(self, meals, recipes):
+        # Full rebuild from the planned meal names, only needed after loading data or when another week is shown.
+        self.clear()
+        self.add([id for meal_name in meals if meal_name in recipes for id in recipes[meal_name].ids])
+
+    def add(self, ids):
+        canonical_ids = ingredient_table.canonical_ids(ids)
+        new = [id for id in dict.fromkeys(canonical_ids) if id not in self.category_of]
+        for id, category in zip(new, self.resolve_categories(ingredient_table.names(new))):
+            self.category_of[id] = category
+            self.by_category.setdefault(category, {})[id] = None
+        for id, canonical in zip(ids, canonical_ids):
+            for watcher in self.watchers:
+                watcher.touch(canonical)
+            self.counts[canonical] = self.counts.get(canonical, 0) + 1
+            self._add_amount(canonical, id, 1)
+        if self.on_item is not None:
+            for id in new:
+                self.on_item(ingredient_table.name(id), True)
+
+    def remove(self, ids):
+        for id, canonical in zip(ids, ingredient_table.canonical_ids(ids)):
+            category = self.category_of.get(canonical)
+            if category is None:
+                continue
+            for watcher in self.watchers:
+                watcher.touch(canonical)
+            self.counts[canonical] -= 1
+            self._add_amount(canonical, id, -1)
+            if self.counts[canonical] == 0:
+                # Last planned use of this ingredient is gone, so drop it from the list entirely.
+                del self.counts[canonical]
+                del self.amounts[canonical]
+                del self.category_of[canonical]
+                del self.by_category[category][canonical]
+                if not self.by_category[category]:
+                    del self.by_category[category]
+                if self.on_item is not None:
+                    self.on_item(ingredient_table.name(canonical), False)
+
+    def _add_amount(self, canonical, id, sign):
+        # Add (sign=1) or take back (sign=-1) the quantity of one use of ingredient id.
+        parsed = parse_ingredient(ingredient_table.name(id))
+        totals = self.amounts.setdefault(canonical, {})
+        entry = totals.setdefault(parsed.unit, [0.0, 0])
+        entry[0] += sign * (parsed.quantity or 0.0)
+        entry[1] += sign
+        if entry[1] == 0:
+            del totals[parsed.unit]
+
+    def set_slot(self, old_meal, new_meal, recipes):
+        # A single meal slot changed from old_meal to new_meal (either may be None or a custom meal without a recipe).
+        if old_meal in recipes:
+            self.remove(recipes[old_meal].ids)
+        if new_meal in recipes:
+            self.add(recipes[new_meal].ids)
+
+    def update_recipe(self, old_ids, new_ids, uses):
+        # A recipe's ingredients changed (or it was added, renamed or deleted); apply the difference once per slot (uses) that plans it.
+        for _ in range(uses):
+            self.remove(old_ids)
+            self.add(new_ids)
+
+    def recategorize(self, ingredient):
+        # Move an ingredient to whatever category it resolves to now, e.g. after a category override.
+        id = ingredient_table.ids.get(canonical_name(ingredient))
+        old_category = self.category_of.get(id)
+        if old_category is None:
+            return
+        new_category = self.resolve_categories([ingredient])[0]
+        if new_category == old_category:
+            return
+        del self.by_category[old_category][id]
+        if not self.by_category[old_category]:
+            del self.by_category[old_category]
+        self.category_of[id] = new_category
+        self.by_category.setdefault(new_category, {})[id] = None
+
+    def categorized(self):
+        # Categories in alphabetical order, each with its ingredients in the order they were first planned.
+        return [(category, ingredient_table.names(self.by_category[category])) for category in sorted(self.by_category)]
+
+    def amount(self, ingredient):
+        # The summed quantity of an ingredient across the plan, e.g. "5" for "2 eggs" + "3 eggs", or "" if none was given.
+        return format_amounts(self.amounts.get(ingredient_table.ids.get(canonical_name(ingredient)), {}))
+
+    def label(self, ingredient):
+        # The ingredient with its summed quantity, for display: "Egg (5)".
+        amount = self.amount(ingredient)
+        return f"{ingredient} ({amount})" if amount else ingredient
+
+    def in_category(self, category):
+        return ingredient_table.names(self.by_category.get(category, ()))
+
+    def ingredients(self):
+        return ingredient_table.names(self.category_of)
+
+    def __contains__(self, ingredient):
+        return ingredient_table.ids.get(canonical_name(ingredient)) in self.category_of
+
+    def __len__(self):
+        return len(self.category_of)
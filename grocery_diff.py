@@ -0,0 +1,155 @@
+from typing import NamedTuple
+from grocery import format_amounts
+from ingredients import ingredient_table
+# What changed on the grocery list since it was last exported. Instead of keeping a copy of the exported list and
+# comparing whole lists, the GroceryDiff watches the GroceryList: the first time an ingredient's totals are about to
+# change after an export, its exported state is saved. The diff is then just those saved states against the current
+# ones, so both keeping it and computing it cost O(changed ingredients), i.e. O(changed slots), not O(list).
+#
+# The exported list itself is kept as a baseline in the data file, so the diff survives a restart: after loading,
+# the baseline is compared once against the rebuilt list to seed the saved states. Extras (a short list) are simply
+# compared against the exported ones.
+#
+# An export is of one household's week. While another week or household is shown the diff stops watching (changes()
+# returns None); when the exported week is shown again its saved states are seeded afresh from the exported states,
+# since its plan may have been changed in the meantime.
+
+
+class Change(NamedTuple):
+    kind: str
+    # "+" added, "-" removed, "~" amount changed
+    category: str
+    name: str
+    before: str
+    after: str
+    # Amounts as displayed ("5", "21 g"), "" when there was none.
+
+
+class GroceryDiff:
+
+    def __init__(self, grocery, extras):
+        self.grocery = grocery
+        self.extras = extras
+        self.before = {}
+        # Canonical id -> (category, amounts) as exported, or None if it wasn't on the exported list.
+        self.extras_before = list(extras)
+        self.exported = None
+        # When and what was last exported: {"at": ..., "household": ..., "week": ...}, None if never.
+        self.exported_states = {}
+        # Canonical id -> (category, amounts) for every ingredient on the exported list.
+        self.watching = False
+        # Whether the list currently shown is the exported household and week.
+        grocery.watchers.append(self)
+
+    def _state(self, id):
+        if id not in self.grocery.counts:
+            return None
+        amounts = tuple(sorted(((unit, round(amount, 6), uses) for unit, (amount, uses) in self.grocery.amounts[id].items()),
+                               key=lambda entry: (entry[0] is None, entry[0] or "")))
+        return self.grocery.category_of[id], amounts
+
+    def touch(self, id):
+        if self.watching and id not in self.before:
+            self.before[id] = self._state(id)
+
+    def reset(self):
+        # The list is about to be cleared and rebuilt: save everything not saved yet.
+        for id in self.grocery.counts:
+            self.touch(id)
+
+    def show(self, household, week):
+        # The list was just rebuilt for a household and week (an ISO date). Start or stop watching it.
+        self.watching = self.exported is not None and (self.exported["household"], self.exported["week"]) == (household, week)
+        if self.watching:
+            self._seed()
+
+    def _seed(self):
+        # Save the exported state of every ingredient whose totals differ from it now. O(list), once per week shown.
+        self.before.clear()
+        for id in set(self.exported_states) | set(self.grocery.counts):
+            old = self.exported_states.get(id)
+            new = self._state(id)
+            if (old and old[1]) != (new and new[1]):
+                self.before[id] = old
+
+    # --- Queries ------------------------------------------------------------------------
+
+    def changes(self):
+        # Added, removed and changed ingredients (and extras) since the export, by category and name; None if the list
+        # shown isn't the exported household and week.
+        if not self.watching:
+            return None
+        result = []
+        for id, old in self.before.items():
+            new = self._state(id)
+            if (old and old[1]) == (new and new[1]):
+                continue
+            name = ingredient_table.name(id)
+            if old is None:
+                result.append(Change("+", new[0], name, "", _describe(new[1], False)))
+            elif new is None:
+                result.append(Change("-", old[0], name, _describe(old[1], False), ""))
+            else:
+                result.append(Change("~", new[0], name, _describe(old[1]), _describe(new[1])))
+        exported = set(self.extras_before)
+        current = set(self.extras)
+        result += [Change("+", "Extras/Spices", item, "", "") for item in current - exported]
+        result += [Change("-", "Extras/Spices", item, "", "") for item in exported - current]
+        return sorted(result, key=lambda change: (change.category, change.name))
+
+    # --- Baselines ----------------------------------------------------------------------
+
+    def baseline(self, exported):
+        # The current list in the data file's shape; taking it is O(list), but only happens once per export.
+        items = {}
+        for id in self.grocery.counts:
+            category, amounts = self._state(id)
+            items[ingredient_table.name(id)] = [category, [list(entry) for entry in amounts]]
+        return {**exported, "items": items, "extras": list(self.extras)}
+
+    def mark_exported(self, exported):
+        # The current list was just exported; changes are counted from here on.
+        self.before.clear()
+        self.exported_states = {id: self._state(id) for id in self.grocery.counts}
+        self.extras_before = list(self.extras)
+        self.exported = exported
+        self.watching = True
+
+    def restore(self, baseline, household, week):
+        # After loading: take the exported states from the baseline (if there is one), with the loaded list shown for
+        # household and week.
+        self.before.clear()
+        if not baseline:
+            self.exported_states = {}
+            self.extras_before = list(self.extras)
+            self.exported = None
+            self.watching = False
+            return
+        self.exported_states = {ingredient_table.intern(name): (category, tuple(tuple(entry) for entry in amounts))
+                                for name, (category, amounts) in baseline["items"].items()}
+        self.extras_before = list(baseline["extras"])
+        self.exported = {key: value for key, value in baseline.items() if key not in ("items", "extras")}
+        self.show(household, week)
+
+
+def _describe(amounts, uses=True):
+    # The displayed amount, or (with uses) how often the ingredient is used when no quantity was given ("2x").
+    text = format_amounts({unit: [amount, count] for unit, amount, count in amounts})
+    return text or (f"{sum(count for _, _, count in amounts)}x" if uses else "")
+
+
+def format_patch(changes, exported=None):
+    # A compact patch for shoppers holding the previous printout: one line per change.
+    #   + Produce: Avocado (2)
+    #   - Dairy: Milk (1 cup)
+    #   ~ Protein: Egg (3 -> 5)
+    lines = []
+    if exported:
+        lines.append(f"# Changes since the export of {exported['at']} ({exported['household']}, week of {exported['week']})")
+    for change in changes:
+        if change.kind == "~":
+            amount = f" ({change.before} -> {change.after})"
+        else:
+            amount = f" ({change.after or change.before})" if change.after or change.before else ""
+        lines.append(f"{change.kind} {change.category}: {change.name}{amount}")
+    return lines
@@ -0,0 +1,102 @@
+from array import array
+from normalize import canonical_name
+# Interned ingredient names. Every distinct ingredient name gets a small integer id in one shared table, and a recipe
+# stores its ingredients as an array('I') of those ids (4 bytes each) instead of a list of separate str objects.
+# Ids are never reused or removed, so an id stays valid for the lifetime of the process. Each ingredient also knows the
+# id of its canonical name (see normalize.py), which is what the grocery list aggregates on.
+
+
+class Ingredient:
+    __slots__ = ("id", "name", "canonical")
+
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+        self.canonical = None
+
+    def __repr__(self):
+        return f"Ingredient({self.id}, {self.name!r})"
+
+
+class IngredientTable:
+
+    def __init__(self):
+        self.ingredients = []
+        self.ids = {}
+
+    def intern(self, name):
+        # Id for this name, adding it to the table the first time it is seen.
+        id = self.ids.get(name)
+        if id is None:
+            id = len(self.ingredients)
+            self.ingredients.append(Ingredient(id, name))
+            self.ids[name] = id
+        return id
+
+    def intern_all(self, names):
+        return array("I", [self.intern(name) for name in names])
+
+    def canonical_id(self, id):
+        # Id of the ingredient's canonical name, worked out on first use.
+        ingredient = self.ingredients[id]
+        if ingredient.canonical is None:
+            ingredient.canonical = self.intern(canonical_name(ingredient.name))
+        return ingredient.canonical
+
+    def canonical_ids(self, ids):
+        return [self.canonical_id(id) for id in ids]
+
+    def name(self, id):
+        return self.ingredients[id].name
+
+    def names(self, ids):
+        ingredients = self.ingredients
+        return [ingredients[id].name for id in ids]
+
+    def __len__(self):
+        return len(self.ingredients)
+
+
+ingredient_table = IngredientTable()
+
+
+class Recipe:
+    # A recipe's ingredients as interned ids. It behaves like the list of names it replaces (iteration, indexing,
+    # len, "in", append, pop), so code written against plain lists keeps working.
+    __slots__ = ("name", "ids")
+
+    def __init__(self, name, ingredients=()):
+        self.name = name
+        self.ids = ingredient_table.intern_all(ingredients)
+
+    def __iter__(self):
+        ingredients = ingredient_table.ingredients
+        return (ingredients[id].name for id in self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ingredient_table.names(self.ids[index])
+        return ingredient_table.name(self.ids[index])
+
+    def __contains__(self, name):
+        id = ingredient_table.ids.get(name)
+        return id is not None and id in self.ids
+
+    def __eq__(self, other):
+        if isinstance(other, Recipe):
+            return self.ids == other.ids
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    def append(self, name):
+        self.ids.append(ingredient_table.intern(name))
+
+    def pop(self, index=-1):
+        return ingredient_table.name(self.ids.pop(index))
+
+    def __repr__(self):
+        return f"Recipe({self.name!r}, {list(self)!r})"
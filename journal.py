@@ -0,0 +1,229 @@
+import glob
+import json
+import os
+import threading
+from datetime import date, timedelta
+from persistence import BACKUP_GENERATIONS, atomic_write_bytes, read_json_with_backups
+from plan import DEFAULT_HOUSEHOLD, DEFAULT_SLOT_TYPES, days, legacy_date, week_start
+from snapshot import LazyRecipes, build_snapshot, index_path, read_snapshot
+# Append-only storage for the planner data. Instead of rewriting the whole data file after every change, each change is
+# appended to a journal as one small JSON line (an "operation record"). Every so often the journal is folded into a
+# fresh snapshot of the data file in the background. Loading reads the snapshot and replays the journal records after it.
+#
+# Files next to the data file (data.json):
+#   data.journal          records still being appended to
+#   data.journal.<seq>    sealed segments, named after the last sequence number they contain
+# The snapshot stores "journal_seq", the last record folded into it, so replaying never applies a record twice.
+# Snapshots are written with a byte-offset index (see snapshot.py) so recipes are only parsed when first used.
+
+
+def apply_operation(data, record):
+    # Apply one journal record to the plain data dict (the same shape as data.json).
+    op = record["op"]
+    recipes = data.setdefault("recipes", {})
+    if op == "plan_set":
+        _set_plan(data, record["household"], record["date"], record["slot"], record["value"])
+    elif op == "plan_clear":
+        _clear_plan(data, record["household"], record["start"], record["end"])
+    elif op == "add_slot_type":
+        slot_types = data.setdefault("slot_types", list(DEFAULT_SLOT_TYPES))
+        if record["slot"] not in slot_types:
+            slot_types.append(record["slot"])
+    elif op == "set_slot":
+        # Written before schema version 4, against the weekday plan. They land on the same week as the plan they were
+        # written against (store.migrate keeps it in "legacy_week").
+        _set_plan(data, DEFAULT_HOUSEHOLD, legacy_date(record["day"], _legacy_week(data)).isoformat(), record["meal"], record["value"])
+    elif op == "clear_plan":
+        start = _legacy_week(data)
+        _clear_plan(data, DEFAULT_HOUSEHOLD, start.isoformat(), (start + timedelta(days=7)).isoformat())
+    elif op == "set_recipe":
+        recipes[record["name"]] = record["ingredients"]
+    elif op == "add_ingredient":
+        recipes[record["recipe"]].append(record["ingredient"])
+    elif op == "remove_ingredient":
+        recipes[record["recipe"]].pop(record["index"])
+    elif op == "rename_recipe":
+        recipes[record["new"]] = recipes.pop(record["old"])
+    elif op == "delete_recipe":
+        recipes.pop(record["name"], None)
+    elif op == "add_extra":
+        data.setdefault("extras", []).append(record["item"])
+    elif op == "remove_extra":
+        data.setdefault("extras", []).pop(record["index"])
+    elif op == "check":
+        data["checked_off"] = list(dict.fromkeys(data.get("checked_off", []) + record["items"]))
+    elif op == "uncheck":
+        unchecked = set(record["items"])
+        data["checked_off"] = [item for item in data.get("checked_off", []) if item not in unchecked]
+    elif op == "clear_checked":
+        data["checked_off"] = []
+    elif op == "mark_exported":
+        data["last_export"] = record["baseline"]
+    elif op == "set_override":
+        data.setdefault("category_overrides", {})[record["ingredient"]] = record["category"]
+    else:
+        raise ValueError(f"Unknown journal operation '{op}'")
+
+
+def _legacy_week(data):
+    if not data.get("legacy_week"):
+        data["legacy_week"] = week_start(date.today()).isoformat()
+    return date.fromisoformat(data["legacy_week"])
+
+
+def _set_plan(data, household, day, slot, meal):
+    by_date = data.setdefault("plans", {}).setdefault(household, {})
+    if meal is not None:
+        by_date.setdefault(day, {})[slot] = meal
+    elif slot in by_date.get(day, {}):
+        del by_date[day][slot]
+        if not by_date[day]:
+            del by_date[day]
+
+
+def _clear_plan(data, household, start, end):
+    # ISO dates sort like the dates they name.
+    by_date = data.setdefault("plans", {}).get(household, {})
+    for day in [day for day in by_date if start <= day < end]:
+        del by_date[day]
+
+
+class Journal:
+
+    def __init__(self, data_file, compact_every=500, migrate=None, on_error=None):
+        # migrate brings an older snapshot up to the current schema before records (written against that schema) are replayed.
+        # on_error(exception) is told when a compaction fails to write the snapshot; it is called on the compaction thread.
+        self.data_file = data_file
+        self.migrate = migrate
+        self.on_error = on_error
+        self.path = os.path.splitext(data_file)[0] + ".journal"
+        self.compact_every = compact_every
+        self.seq = 0
+        self.pending = []
+        self.since_snapshot = 0
+        self.compaction = None
+        self.lock = threading.Lock()
+        # Guards pending/seq/since_snapshot: the GUI records changes on the Tk thread while a worker thread flushes.
+        self.io_lock = threading.Lock()
+        # Serializes appends to the journal file with sealing it for compaction.
+
+    def _sealed_segments(self):
+        segments = []
+        for path in glob.glob(glob.escape(self.path) + ".*"):
+            suffix = path.rsplit(".", 1)[1]
+            if suffix.isdigit():
+                segments.append((int(suffix), path))
+        return sorted(segments)
+
+    def load(self):
+        # Return the data dict (snapshot plus replayed records) and the snapshot file it came from, or (None, None) if there is no data yet.
+        data, source = read_snapshot(self.data_file), self.data_file
+        if data is None:
+            data, source = read_json_with_backups(self.data_file)
+        snapshot_seq = data.pop("journal_seq", 0) if data is not None else 0
+        if data is not None and self.migrate is not None:
+            data = self.migrate(data)
+        seq = snapshot_seq
+        since_snapshot = 0
+        for _, path in self._sealed_segments() + [(None, self.path)]:
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as f:
+                good_offset = 0
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn final line from a crash mid-append; everything before it is intact.
+                        if path == self.path:
+                            f.close()
+                            os.truncate(path, good_offset)
+                        break
+                    good_offset += len(line)
+                    if record["seq"] <= snapshot_seq:
+                        continue
+                    if data is None:
+                        data, source = {}, self.path
+                    apply_operation(data, record)
+                    seq = record["seq"]
+                    since_snapshot += 1
+        with self.lock:
+            # Records queued while this ran (load may be on a worker thread) were numbered from the old seq; renumber them
+            # to follow the replayed ones, so none of them is skipped as already in the snapshot on the next load.
+            self.pending = [json.dumps({**json.loads(line), "seq": seq + i}) + "\n" for i, line in enumerate(self.pending, 1)]
+            self.seq = seq + len(self.pending)
+            self.since_snapshot = since_snapshot
+        return data, source
+
+    def record(self, op, **fields):
+        # Queue one change. It is serialized right away so later in-place edits to the same lists can't leak into it.
+        with self.lock:
+            self.seq += 1
+            self.pending.append(json.dumps({"seq": self.seq, "op": op, **fields}) + "\n")
+
+    def flush(self):
+        # Append the queued records and fsync. This costs O(change), not O(dataset). Safe to call from a worker thread.
+        with self.io_lock:
+            self._append()
+
+    def _append(self):
+        with self.lock:
+            lines, self.pending = self.pending, []
+        if not lines:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+        with self.lock:
+            self.since_snapshot += len(lines)
+
+    def maybe_compact(self, snapshot):
+        # Once enough records have piled up, fold them into a new snapshot. snapshot() returns the current data dict.
+        if self.since_snapshot >= self.compact_every:
+            self.compact(snapshot)
+
+    def compact(self, snapshot):
+        # Call from the thread that changes the data (snapshot() must not race with changes).
+        with self.io_lock:
+            self._append()
+            if self.compaction is not None and self.compaction.is_alive():
+                return
+            # Serialize on the calling thread so the snapshot is consistent, and seal the journal so new records go to a fresh file.
+            data = snapshot()
+            content, index = build_snapshot({**data, "journal_seq": self.seq})
+            if os.path.exists(self.path):
+                os.replace(self.path, f"{self.path}.{self.seq}")
+            with self.lock:
+                self.since_snapshot = 0
+        args = (content, index, data.get("recipes"))
+        self.compaction = threading.Thread(target=self._write_snapshot, args=args)
+        try:
+            self.compaction.start()
+        except RuntimeError:
+            # Threads can't be started during interpreter shutdown; just do it here.
+            self._write_snapshot(*args)
+
+    def _write_snapshot(self, content, index, recipes):
+        # If this fails nothing is lost: the sealed segment is still replayed on top of the previous snapshot.
+        try:
+            if isinstance(recipes, LazyRecipes):
+                # Unparsed recipes are read from data.json; move them over to the new file before anyone reads it again.
+                with recipes.lock:
+                    atomic_write_bytes(self.data_file, content)
+                    recipes.relocate(self.data_file, index["names"], index["spans"])
+            else:
+                atomic_write_bytes(self.data_file, content)
+            atomic_write_bytes(index_path(self.data_file), json.dumps(index).encode("utf-8"), generations=0)
+            # Keep as many sealed segments as there are backup generations so any backup can still be rolled forward.
+            for _, path in self._sealed_segments()[:-BACKUP_GENERATIONS]:
+                os.remove(path)
+        except Exception as e:
+            if self.on_error is None:
+                raise
+            self.on_error(e)
+
+    def close(self):
+        self.flush()
+        if self.compaction is not None:
+            self.compaction.join()
@@ -1,60 +1,17 @@
-import json
 import os
-from categories import categories, get_category 
-# Categories and get_category function are imported from categories.py to determine ingredient categories based on keywords.
-
-
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_FILE = os.path.join(BASE_DIR, "data.json")
-
-saved_recipes = {}
-days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-# Categories and their associated keywords for ingredient classification
-
-meal_plan = {day: { "Breakfast": None, "Lunch": None, "Dinner": None} for day in days}
-# Initialize meal plan with days of the week and meal types set to None
-
-extras_list = []
-checked_off = []
-category_overrides = {}
-
-
-def load_data():
-    # Load data from JSON file if it exists, otherwise start with empty/default values
-    global saved_recipes, meal_plan, extras_list, checked_off, category_overrides
-    if os.path.exists(DATA_FILE):
-        # Try to load data and handle potential JSON decoding errors or other exceptions gracefully
-        try:
-            with open(DATA_FILE, "r") as f:
-                data = json.load(f)
-                saved_recipes = data.get("recipes", {})
-                meal_plan = data.get("meal_plan", meal_plan)
-                extras_list = data.get("extras", [])
-                checked_off = data.get("checked_off", [])
-                category_overrides = data.get("category_overrides", {})
-            print("Data loaded successfully!")
-        except json.JSONDecodeError:
-            print("Warning: Data file corrupted. Starting fresh.")
-        except Exception as e:
-            print(f"Warning: Could not load data ({e}). Starting fresh.")
-
-def save_data():
-    # Save current state of recipes, meal plan, extras, checked off items, and category overrides to JSON file
-    with open(DATA_FILE, "w") as f:
-        json.dump({
-            "recipes": saved_recipes,
-            "meal_plan": meal_plan,
-            "extras_list": extras_list,
-            "checked_off": checked_off,
-            "category_overrides": category_overrides
-            }, f, indent=4)
-            # Indent is set for better readability of the JSON file
-
-def get_ingredient_category(ingredient):
-    # First check if there is a user override for this ingredient's category, if so return that. Otherwise, use the get_category function to determine the category based on keywords.
-    if ingredient in category_overrides:
-        return category_overrides[ingredient]
-    return get_category(ingredient)
+import sys
+from datetime import date, timedelta
+from categories import categories
+# Categories are imported from categories.py to list the available categories when overriding an ingredient's category.
+import cli
+import store
+from export import WRITERS, export_batch, export_rows, grocery_rows, writer_for
+from grocery_diff import format_patch
+from normalize import canonical_name
+from plan import parse_date
+from store import BASE_DIR, saved_recipes, extras_list, checked_off, grocery, load_data, get_ingredient_categories
+# All data, loading/saving and changes live in store.py, which the GUI (app.py) shares. The collections imported here are updated in place by load_data.
+
 
 def add_recipe():
     # Add a new recipe by prompting the user for a name and a list of ingredients. Validate inputs and save the new recipe to the data file.
@@ -82,8 +39,7 @@ def add_recipe():
             # If the resulting ingredient list is empty after processing, prompt the user to enter ingredients again until valid input is provided or they choose to cancel.
         break
 
-    saved_recipes[name] = ingredient_list
-    save_data()
+    store.set_recipe(name, ingredient_list)
     print(f"\n'{name}' added successfully!")
 
 def edit_recipe():
@@ -111,6 +67,7 @@ def edit_recipe():
     selected_recipe = recipe_list[int(choice) - 1]
 
     while True:
+        store.writer.poll()
         print(f"\nWhat would you like to do with '{selected_recipe}'?")
         print("1. Add an Ingredient")
         print("2. Remove an Ingredient")
@@ -131,8 +88,7 @@ def edit_recipe():
             if new_ingredient.strip() == "":
                 print("Ingredient cannot be empty. Please try again.")
                 continue
-            saved_recipes[selected_recipe].append(new_ingredient.strip())
-            save_data()
+            store.add_ingredient(selected_recipe, new_ingredient.strip())
             print(f"\n'{new_ingredient}' added to '{selected_recipe}' successfully!") 
         elif action == "2":
             # Display the current list of ingredients for the selected recipe and prompt the user to select one to remove. Validate the input and update the recipe's ingredient list accordingly, then save the changes to the data file.
@@ -148,9 +104,8 @@ def edit_recipe():
             if not delete_choice.isdigit() or int(delete_choice) < 1 or int(delete_choice) > len(saved_recipes[selected_recipe]):
                 print("Invalid choice. Please try again.")
                 continue
-            removed_ingredient = saved_recipes[selected_recipe].pop(int(delete_choice) - 1)
-            # Remove the selected ingredient from the recipe's ingredient list using pop() to also retrieve the removed ingredient for confirmation message.
-            save_data()
+            removed_ingredient = store.remove_ingredient(selected_recipe, int(delete_choice) - 1)
+            # Remove the selected ingredient from the recipe's ingredient list, which also returns the removed ingredient for the confirmation message.
             print(f"\n'{removed_ingredient}' removed from '{selected_recipe}' successfully!")
     
         elif action == "3":
@@ -170,8 +125,7 @@ def edit_recipe():
                 if not ingredient_list:
                     print("No valid ingredients entered. Please try again.")
                     continue
-                saved_recipes[selected_recipe] = ingredient_list
-                save_data()
+                store.set_recipe(selected_recipe, ingredient_list)
                 print(f"\n'{selected_recipe}' updated successfully!")
                 break
         elif action == "4":
@@ -185,17 +139,15 @@ def edit_recipe():
             if new_name in saved_recipes:
                 print("A recipe with that name already exists. Please choose a different name.")
                 continue
-            saved_recipes[new_name] = saved_recipes.pop(selected_recipe)
-            # Rename the recipe by popping the existing entry from the saved_recipes dictionary and reassigning it with the new name as the key. This effectively changes the key while keeping the associated ingredient list intact.
-            save_data()
+            store.rename_recipe(selected_recipe, new_name)
+            # Rename the recipe by moving its ingredient list to the new name as the key, keeping the associated ingredient list intact.
             print(f"\n'{selected_recipe}' renamed to '{new_name}' successfully!")
             return
         elif action == "5":
             # Prompt the user to confirm that they want to delete the selected recipe. If they confirm, remove the recipe from the saved_recipes dictionary and save the changes to the data file. If they cancel, return to the edit menu without making any changes.
             confirm = input(f"\nAre you sure you want to delete '{selected_recipe}'? (yes/no): ")
             if confirm.lower() == "yes":
-                del saved_recipes[selected_recipe]
-                save_data()
+                store.delete_recipe(selected_recipe)
                 print(f"\n'{selected_recipe}' deleted successfully!")
                 return
             else:
@@ -215,6 +167,7 @@ def view_extras():
 def manage_extras():
     # Provide a menu for the user to manage their extras/spices list. They can view the current list, add new items, or remove existing items. Each action is validated and changes are saved to the data file to ensure persistence across sessions.
     while True:
+        store.writer.poll()
         print("\n=== Manage Extras ===")
         print("1. View Extras List")
         print("2. Add an Extra")
@@ -233,8 +186,7 @@ def manage_extras():
             item = input("Enter item to add (e.g. '1tsp salt'): ")
             if item == "0":
                 return
-            extras_list.append(item)
-            save_data()
+            store.add_extra(item)
             print(f"\n'{item}' added to extras list successfully!")
         elif choice == "3":
             # Display the current list of extras/spices and prompt the user to select one to remove by entering the corresponding number. Validate the input to ensure it's a valid selection, then remove the selected item from the extras_list and save the changes to the data file. Provide feedback to the user confirming that the item was removed successfully.
@@ -248,9 +200,8 @@ def manage_extras():
             if not delete_choice.isdigit() or int(delete_choice) < 1 or int(delete_choice) > len(extras_list):
                 print("Invalid choice. Please try again.")
                 continue
-            removed_item = extras_list.pop(int(delete_choice) - 1)
-            # Remove the selected item from the extras_list using pop() to also retrieve the removed item for confirmation message.
-            save_data()
+            removed_item = store.remove_extra(int(delete_choice) - 1)
+            # Remove the selected item from the extras list, which also returns the removed item for the confirmation message.
             print(f"\n'{removed_item}' removed from extras list successfully!")
         else:
             print("Invalid choice. Please try again.")
@@ -263,11 +214,13 @@ def override_category():
 
     for recipe, ingredients in saved_recipes.items():
         for ingredient in ingredients:
+            ingredient = canonical_name(ingredient)
             if ingredient not in all_ingredients:
                 all_ingredients.append(ingredient)
-                # Add each ingredient from the saved recipes to the all_ingredients list, ensuring that duplicates are avoided by checking if the ingredient is already in the list before appending it.
+                # Add the canonical name of each ingredient from the saved recipes to the all_ingredients list, so spelling variants like "Onions" and "onion" are listed (and overridden) once.
 
     for item in extras_list:
+        item = canonical_name(item)
         if item not in all_ingredients:
             all_ingredients.append(item)
             # Add each item from the extras_list to the all_ingredients list, again checking for duplicates to ensure that each ingredient or extra is only listed once for category overriding.
@@ -277,8 +230,7 @@ def override_category():
         return
 
     print("\nAll ingredients:")
-    for i, ingredient in enumerate(all_ingredients, 1):
-        current_category = get_ingredient_category(ingredient)
+    for i, (ingredient, current_category) in enumerate(zip(all_ingredients, get_ingredient_categories(all_ingredients)), 1):
         print(f"  {i}. {ingredient} (currently: {current_category})")
     print("0. Go Back")
 
@@ -310,8 +262,7 @@ def override_category():
         return
 
     selected_category = category_list[int(cat_choice) - 1]
-    category_overrides[selected_ingredient] = selected_category
-    save_data()
+    store.set_override(selected_ingredient, selected_category)
     print(f"\n'{selected_ingredient}' category set to '{selected_category}' successfully!")
 
 def view_recipes():
@@ -326,49 +277,93 @@ def view_recipes():
                 print(f" - {ingredient}")
                 # Print each ingredient for the recipe with a dash for better readability and formatting.
 
+def describe_day(day):
+    return f"{day.strftime('%A')} {day.isoformat()}"
+
+def print_plan(start, end):
+    # One range query over the plan store for the shown days; empty slots are filled in from the slot types.
+    planned = {(day, slot): meal for day, slot, meal in store.plan.range(store.current_household, start, end)}
+    day = start
+    while day < end:
+        print(f"\n{describe_day(day)}:")
+        for slot in store.plan.slot_types:
+            print(f" {slot}: {planned.get((day, slot)) or 'Not Set'}")
+        day += timedelta(days=1)
+
 def view_meal_plan():
-    # Display the current weekly meal plan in a clear and organized format. Iterate through the meal_plan dictionary and print each day of the week along with the assigned meals for breakfast, lunch, and dinner. If a meal is not set for a particular day, indicate that it is "Not Set" to inform the user that they can add a meal for that slot.
-    print("\n=== Weekly Meal Plan ===")
-    for day, meals in meal_plan.items():
-        # Iterate through each day in the meal_plan dictionary, retrieving the meals assigned for breakfast, lunch, and dinner. This allows us to display the meal plan in a structured format that is easy for the user to read and understand.
-        print(f"\n{day}:")
-        print(f" Breakfast: {meals['Breakfast'] or 'Not Set'}")
-        print(f" Lunch: {meals['Lunch'] or 'Not Set'}")
-        print(f" Dinner: {meals['Dinner'] or 'Not Set'}")
+    # Display the meal plan of the current household one week at a time, with a date next to each day. The user can page to the next or previous week, jump to the week of any date, look at the next 14 days, or switch to another household. Moving to another week also makes it the week the grocery list is built for.
+    while True:
+        print(f"\n=== Meal Plan: {store.current_household}, week of {store.current_week.isoformat()} ===")
+        print_plan(store.current_week, store.current_week + timedelta(days=7))
+        choice = input("\nEnter 'n' for next week, 'p' for previous week, a date (YYYY-MM-DD) to jump to its week, 'u' for the next 14 days, 'h' to switch household, or press Enter to go back: ").strip().lower()
+        if choice == "":
+            return
+        elif choice == "n":
+            store.select_week(store.current_week + timedelta(days=7))
+        elif choice == "p":
+            store.select_week(store.current_week - timedelta(days=7))
+        elif choice == "u":
+            print(f"\n=== Next 14 Days: {store.current_household} ===")
+            print_plan(date.today(), date.today() + timedelta(days=14))
+        elif choice == "h":
+            households = store.plan.household_names()
+            print(f"Households with meals planned: {', '.join(households) if households else 'none'}")
+            household = input("Enter household name: ").strip()
+            if household:
+                store.select_week(household=household)
+        else:
+            try:
+                store.select_week(parse_date(choice))
+            except ValueError:
+                print("Invalid choice. Please try again.")
 
-def add_meal():
-    # Allow the user to add a meal to the weekly meal plan by selecting a day, meal type (breakfast, lunch, or dinner), and then either choosing from saved recipes or entering a custom meal name. Validate all inputs and update the meal_plan dictionary accordingly, then save the changes to the data file. Provide feedback to the user confirming that the meal was added successfully.
-    print("\n=== Add/Edit a Meal ===")
+def choose_day():
+    # Let the user pick a day of the week being shown, or type any date. Returns None if they go back or enter something invalid.
+    week = store.active_week()
     print("Select a day:")
-    for i, day in enumerate(days, 1):
-        # Display the list of days with corresponding numbers for selection. The enumeration starts at 1 for user-friendly indexing when selecting a day to add or edit a meal for.
-        print(f"{i}. {day}")
+    for i, day in enumerate(week, 1):
+        # Display the days of the shown week with corresponding numbers for selection, or let the user type a date outside it.
+        print(f"{i}. {describe_day(day)}")
+    print("Or enter a date (YYYY-MM-DD)")
     print("0. Go Back")
 
-    day_choice = input("\nEnter the number corresponding to the day: ")
-    # Prompt the user to enter the number corresponding to the day they want to add or edit a meal for. This input will be validated to ensure it corresponds to a valid day in the meal plan.
-    if not day_choice.isdigit() or int(day_choice) < 1 or int(day_choice) > len(days):
+    day_choice = input("\nEnter the number corresponding to the day: ").strip()
+    if day_choice == "0":
+        return None
+    if day_choice.isdigit() and 1 <= int(day_choice) <= len(week):
+        return week[int(day_choice) - 1]
+    try:
+        return parse_date(day_choice)
+    except ValueError:
         print("Invalid choice. Please try again.")
-        return
-
-    selected_day = days[int(day_choice) - 1]
-    # Retrieve the selected day based on the user's input, adjusting for the fact that the displayed list is 1-indexed while the list itself is 0-indexed.
+        return None
 
-    print("\n1. Breakfast")
-    print("2. Lunch")
-    print("3. Dinner")
+def choose_slot(day, prompt):
+    # Let the user pick one of the configured meal slot types (Breakfast, Lunch, Dinner, ...), showing what is planned in each.
+    slot_types = store.plan.slot_types
+    for i, slot in enumerate(slot_types, 1):
+        print(f"{i}. {slot}: {store.meal_at(day, slot) or 'Not Set'}")
     print("0. Go Back")
 
-    meal_choice = input("\nEnter the number corresponding to the meal type: ")
-
+    meal_choice = input(prompt)
     if meal_choice == "0":
-        return
-    meal_types = {"1": "Breakfast", "2": "Lunch", "3": "Dinner"}
-    if meal_choice not in ["1", "2", "3"]:
+        return None
+    if not meal_choice.isdigit() or int(meal_choice) < 1 or int(meal_choice) > len(slot_types):
         print("Invalid choice. Please try again.")
+        return None
+    return slot_types[int(meal_choice) - 1]
+
+def add_meal():
+    # Allow the user to add a meal to the meal plan by selecting a day (of the shown week, or any date), a meal slot, and then either choosing from saved recipes or entering a custom meal name. Validate all inputs and record the meal in the plan store for the current household. Provide feedback to the user confirming that the meal was added successfully.
+    print("\n=== Add/Edit a Meal ===")
+    selected_day = choose_day()
+    if selected_day is None:
         return
 
-    selected_meal = meal_types[meal_choice]
+    print(f"\nMeals for {describe_day(selected_day)}:")
+    selected_meal = choose_slot(selected_day, "\nEnter the number corresponding to the meal type: ")
+    if selected_meal is None:
+        return
 
     if saved_recipes:
         # If there are saved recipes available, provide the user with the option to select from those recipes when adding a meal to the meal plan. This allows for easier meal planning by utilizing existing recipes and their associated ingredients, which can then be reflected in the grocery list.
@@ -389,61 +384,40 @@ def add_meal():
     else: 
         meal_name = input("Enter Meal Name: ")
         
-    meal_plan[selected_day][selected_meal] = meal_name
-    save_data()
-    print(f"Set {selected_meal.capitalize()} for {selected_day} to '{meal_name}' successfully!")
+    store.set_meal(selected_day, selected_meal, meal_name)
+    print(f"Set {selected_meal.capitalize()} for {describe_day(selected_day)} to '{meal_name}' successfully!")
 
 def view_grocery_list():
     # Generate and display the grocery list based on the meals planned for the week and their associated recipes. Iterate through the meal_plan to gather all ingredients from the saved recipes for the assigned meals, categorize them using the get_ingredient_category function, and organize them into a categorized grocery list. Also include any extras/spices that the user has added. Display the grocery list in a clear format, showing categories and their corresponding ingredients, along with checkboxes to indicate which items have been checked off. If no ingredients are found, inform the user accordingly.
     print("\n=== Grocery List ===")
-    categorized = {}
-
-    for day, meals in meal_plan.items():
-        for meal_type, meal_name in meals.items():
-            if meal_name and meal_name in saved_recipes:
-                for ingredient in saved_recipes[meal_name]:
-                    category = get_ingredient_category(ingredient)
-                    if category not in categorized:
-                        categorized[category] = []
-                    if ingredient not in categorized[category]:
-                        categorized[category].append(ingredient)
-                        # Categorize each ingredient from the recipes in the meal plan using the get_ingredient_category function, which checks for user overrides and keyword matches to determine the appropriate category. The categorized dictionary is structured with categories as keys and lists of corresponding ingredients as values, ensuring that each ingredient is only added once per category.
-                    
-    if not categorized and not extras_list:
+    # The grocery engine already holds the planned ingredients grouped by category (user overrides and keyword matches applied), with each ingredient listed once and its quantities summed across recipes; grocery_rows walks it in display order, the same rows an export writes.
+    if not len(grocery) and not extras_list:
         print("\nNo ingredients found! Make sure your meals have saved recipes.")
     else:
-        for category, ingredients in sorted(categorized.items()):
-            print(f"\n{category}:")
-            for ingredient in ingredients:
-                status = "✓" if ingredient in checked_off else " "
-                print(f" - [{status}] {ingredient}")
-        
-        if extras_list:
-            print("\nExtras/Spices:")
-            for item in extras_list:
-                status = "✓" if item in checked_off else " "
-                print(f" - [{status}] {item}")
+        category = None
+        for row in grocery_rows(grocery, extras_list, checked_off):
+            if row.category != category:
+                category = row.category
+                print(f"\n{category}:")
+            label = f"{row.name} ({row.amount})" if row.amount else row.name
+            print(f" - [{'✓' if row.checked else ' '}] {label}")
+
+    if store.grocery_changes.exported is not None:
+        changes = store.grocery_changes.changes()
+        # None when another household or week was exported.
+        if changes:
+            print(f"\n{len(changes)} changes since the last export (see Export Grocery List to view or export them).")
 
 def check_off_items():
     print("\n=== Check Off Items ===")
-    all_ingredients = []
-
-    for day, meals in meal_plan.items():
-        for meal_type, meal_name in meals.items():
-            if meal_name and meal_name in saved_recipes:
-                for ingredient in saved_recipes[meal_name]:
-                    if ingredient not in all_ingredients:
-                        all_ingredients.append(ingredient)
-    
-    for item in extras_list:
-        if item not in all_ingredients:
-            all_ingredients.append(item)
+    all_ingredients = list(dict.fromkeys(grocery.ingredients() + extras_list))
 
     if not all_ingredients:
         print("\nNo ingredients found!")
         return
     
     while True:
+        store.writer.poll()
         print("\nYour Grocery List: (✓ = already have it): ")
         for i, ingredient in enumerate(all_ingredients, 1):
             status = "✓" if ingredient in checked_off else " "
@@ -452,134 +426,240 @@ def check_off_items():
         print("\n0. Go Back")
         print("Enter the number corresponding to the item you want to check off: ")
         print("Type 'clear' to reset all checked off items.")
+        print("Type 'category' to check off a whole category at once.")
 
         choice = input("\nEnter your choice: ")
 
         if choice == "0":
             return
         elif choice.lower() == "clear":
-            checked_off.clear()
-            save_data()
+            store.clear_checked()
             print("All items have been unchecked.")
+        elif choice.lower() == "category":
+            check_off_category()
         elif choice.isdigit() and int(choice) in range(1, len(all_ingredients) + 1):
             item = all_ingredients[int(choice) - 1]
-            if item in checked_off:
-                checked_off.remove(item)
-                print(f"'{item}' unchecked!")
-            else: 
-                checked_off.append(item)
+            if store.toggle_checked(item):
                 print(f"'{item}' checked off!")
-            save_data()
+            else: 
+                print(f"'{item}' unchecked!")
         else:
             print("Invalid choice. Please try again.")
 
-def export_grocery_list():
-    print("\n=== Export Grocery List ===")
-    categorized = {}
-
-    for day, meals in meal_plan.items():
-        for meal_type, meal_name in meals.items():
-            if meal_name and meal_name in saved_recipes:
-                for ingredient in saved_recipes[meal_name]:
-                    category = get_ingredient_category(ingredient)
-                    if category not in categorized:
-                        categorized[category] = []
-                    if ingredient not in categorized[category]:
-                        categorized[category].append(ingredient)
-    if not categorized and not extras_list:
-        print("\nNo ingredients found! Make sure your meals have saved recipes.")
+def check_off_category():
+    # Check off every item in one grocery list category (or all extras) in a single step, saving once for the whole batch instead of once per item.
+    category_list = [category for category, ingredients in grocery.categorized()]
+    if extras_list:
+        category_list.append("Extras/Spices")
+    if not category_list:
+        print("\nNo ingredients found!")
         return
-    
-    filename = input("Enter filename to export to (e.g. 'grocery_list.txt'): ")
+
+    print("\nSelect a category to check off:")
+    for i, category in enumerate(category_list, 1):
+        print(f"  {i}. {category}")
+    print("0. Go Back")
+
+    cat_choice = input("\nEnter your choice: ")
+    if cat_choice == "0":
+        return
+    if not cat_choice.isdigit() or int(cat_choice) < 1 or int(cat_choice) > len(category_list):
+        print("Invalid choice. Please try again.")
+        return
+
+    selected_category = category_list[int(cat_choice) - 1]
+    if selected_category == "Extras/Spices":
+        items = extras_list
+    else:
+        items = grocery.in_category(selected_category)
+    store.check(items)
+    print(f"All items in '{selected_category}' checked off!")
+
+def other_export_note():
+    exported = store.grocery_changes.exported
+    return f"(The last export was {exported['household']}'s list for the week of {exported['week']}.)"
+
+def view_changes():
+    # Show what was added to, removed from or changed on the grocery list since it was last exported, so a shopper holding the printout only reads the difference.
+    print("\n=== Changes Since Last Export ===")
+    if store.grocery_changes.exported is None:
+        print("\nThe grocery list hasn't been exported yet.")
+        return
+    changes = store.grocery_changes.changes()
+    if changes is None:
+        print(f"\nThis week's list hasn't been exported. {other_export_note()}")
+        return
+    if not changes:
+        print(f"\nNothing changed since the export of {store.grocery_changes.exported['at']}.")
+        return
+    for line in format_patch(changes, store.grocery_changes.exported):
+        print(line)
+
+def choose_export_file(default, formats=True):
+    # With formats, the extension picks the format (.txt, .csv, .json, .md or .html); anything else gets .txt.
+    if formats:
+        print(f"Formats: {', '.join(sorted(WRITERS))}")
+    filename = input(f"Enter filename to export to (e.g. '{default}'): ")
     if filename.strip() == "":
-        print("Defaulting to 'grocery_list.txt'")
-        filename = "grocery_list.txt"
+        print(f"Defaulting to '{default}'")
+        filename = default
     filename = filename.strip().replace(" ", "_").replace("/", "-").replace("\\", "-").replace(":", "-")
-    if not filename.endswith(".txt"):
+    if not formats and not filename.endswith(".txt") or formats and writer_for(filename) is None:
         filename += ".txt"
-    filepath = os.path.join(BASE_DIR, filename)
+    return filename, os.path.join(BASE_DIR, filename)
 
-    with open(filepath, "w",encoding="utf-8") as f:
-        f.write("==== Grocery List ====\n")
-        f.write(f"Generated on: {__import__('datetime').datetime.now().strftime('%B %d, %Y')}\n")
-        f.write("=" * 30 + "\n")
+def export_grocery_list():
+    print("\n=== Export Grocery List ===")
+    print("1. Export the full list")
+    print("2. Export only the changes since the last export")
+    print("3. View the changes since the last export")
+    print("4. Batch export several weeks and households")
+    print("0. Go Back")
+    choice = input("\nEnter your choice: ")
+    if choice == "2":
+        export_changes()
+        return
+    if choice == "3":
+        view_changes()
+        return
+    if choice == "4":
+        export_batch_lists()
+        return
+    if choice != "1":
+        if choice != "0":
+            print("Invalid choice. Please try again.")
+        return
 
-        for category, ingredients in sorted(categorized.items()):
-            f.write(f"\n{category}:\n")
-            for ingredient in ingredients:
-                status = "✓" if ingredient in checked_off else " "
-                f.write(f" - [{status}] {ingredient}\n")
-        
-        if extras_list:
-            f.write("\nExtras/Spices:\n")
-            for item in extras_list:
-                status = "✓" if item in checked_off else " "
-                f.write(f" - [{status}] {item}\n")
+    if not len(grocery) and not extras_list:
+        print("\nNo ingredients found! Make sure your meals have saved recipes.")
+        return
+    
+    filename, filepath = choose_export_file("grocery_list.txt")
+    export_rows(filepath, grocery_rows(grocery, extras_list, checked_off))
+    # The rows are streamed from the grocery engine straight into the file, in the format the extension names.
 
+    store.mark_exported()
+    # Later changes are reported against this export.
     print(f"Grocery list exported successfully to '{filename}'!")
     print(f"Saved to: {filepath}")
+
+def export_changes():
+    # Export a compact patch (one "+", "-" or "~" line per changed item) instead of the whole list.
+    if store.grocery_changes.exported is None:
+        print("\nThe grocery list hasn't been exported yet; export the full list first.")
+        return
+    changes = store.grocery_changes.changes()
+    if changes is None:
+        print(f"\nThis week's list hasn't been exported; export the full list first. {other_export_note()}")
+        return
+    if not changes:
+        print(f"\nNothing changed since the export of {store.grocery_changes.exported['at']}.")
+        return
+
+    filename, filepath = choose_export_file("grocery_changes.txt", formats=False)
+    with open(filepath, "w", encoding="utf-8") as f:
+        f.write("\n".join(format_patch(changes, store.grocery_changes.exported)) + "\n")
+
+    store.mark_exported()
+    print(f"{len(changes)} changes exported successfully to '{filename}'!")
+    print(f"Saved to: {filepath}")
+
+def export_batch_lists():
+    # Export the grocery lists of several consecutive weeks for one or more households in one go, one file per household and week.
+    households = input(f"Enter households, separated by commas (Enter for '{store.current_household}'): ")
+    households = [household.strip() for household in households.split(",") if household.strip()] or [store.current_household]
+    start = input("Enter the first week as any date in it (YYYY-MM-DD, Enter for the week being shown): ").strip()
+    try:
+        start = parse_date(start) if start else store.current_week
+    except ValueError:
+        print("Invalid date. Please try again.")
+        return
+    weeks = input("How many weeks? ")
+    if not weeks.isdigit() or int(weeks) < 1:
+        print("Invalid number. Please try again.")
+        return
+    extension = input(f"Format ({', '.join(sorted(WRITERS))}, Enter for .txt): ").strip().lower() or ".txt"
+    if not extension.startswith("."):
+        extension = "." + extension
+    if extension not in WRITERS:
+        print("Unknown format. Please try again.")
+        return
+    results = export_batch(store.grocery_lists(households, start, int(weeks)), BASE_DIR, extension)
+    for path, count in results:
+        print(f" - {os.path.basename(path)}: {count} items")
+    print(f"Exported {len(results)} grocery lists to {BASE_DIR}")
+
 def clear_meal_plan():
-    global meal_plan
-    print("\nAre you sure you want to clear the weekly meal plan? This action cannot be undone. (yes/no)")
+    print(f"\nAre you sure you want to clear the meal plan for the week of {store.current_week.isoformat()}? This action cannot be undone. (yes/no)")
     choice = input().lower()
     if choice == "yes":
-        meal_plan = {day: { "Breakfast": None, "Lunch": None, "Dinner": None} for day in days}
-        save_data()
+        store.clear_meal_plan()
         print("Weekly meal plan cleared successfully!")
     else:
         print("Clear action cancelled.")
 
 def delete_meal():
     print("\n=== Delete a Meal ===")
-    print("Select a day:")
-    for i, day in enumerate(days, 1):
-        print(f"{i}. {day}")
-    print("0. Go Back")
-
-    day_choice = input("\nEnter the number corresponding to the day: ")
-
-    if day_choice == "0":
+    selected_day = choose_day()
+    if selected_day is None:
         return
-    if not day_choice.isdigit() or int(day_choice) < 1 or int(day_choice) > len(days):
-        print("Invalid choice. Please try again.")
-        return
-    selected_day = days[int(day_choice) - 1]
-
-    print(f"\nCurrent meals for {selected_day}:")
-    print(f"1. Breakfast: {meal_plan[selected_day]['Breakfast'] or 'Not Set'}")
-    print(f"2. Lunch: {meal_plan[selected_day]['Lunch'] or 'Not Set'}")
-    print(f"3. Dinner: {meal_plan[selected_day]['Dinner'] or 'Not Set'}")
-    print("0. Go Back")
 
-    meal_choice = input("\nEnter the number corresponding to the meal to delete: ")
-    if meal_choice == "0":
-        return
-    meal_types = {"1": "Breakfast", "2": "Lunch", "3": "Dinner"}
-    if meal_choice not in meal_types:
-        print("Invalid choice. Please try again.")
+    print(f"\nCurrent meals for {describe_day(selected_day)}:")
+    selected_meal = choose_slot(selected_day, "\nEnter the number corresponding to the meal to delete: ")
+    if selected_meal is None:
         return
     
-    selected_meal = meal_types[meal_choice]
-    
-    if meal_plan[selected_day][selected_meal] is None:
-        print(f"{selected_meal.capitalize()} for {selected_day} is already empty!")
+    if store.meal_at(selected_day, selected_meal) is None:
+        print(f"{selected_meal.capitalize()} for {describe_day(selected_day)} is already empty!")
         return
     
-    confirm = input(f"Are you sure you want to delete {selected_meal} for {selected_day}? (yes/no): ").lower()
+    confirm = input(f"Are you sure you want to delete {selected_meal} for {describe_day(selected_day)}? (yes/no): ").lower()
     if confirm == "yes":
-        meal_plan[selected_day][selected_meal] = None
-        save_data()
-        print(f"{selected_meal.capitalize()} for {selected_day} deleted successfully!")
+        store.set_meal(selected_day, selected_meal, None)
+        print(f"{selected_meal.capitalize()} for {describe_day(selected_day)} deleted successfully!")
     else:
         print("Delete action cancelled.")
 
+def find_recipes():
+    # Reverse lookups through the ingredient index: recipes using given ingredients, or recipes ranked by how much of them is already checked off or in the extras.
+    print("\n=== Find Recipes ===")
+    print("1. Recipes using ingredients")
+    print("2. What can I make? (from checked off items and extras)")
+    print("0. Go Back")
+
+    choice = input("\nEnter your choice: ")
+    if choice == "1":
+        query = input("Enter ingredients (e.g. 'avocado and rice or beef'): ")
+        if query.strip() == "":
+            print("No ingredients entered.")
+            return
+        matches = store.find_recipes(query)
+        if not matches:
+            print("\nNo recipes found.")
+            return
+        print(f"\nRecipes matching '{query}':")
+        for name in matches:
+            print(f" - {name}")
+    elif choice == "2":
+        matches = store.pantry_matches()
+        if not matches:
+            print("\nNothing matches yet. Check off items you already have or add extras first.")
+            return
+        print("\nBest matches:")
+        for name, fraction, missing in matches:
+            print(f" - {name}: {fraction:.0%} covered" + (f" (missing: {', '.join(missing)})" if missing else ""))
+    elif choice != "0":
+        print("Invalid choice. Please try again.")
+
 def main():
     load_data()
     while True:
+        store.commit()
+        # Anything changed by the previous menu action is written once here, however many individual edits it made.
         print("\n======Grocery-Meal-Planner======")
         print("Welcome to the Grocery Meal Planner!")
         print("This program will help you plan your grocery shopping and meals for the week.")
-        print("1. View Weekly Meal Plan")
+        print("1. View Meal Plan")
         print("2. Add a Meal to the Meal Plan")
         print("3. Delete a Meal from the Meal Plan")
         print("4. View Saved Recipes")
@@ -591,9 +671,10 @@ def main():
         print("10. Manage Extras/Spices")
         print("11. Override Ingredient Category")
         print("12. Clear Weekly Plan")
-        print("13. Exit")
+        print("13. Find Recipes by Ingredient")
+        print("14. Exit")
 
-        choice = input("\nPlease enter your choice (1-13): ")
+        choice = input("\nPlease enter your choice (1-14): ")
 
         if choice == "1":
             view_meal_plan()
@@ -620,8 +701,11 @@ def main():
         elif choice == "12":
             clear_meal_plan()
         elif choice == "13":
+            find_recipes()
+        elif choice == "14":
             confirm = input("Are you sure you want to exit? (yes/no): ")
             if confirm.lower() == "yes":
+                print(store.close())
                 print("Goodbye!")
                 break
             else:
@@ -629,4 +713,8 @@ def main():
         else:
             print("Invalid choice. Please try again.")
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Any arguments run a headless command instead of the menu (see cli.py).
+        sys.exit(cli.run(sys.argv[1:]))
+    main()
@@ -0,0 +1,49 @@
+from array import array
+# Substring search over a sorted list of names (recipe names for the search boxes in app.py).
+#
+# Names are sorted once, and every trigram of every lower-cased name maps to the ascending positions of the names that
+# contain it. A query of three or more characters only looks at the names in its rarest trigram's posting list and
+# confirms the substring on those; shorter queries scan. When a query extends the previous one, its matches can
+# only be among the previous matches, so those are searched instead of the whole list.
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class NameIndex:
+
+    def __init__(self, names=()):
+        self.set_names(names)
+
+    def set_names(self, names):
+        self.names = sorted(names)
+        self.lowered = [name.lower() for name in self.names]
+        self.postings = {}
+        for position, name in enumerate(self.lowered):
+            for trigram in trigrams(name):
+                self.postings.setdefault(trigram, array("I")).append(position)
+        self.last_query = ""
+        self.last_result = list(range(len(self.names)))
+
+    def search(self, query):
+        # Positions (ascending) of the names containing query, case-insensitively.
+        query = query.lower()
+        if self.last_query and self.last_query in query:
+            candidates = self.last_result
+        else:
+            candidates = None
+        if len(query) >= 3:
+            postings = sorted((self.postings.get(trigram, ()) for trigram in trigrams(query)), key=len)
+            if candidates is None or len(postings[0]) < len(candidates):
+                candidates = postings[0]
+        if candidates is None:
+            candidates = range(len(self.names))
+        lowered = self.lowered
+        result = [position for position in candidates if query in lowered[position]]
+        self.last_query, self.last_result = query, result
+        return result
+
+    def matching(self, query):
+        names = self.names
+        return [names[position] for position in self.search(query)]
@@ -0,0 +1,170 @@
+import re
+from typing import NamedTuple
+from categories import categories
+from units import ALIASES
+# Ingredient normalization and canonicalization. Recipes keep the ingredient text as the user typed it; the grocery list
+# and category overrides work on a canonical name instead, so "Bananas", "bannana" and "2 bananas" are one item.
+#
+# normalize() turns free text into a lookup key: quantity prefixes ("1tsp salt", "160 grams of ...") are stripped,
+# whitespace collapsed, case folded and the last word made singular. A key that is one of the keywords in categories.py
+# takes the keyword's name; anything else is named after the key itself. Misspellings ("Zuchinni") are not merged into
+# the word they resemble, because real ingredients are often just as close ("Batter"/"Butter").
+# parse_ingredient() also keeps the amount and unit, so the grocery list can add up "2 eggs" and "3 eggs".
+
+_NUMBER = r"(?:\d+\s+\d+/\d+|\d+(?:[.,/]\d+)?|[½⅓⅔¼¾⅛])"
+_UNIT = "|".join(re.escape(spelling) for spelling in sorted(ALIASES, key=len, reverse=True))
+_QUANTITY = re.compile(
+    rf"^\s*(?P<amount>{_NUMBER})(?:\s*-\s*(?P<upper>{_NUMBER}))?\s*(?:(?P<unit>{_UNIT})\b\.?)?\s*(?:of\s+)?",
+    re.IGNORECASE)
+# A leading amount ("2", "1/2", "1 1/2", "2-3", "½"), an optional unit (see units.py) and an optional "of".
+
+_WORD_PARTS = re.compile(r"[^/&-]+")
+
+_FRACTIONS = {"½": 0.5, "⅓": 1 / 3, "⅔": 2 / 3, "¼": 0.25, "¾": 0.75, "⅛": 0.125}
+
+_IRREGULAR = {"leaves": "leaf", "loaves": "loaf", "halves": "half", "knives": "knife",
+              "cookies": "cookie", "brownies": "brownie", "smoothies": "smoothie", "veggies": "veggie", "hoagies": "hoagie"}
+# Including the "-ie" words the "-ies" -> "-y" rule would turn into "cooky".
+
+
+def singular(word):
+    if not any(c.isalpha() for c in word):
+        return word
+    if word in _IRREGULAR:
+        return _IRREGULAR[word]
+    if len(word) <= 3 or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "sses", "xes", "zes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def leading_amount(text):
+    # The _QUANTITY match at the start of text, or None if there is none or it isn't followed by a word: "100%", "1% milk"
+    # and "7-Up" keep their numbers.
+    match = _QUANTITY.match(text)
+    if match is None or not text[match.end():].lstrip()[:1].isalnum():
+        return None
+    return match
+
+
+def strip_quantity(text):
+    # Remove every leading amount/unit, e.g. "160 grams of 93/7 ground beef" -> "ground beef".
+    while True:
+        match = leading_amount(text)
+        if match is None:
+            return text.strip()
+        text = text[match.end():]
+
+
+def normalize(text):
+    # Lookup key for an ingredient: no quantity, single spaces, lower case, last word singular.
+    words = strip_quantity(" ".join(text.split())).strip(" ,.;:").lower().split()
+    if not words:
+        return ""
+    words[-1] = singular(words[-1])
+    return " ".join(words)
+
+
+def capitalize(word):
+    # Capitalize each part of a word joined by "/", "-" or "&": "turkey/ground" -> "Turkey/Ground", "7-up" -> "7-Up".
+    return _WORD_PARTS.sub(lambda part: part[0][:1].upper() + part[0][1:], word)
+
+
+class Canonicalizer:
+
+    def __init__(self, vocabulary):
+        # Key -> display name for every known keyword. Where singular and plural are both listed, the singular wins.
+        self.known = {}
+        for word in vocabulary:
+            key = normalize(word)
+            if key not in self.known or word == key:
+                self.known[key] = word.title()
+        self.last_words = {}
+        # Last word of a key -> how the keywords display it ("pea" -> "Peas", "chip" -> "Chips"), so names outside the
+        # vocabulary end the same way as the keywords they share it with. One-word keywords win.
+        for key, name in self.known.items():
+            if " " not in key or key.split()[-1] not in self.last_words:
+                self.last_words[key.split()[-1]] = name.split()[-1]
+        self.cache = {}
+
+    def display(self, key):
+        # A key outside the vocabulary in capitalized words, its last word shown the way the keywords show it.
+        words = key.split()
+        if words and words[-1] in self.last_words:
+            return " ".join([capitalize(word) for word in words[:-1]] + [self.last_words[words[-1]]])
+        return " ".join(capitalize(word) for word in words)
+
+    def canonical(self, text):
+        # Canonical name: the matching keyword, or for anything outside the vocabulary the key itself in capitalized
+        # words, so "Oyster Shells" and "oyster shell" still merge. Depends only on the text, never on what came before.
+        name = self.cache.get(text)
+        if name is None:
+            key = normalize(text)
+            name = self.known.get(key) or self.display(key) or text
+            self.cache[text] = name
+        return name
+
+
+canonicalizer = Canonicalizer(keyword for keywords in categories.values() for keyword in keywords)
+
+
+def canonical_name(text):
+    return canonicalizer.canonical(text)
+
+
+def parse_number(text):
+    if text in _FRACTIONS:
+        return _FRACTIONS[text]
+    if " " in text:
+        whole, fraction = text.split()
+        return int(whole) + parse_number(fraction)
+    if "/" in text:
+        numerator, denominator = text.split("/")
+        return int(numerator) / int(denominator) if int(denominator) else None
+    return float(text.replace(",", "."))
+
+
+class ParsedIngredient(NamedTuple):
+    quantity: float | None
+    # None when no amount was given ("Eggs", "Salt to taste").
+    unit: str | None
+    # A unit from units.UNITS, "" for a plain count, None when there is no quantity.
+    name: str
+    # The canonical name.
+
+
+_parsed = {}
+# Parse results per distinct ingredient string; recipes repeat the same strings, so re-rendering a plan never re-parses.
+
+
+def parse_ingredient(text):
+    # "1 1/2 cups flour" -> ParsedIngredient(1.5, "cup", "Flour"). A range ("2-3 eggs") counts as its upper bound.
+    parsed = _parsed.get(text)
+    if parsed is None:
+        quantity = unit = None
+        match = leading_amount(" ".join(text.split()))
+        if match:
+            quantity = parse_number(match["upper"] or match["amount"])
+            if quantity is not None:
+                unit = ALIASES[match["unit"].lower()] if match["unit"] else ""
+        parsed = ParsedIngredient(quantity, unit, canonical_name(text))
+        _parsed[text] = parsed
+    return parsed
+
+
+def remember_parsed(text, parsed):
+    # Take a parse result worked out in another process (see recipe_import.py), so this one never parses the text again.
+    if text not in _parsed:
+        _parsed[text] = parsed
+        canonicalizer.cache.setdefault(text, parsed.name)
+
+
+def clear_caches():
+    # Forget every parse and canonical name worked out so far (for benchmarks).
+    _parsed.clear()
+    canonicalizer.cache.clear()
@@ -0,0 +1,158 @@
+import atexit
+import json
+import os
+import shutil
+import tempfile
+import time
+# Persistence helpers shared by the CLI (main.py) and the GUI (app.py).
+
+BACKUP_GENERATIONS = 3
+# How many previous versions of the data file are kept next to it (data.json.1 is the newest).
+
+
+def backup_paths(path, generations=BACKUP_GENERATIONS):
+    return [f"{path}.{i}" for i in range(1, generations + 1)]
+
+
+def _fsync_directory(directory):
+    # Make the rename itself durable. Not every platform lets you open a directory, so this is best effort.
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _rotate_backups(path, generations):
+    # Shift data.json.1 -> .2 -> ... and keep the current file as .1. A hard link keeps data.json in place the whole time.
+    if not os.path.exists(path) or generations < 1:
+        return
+    backups = backup_paths(path, generations)
+    for older, newer in zip(reversed(backups[1:]), reversed(backups[:-1])):
+        if os.path.exists(newer):
+            os.replace(newer, older)
+    if os.path.exists(backups[0]):
+        os.remove(backups[0])
+    try:
+        os.link(path, backups[0])
+    except OSError:
+        shutil.copyfile(path, backups[0])
+
+
+def atomic_write_json(path, data, generations=BACKUP_GENERATIONS):
+    # Crash-safe replacement for open(path, "w") + json.dump: write a temp file in the same directory, fsync it,
+    # rotate the backups, then os.replace it over the real file. A reader only ever sees the old or the new file, never a truncated one.
+    atomic_write_text(path, json.dumps(data, indent=4), generations)
+
+
+def atomic_write_text(path, text, generations=BACKUP_GENERATIONS):
+    # Same as atomic_write_json for text that was already serialized, e.g. on another thread.
+    atomic_write_bytes(path, text.encode("utf-8"), generations)
+
+
+def atomic_write_bytes(path, content, generations=BACKUP_GENERATIONS):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        _rotate_backups(path, generations)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _fsync_directory(directory)
+
+
+def read_json_with_backups(path, generations=BACKUP_GENERATIONS):
+    # Return (data, source_path) from the newest generation that parses, or (None, None) when no data file exists yet.
+    # If every existing generation is unreadable the last error is raised.
+    error = None
+    for candidate in [path] + backup_paths(path, generations):
+        if not os.path.exists(candidate):
+            continue
+        try:
+            with open(candidate, "r", encoding="utf-8") as f:
+                return json.load(f), candidate
+        except (ValueError, OSError) as e:
+            error = e
+    if error is not None:
+        raise error
+    return None, None
+
+
+class WriteCoalescer:
+    # Turns save requests into "mark dirty" and writes the data file at most once per burst of changes.
+    # A flush happens when the debounce delay passes, on an explicit commit(), or at interpreter exit.
+    # The GUI plugs in Tk's after/after_cancel as the timer so writes stay on the main loop; the CLI has no event loop,
+    # so it commits when returning to the main menu and calls poll() inside long-running sub-menus.
+
+    def __init__(self, write, delay=2.0, max_wait=10.0):
+        self.write = write
+        self.delay = delay
+        self.max_wait = max_wait
+        self.schedule = None
+        self.cancel = None
+        self.timer = None
+        self.dirty_since = None
+        self.deadline = None
+        self.requested = 0
+        self.written = 0
+        atexit.register(self.close)
+
+    def use_scheduler(self, schedule, cancel):
+        # schedule(ms, callback) -> handle and cancel(handle), e.g. root.after and root.after_cancel.
+        self.schedule = schedule
+        self.cancel = cancel
+
+    def mark_dirty(self):
+        now = time.monotonic()
+        self.requested += 1
+        if self.dirty_since is None:
+            self.dirty_since = now
+        # Debounce: every change pushes the deadline back, but never past max_wait after the first unsaved change.
+        self.deadline = min(now + self.delay, self.dirty_since + self.max_wait)
+        if self.schedule is not None:
+            self._cancel_timer()
+            self.timer = self.schedule(max(0, int((self.deadline - now) * 1000)), self.commit)
+
+    def poll(self):
+        # Flush if the debounce deadline has passed. For callers without a timer.
+        if self.dirty_since is not None and time.monotonic() >= self.deadline:
+            self.commit()
+
+    def commit(self):
+        # Write now if anything changed since the last write.
+        self._cancel_timer()
+        if self.dirty_since is None:
+            return
+        self.dirty_since = None
+        self.deadline = None
+        self.write()
+        self.written += 1
+
+    def close(self):
+        # Final flush; after this the coalescer no longer uses the scheduler (its event loop may be gone).
+        self.commit()
+        self.schedule = None
+        self.cancel = None
+
+    @property
+    def avoided(self):
+        return self.requested - self.written - (1 if self.dirty_since is not None else 0)
+
+    def stats(self):
+        return f"{self.requested} changes saved in {self.written} writes ({self.avoided} writes avoided)"
+
+    def _cancel_timer(self):
+        if self.timer is not None and self.cancel is not None:
+            self.cancel(self.timer)
+        self.timer = None
@@ -0,0 +1,132 @@
+import bisect
+from datetime import date, timedelta
+# The meal plan: a sparse store of planned meals keyed by (household, date, slot). Only filled slots are stored, so
+# planning months ahead for many households costs nothing for the days and households that are empty.
+#
+# Per household, meals are kept as date -> {slot: meal} plus a sorted list of the dates that have any meal, so a range
+# query ("the week of D", "the next 14 days") bisects to its first date and only visits the dates inside the range.
+# Dates are datetime.date objects in memory and ISO strings ("2024-05-13") on disk.
+
+DEFAULT_HOUSEHOLD = "Home"
+DEFAULT_SLOT_TYPES = ["Breakfast", "Lunch", "Dinner"]
+
+days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def week_start(day):
+    # The Monday of the week containing day.
+    return day - timedelta(days=day.weekday())
+
+
+def week_dates(day):
+    start = week_start(day)
+    return [start + timedelta(days=i) for i in range(7)]
+
+
+def legacy_date(day_name, week):
+    # Plans from before schema version 4 only knew weekday names; they are placed on a fixed week (its Monday), which
+    # store.migrate picks once and keeps, so loading the same data next week doesn't move them.
+    return week + timedelta(days=days.index(day_name))
+
+
+def parse_date(text):
+    # Accepts an ISO date ("2024-05-13"), "today", "tomorrow" or a weekday name (that day in the current week).
+    text = text.strip()
+    if text.lower() == "today":
+        return date.today()
+    if text.lower() == "tomorrow":
+        return date.today() + timedelta(days=1)
+    if text.capitalize() in days:
+        return legacy_date(text.capitalize(), week_start(date.today()))
+    return date.fromisoformat(text)
+
+
+class PlanStore:
+
+    def __init__(self, slot_types=None):
+        self.slot_types = list(slot_types or DEFAULT_SLOT_TYPES)
+        self.households = {}
+        # Household -> date -> {slot: meal}.
+        self.dates = {}
+        # Household -> sorted list of the dates that have at least one meal.
+        self.size = 0
+
+    def clear(self):
+        self.households.clear()
+        self.dates.clear()
+        self.size = 0
+
+    def load(self, plans, slot_types=None):
+        # Replace the contents with the on-disk shape: {household: {"2024-05-13": {slot: meal}}}.
+        self.clear()
+        if slot_types:
+            self.slot_types[:] = slot_types
+        for household, by_date in plans.items():
+            for day, meals in by_date.items():
+                for slot, meal in meals.items():
+                    self.set(household, date.fromisoformat(day), slot, meal)
+
+    def to_dict(self):
+        return {household: {day.isoformat(): dict(by_date[day]) for day in self.dates[household]}
+                for household, by_date in self.households.items()}
+
+    def add_slot_type(self, slot):
+        if slot not in self.slot_types:
+            self.slot_types.append(slot)
+
+    def get(self, household, day, slot):
+        return self.households.get(household, {}).get(day, {}).get(slot)
+
+    def set(self, household, day, slot, meal):
+        # Plan meal in a slot, or empty it when meal is None. Returns the meal that was there before.
+        by_date = self.households.setdefault(household, {})
+        meals = by_date.get(day)
+        old = meals.get(slot) if meals is not None else None
+        if meal is None:
+            if old is None:
+                return None
+            del meals[slot]
+            self.size -= 1
+            if not meals:
+                del by_date[day]
+                dates = self.dates[household]
+                del dates[bisect.bisect_left(dates, day)]
+            return old
+        if meals is None:
+            meals = by_date[day] = {}
+            bisect.insort(self.dates.setdefault(household, []), day)
+        if old is None:
+            self.size += 1
+        meals[slot] = meal
+        return old
+
+    def range(self, household, start, end):
+        # (date, slot, meal) for every meal with start <= date < end, in date order and slot order within a day.
+        dates = self.dates.get(household, [])
+        by_date = self.households.get(household, {})
+        order = {slot: i for i, slot in enumerate(self.slot_types)}
+        for i in range(bisect.bisect_left(dates, start), bisect.bisect_left(dates, end)):
+            meals = by_date[dates[i]]
+            for slot in sorted(meals, key=lambda slot: order.get(slot, len(order))):
+                yield dates[i], slot, meals[slot]
+
+    def week(self, household, day):
+        start = week_start(day)
+        return self.range(household, start, start + timedelta(days=7))
+
+    def upcoming(self, household, day, count):
+        # The next count days starting at day, e.g. "the next 14 days".
+        return self.range(household, day, day + timedelta(days=count))
+
+    def clear_range(self, household, start, end):
+        # Empty every slot with start <= date < end; returns the removed (date, slot, meal) entries.
+        removed = list(self.range(household, start, end))
+        for day, slot, _ in removed:
+            self.set(household, day, slot, None)
+        return removed
+
+    def household_names(self):
+        return sorted(household for household, dates in self.dates.items() if dates)
+
+    def __len__(self):
+        return self.size
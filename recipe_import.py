@@ -0,0 +1,182 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+import store
+from categories import category_cache
+from normalize import parse_ingredient, remember_parsed
+# Bulk recipe import from recipe dumps, one recipe per record:
+#
+#   .csv              name,ingredients    the ingredients field is comma separated, as typed into add_recipe; a header
+#                                         row naming the two columns is optional
+#   .jsonl / .ndjson  {"name": "Tacos", "ingredients": ["1 lb ground beef", "8 tortillas"]}  (or one comma separated string)
+#   anything else     Tacos: 1 lb ground beef, 8 tortillas
+#
+# Parsing the records and normalizing every ingredient (quantity, unit and canonical name, see normalize.py) is the
+# expensive part, so large files are split into chunks that worker processes parse in parallel. The main process then
+# seeds its caches with their results, classifies all new canonical ingredients in one batch, and adds the recipes
+# through store.set_recipes, leaving a single commit for the whole file.
+#
+# Names are checked against the library and against earlier records the way add_recipe and the rename in edit_recipe
+# check them: exact, case-sensitive matches. A duplicate is skipped and reported unless replace is set.
+
+CHUNK_RECORDS = 2_000
+PARALLEL_THRESHOLD = 5_000
+# Files with at least this many records are parsed in a process pool; below it the pool start-up costs more than it saves.
+
+
+class ImportResult(NamedTuple):
+    added: int
+    replaced: int
+    duplicates: list
+    # (line, name) for every record skipped because the name was taken.
+    errors: list
+    # (line, message) for every record that couldn't be imported.
+    unclassified: int
+    # New canonical ingredients that matched no category ("Other").
+    seconds: float
+
+    @property
+    def rate(self):
+        # Imported recipes per second.
+        return (self.added + self.replaced) / self.seconds if self.seconds else 0.0
+
+
+def file_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    return "lines"
+
+
+def read_records(f, format):
+    # (line number, record) for every non-blank record: a CSV row (list of fields) or a raw text line.
+    if format == "csv":
+        rows = csv.reader(f)
+        for row in rows:
+            if row and "".join(row).strip():
+                yield rows.line_num, row
+        return
+    for number, line in enumerate(f, 1):
+        if line.strip() and not (format == "lines" and line.lstrip().startswith("#")):
+            yield number, line
+
+
+def split_ingredients(text):
+    # The same splitting as add_recipe: commas, surrounding whitespace and empty entries dropped.
+    return [i.strip() for i in text.split(",") if i.strip() != ""]
+
+
+def parse_record(format, record, columns=(0, 1)):
+    # (name, ingredients) for one record; raises ValueError with a message for the user if it is malformed.
+    if format == "csv":
+        if len(record) <= max(columns):
+            raise ValueError("expected name,ingredients")
+        name, ingredients = record[columns[0]], split_ingredients(record[columns[1]])
+    elif format == "jsonl":
+        try:
+            value = json.loads(record)
+        except ValueError:
+            raise ValueError("invalid JSON") from None
+        if not isinstance(value, dict) or not isinstance(value.get("name"), str):
+            raise ValueError('expected {"name": ..., "ingredients": [...]}')
+        name, ingredients = value["name"], value.get("ingredients")
+        if isinstance(ingredients, str):
+            ingredients = split_ingredients(ingredients)
+        elif isinstance(ingredients, list) and all(isinstance(i, str) for i in ingredients):
+            ingredients = [i.strip() for i in ingredients if i.strip() != ""]
+        else:
+            raise ValueError("ingredients must be a list of strings or a comma separated string")
+    else:
+        name, separator, ingredients = record.partition(":")
+        if not separator:
+            raise ValueError("expected 'Name: ingredient, ingredient, ...'")
+        ingredients = split_ingredients(ingredients)
+    name = name.strip()
+    if name == "":
+        raise ValueError("recipe name cannot be empty")
+    if not ingredients:
+        raise ValueError(f"'{name}' has no ingredients")
+    return name, ingredients
+
+
+def _parse_chunk(format, records, columns):
+    # Worker side: parse a chunk of records and normalize their ingredients. Returns ([(line, name, ingredients)],
+    # {ingredient: ParsedIngredient} for every distinct ingredient text in the chunk, [(line, message)]).
+    recipes = []
+    parsed = {}
+    errors = []
+    for number, record in records:
+        try:
+            name, ingredients = parse_record(format, record, columns)
+        except ValueError as e:
+            errors.append((number, str(e)))
+            continue
+        recipes.append((number, name, ingredients))
+        for ingredient in ingredients:
+            if ingredient not in parsed:
+                parsed[ingredient] = parse_ingredient(ingredient)
+    return recipes, parsed, errors
+
+
+def _csv_columns(records):
+    # Column positions of name and ingredients, from a header row if the file starts with one (which is then dropped).
+    if records and records[0][1] and records[0][1][0].strip().lower() == "name":
+        header = [field.strip().lower() for field in records.pop(0)[1]]
+        return header.index("name"), header.index("ingredients") if "ingredients" in header else 1
+    return 0, 1
+
+
+def parse_file(f, format, workers=None, threshold=PARALLEL_THRESHOLD):
+    # Parse every record, in parallel for large files. Yields _parse_chunk's results per chunk, in file order.
+    records = list(read_records(f, format))
+    columns = _csv_columns(records) if format == "csv" else (0, 1)
+    chunks = [records[i:i + CHUNK_RECORDS] for i in range(0, len(records), CHUNK_RECORDS)]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(records) >= threshold:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(_parse_chunk, [format] * len(chunks), chunks, [columns] * len(chunks))
+    else:
+        for chunk in chunks:
+            yield _parse_chunk(format, chunk, columns)
+
+
+def import_recipes(f, format, replace=False, workers=None, threshold=PARALLEL_THRESHOLD):
+    # Import the recipes in an open file. The caller commits (store.commit) once it is done.
+    start = time.perf_counter()
+    parsed = []
+    errors = []
+    for recipes, ingredient_parses, chunk_errors in parse_file(f, format, workers, threshold):
+        parsed += recipes
+        errors += chunk_errors
+        for ingredient, result in ingredient_parses.items():
+            remember_parsed(ingredient, result)
+
+    duplicates = []
+    accepted = []
+    seen = set()
+    for number, name, ingredients in parsed:
+        if name in seen or (name in store.saved_recipes and not replace):
+            duplicates.append((number, name))
+            continue
+        seen.add(name)
+        accepted.append((name, ingredients))
+
+    # Classify every canonical ingredient the category cache doesn't know yet in one classify_many call, so adding the
+    # recipes (and the grocery list picking them up) only hits the cache.
+    canonical = dict.fromkeys(parse_ingredient(ingredient).name for _, ingredients in accepted for ingredient in ingredients)
+    new = [name for name in canonical if name not in category_cache.entries]
+    unclassified = sum(1 for category in category_cache.get_many(new, store.category_overrides) if category == "Other")
+
+    replaced = sum(1 for name, _ in accepted if name in store.saved_recipes)
+    store.set_recipes(accepted)
+    return ImportResult(len(accepted) - replaced, replaced, duplicates, errors, unclassified, time.perf_counter() - start)
+
+
+def import_file(path, replace=False, workers=None):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return import_recipes(f, file_format(path), replace, workers)
@@ -0,0 +1,127 @@
+import heapq
+from ingredients import ingredient_table
+from normalize import canonical_name
+# Inverted index from canonical ingredient to the recipes that use it, for reverse lookups ("which recipes use Avocado",
+# "what can I make with what I have") without scanning every recipe. Recipes get a small integer id; each canonical
+# ingredient id maps to the set of recipe ids using it (its posting list).
+#
+# The index is built on first use, because building it parses every recipe of a lazily loaded snapshot. Once built,
+# store.py keeps it current on every recipe change.
+
+
+def parse_query(query):
+    # A query like "avocado and rice or beef" as a list of groups of ingredients: "or" separates groups that are unions
+    # of each other, "and" (or a comma) joins ingredients that must all be present.
+    groups = []
+    for group in query.lower().split(" or "):
+        ingredients = [ingredient.strip() for part in group.split(" and ") for ingredient in part.split(",") if ingredient.strip()]
+        if ingredients:
+            groups.append(ingredients)
+    return groups
+
+
+class RecipeIndex:
+
+    def __init__(self):
+        self.built = False
+        self.names = []
+        # Recipe id -> name, None for deleted recipes.
+        self.ids = {}
+        self.ingredients = []
+        # Recipe id -> set of canonical ingredient ids.
+        self.postings = {}
+
+    def clear(self):
+        self.__init__()
+
+    def build(self, recipes):
+        self.clear()
+        for name, recipe in recipes.items():
+            self._add(name, recipe)
+        self.built = True
+
+    def ensure(self, recipes):
+        if not self.built:
+            self.build(recipes)
+
+    def _add(self, name, recipe):
+        rid = len(self.names)
+        self.names.append(name)
+        self.ids[name] = rid
+        self.ingredients.append(set(ingredient_table.canonical_ids(recipe.ids)))
+        for id in self.ingredients[rid]:
+            self.postings.setdefault(id, set()).add(rid)
+
+    def _remove(self, name):
+        rid = self.ids.pop(name)
+        for id in self.ingredients[rid]:
+            self.postings[id].discard(rid)
+            if not self.postings[id]:
+                del self.postings[id]
+        self.names[rid] = None
+        self.ingredients[rid] = set()
+
+    # --- Updates (no-ops until the index is built) --------------------------------------
+
+    def set(self, name, recipe):
+        # A recipe was added or its ingredients changed.
+        if not self.built:
+            return
+        if name in self.ids:
+            self._remove(name)
+        self._add(name, recipe)
+
+    def rename(self, old_name, new_name):
+        if not self.built:
+            return
+        rid = self.ids.pop(old_name)
+        self.ids[new_name] = rid
+        self.names[rid] = new_name
+
+    def delete(self, name):
+        if self.built and name in self.ids:
+            self._remove(name)
+
+    # --- Queries ------------------------------------------------------------------------
+
+    def _posting(self, ingredient):
+        return self.postings.get(ingredient_table.ids.get(canonical_name(ingredient)), set())
+
+    def recipes_with_all(self, ingredients):
+        # AND: recipes using every one of the ingredients. Intersects the shortest posting lists first.
+        postings = sorted((self._posting(ingredient) for ingredient in ingredients), key=len)
+        if not postings:
+            return []
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result &= posting
+            if not result:
+                break
+        return sorted(self.names[rid] for rid in result)
+
+    def recipes_with_any(self, ingredients):
+        # OR: recipes using at least one of the ingredients.
+        result = set()
+        for ingredient in ingredients:
+            result |= self._posting(ingredient)
+        return sorted(self.names[rid] for rid in result)
+
+    def search(self, query):
+        # Recipes matching a query (see parse_query).
+        result = set()
+        for ingredients in parse_query(query):
+            result.update(self.recipes_with_all(ingredients))
+        return sorted(result)
+
+    def pantry_match(self, have, limit=10):
+        # Recipes ranked by the fraction of their ingredients that are in have (e.g. checked-off items and extras).
+        # Only the posting lists of the items in have are visited, so the cost doesn't grow with the recipe count.
+        # Returns (name, fraction, missing ingredient names) for the best matches, best first.
+        have_ids = {ingredient_table.ids.get(canonical_name(item)) for item in have} - {None}
+        matched = {}
+        for id in have_ids:
+            for rid in self.postings.get(id, ()):
+                matched[rid] = matched.get(rid, 0) + 1
+        best = heapq.nlargest(limit, matched.items(), key=lambda item: (item[1] / len(self.ingredients[item[0]]), item[1]))
+        return [(self.names[rid], count / len(self.ingredients[rid]), ingredient_table.names(sorted(self.ingredients[rid] - have_ids)))
+                for rid, count in best]
@@ -0,0 +1,207 @@
+import json
+import os
+import threading
+import uuid
+from array import array
+from collections.abc import MutableMapping
+from contextlib import contextmanager, nullcontext
+from ingredients import Recipe
+# Indexed snapshot files, so very large recipe libraries don't have to be parsed in full at startup.
+#
+# When the journal compacts, the snapshot (data.json) is written together with a companion index (data.idx) holding the
+# byte offsets of every top-level section and of every recipe's ingredient list. Loading parses the small sections
+# (meal plan, overrides, extras, ...) eagerly and hands back the recipes as a LazyRecipes mapping that only parses a
+# recipe the first time it is accessed. The index names the snapshot it belongs to (snapshot_id); if the two don't
+# match, e.g. after a crash between writing them, the caller falls back to a plain json.load of the whole file.
+
+INDENT = " " * 4
+
+
+def index_path(data_file):
+    return os.path.splitext(data_file)[0] + ".idx"
+
+
+class LazyRecipes(MutableMapping):
+    # Recipe name -> Recipe. Entries hold either the parsed Recipe, or (until first access) an int pointing at
+    # the recipe's byte span in the snapshot file. Iterating keys, len() and "in" never parse anything.
+    # Plain ingredient lists assigned to it are converted to Recipe objects.
+    #
+    # The snapshot file is only open while a recipe is being read (or for a batch of reads, see reading()), never between
+    # reads: on Windows a compaction can't replace data.json while a handle to it is open.
+
+    def __init__(self, recipes=None):
+        self._entries = {}
+        self._names = []
+        self._spans = array("Q")
+        self._path = None
+        self._file = None
+        self.lock = threading.RLock()
+        # Held while reading the snapshot, and by a compaction while it replaces the file and moves the spans (relocate).
+        for name, ingredients in (recipes or {}).items():
+            self[name] = ingredients
+
+    def attach(self, path, names, spans):
+        # Read the recipes from a snapshot file; names[i] is stored at bytes spans[2*i]:spans[2*i+1].
+        self.clear()
+        self._path = path
+        self._names = names
+        self._spans = spans
+        self._entries = {name: i for i, name in enumerate(names)}
+
+    def relocate(self, path, names, spans):
+        # A compaction has just written a new snapshot to path, with names[i] at bytes spans[2*i]:spans[2*i+1] (the index
+        # from build_snapshot). Recipes that are still unparsed were copied over byte for byte, so they are read from there
+        # from now on. Call with self.lock held, from replacing the file until this returns.
+        position = {name: i for i, name in enumerate(names)}
+        moved = array("Q", bytes(self._spans.itemsize * len(self._spans)))
+        for i, name in enumerate(self._names):
+            j = position.get(name)
+            if j is not None:
+                moved[2 * i], moved[2 * i + 1] = spans[2 * j], spans[2 * j + 1]
+        self._path = path
+        self._spans = moved
+
+    @contextmanager
+    def reading(self):
+        # Keep the snapshot file open for a batch of raw_json calls, e.g. build_snapshot copying every unparsed recipe.
+        with self.lock:
+            if self._path is None or self._file is not None:
+                yield
+                return
+            with open(self._path, "rb") as self._file:
+                try:
+                    yield
+                finally:
+                    self._file = None
+
+    def assign(self, other):
+        # Replace the contents with another mapping, keeping this object (other modules hold references to it).
+        if isinstance(other, LazyRecipes):
+            if other is self:
+                return
+            self.clear()
+            self._entries, self._names, self._spans, self._path = other._entries, other._names, other._spans, other._path
+            other._entries, other._names, other._spans, other._path = {}, [], array("Q"), None
+        else:
+            self.clear()
+            for name, ingredients in other.items():
+                self[name] = ingredients
+
+    def raw_json(self, name):
+        # The recipe's JSON as stored in the snapshot, without parsing it if it hasn't been accessed yet.
+        value = self._entries[name]
+        if type(value) is not int:
+            return None
+        with self.reading():
+            self._file.seek(self._spans[2 * value])
+            return self._file.read(self._spans[2 * value + 1] - self._spans[2 * value])
+
+    def parsed_count(self):
+        return sum(1 for value in self._entries.values() if type(value) is not int)
+
+    def __getitem__(self, name):
+        value = self._entries[name]
+        if type(value) is int:
+            value = Recipe(name, json.loads(self.raw_json(name)))
+            self._entries[name] = value
+        return value
+
+    def __setitem__(self, name, ingredients):
+        if isinstance(ingredients, Recipe):
+            ingredients.name = name
+        else:
+            ingredients = Recipe(name, ingredients)
+        self._entries[name] = ingredients
+
+    def __delitem__(self, name):
+        del self._entries[name]
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        # MutableMapping.clear() would parse every recipe on its way out.
+        self._entries = {}
+        self._names = []
+        self._spans = array("Q")
+        self._path = None
+
+    def __repr__(self):
+        return f"LazyRecipes({len(self)} recipes, {self.parsed_count()} parsed)"
+
+
+def _dump(value, depth):
+    # json.dumps(indent=4) output, re-indented to sit at the given nesting depth (JSON strings never contain raw newlines).
+    return json.dumps(value, indent=4).replace("\n", "\n" + INDENT * depth).encode("utf-8")
+
+
+def build_snapshot(data):
+    # Serialize a data dict into snapshot bytes plus the index that goes with them. The layout matches json.dumps(indent=4),
+    # with "snapshot_id" first and "recipes" last. Recipes that were never parsed are copied over as raw bytes.
+    snapshot_id = uuid.uuid4().hex
+    recipes = data.get("recipes", {})
+    with recipes.reading() if isinstance(recipes, LazyRecipes) else nullcontext():
+        return _build(data, recipes, snapshot_id)
+
+
+def _build(data, recipes, snapshot_id):
+    chunks = [b"{\n"]
+    position = 2
+    sections = {}
+    fields = [("snapshot_id", snapshot_id)] + [(key, value) for key, value in data.items() if key != "recipes"]
+    for key, value in fields:
+        prefix = f"{INDENT}{json.dumps(key)}: ".encode("utf-8")
+        body = _dump(value, 1)
+        sections[key] = [position + len(prefix), position + len(prefix) + len(body)]
+        chunks += [prefix, body, b",\n"]
+        position += len(prefix) + len(body) + 2
+
+    names = []
+    spans = []
+    header = f'{INDENT}"recipes": {{'.encode("utf-8")
+    chunks.append(header)
+    position += len(header)
+    for i, name in enumerate(recipes):
+        prefix = f'{"," if i else ""}\n{INDENT * 2}{json.dumps(name)}: '.encode("utf-8")
+        body = recipes.raw_json(name) if isinstance(recipes, LazyRecipes) else None
+        if body is None:
+            body = _dump(list(recipes[name]), 2)
+        names.append(name)
+        spans += [position + len(prefix), position + len(prefix) + len(body)]
+        chunks += [prefix, body]
+        position += len(prefix) + len(body)
+    footer = f"\n{INDENT}}}\n}}".encode("utf-8") if names else b"}\n}"
+    chunks.append(footer)
+    position += len(footer)
+
+    index = {"snapshot_id": snapshot_id, "size": position, "sections": sections, "names": names, "spans": spans}
+    return b"".join(chunks), index
+
+
+def read_snapshot(data_file):
+    # Load a snapshot through its index: every section but the recipes is parsed, the recipes stay lazy.
+    # Returns None if there is no index or it doesn't belong to the current data file.
+    try:
+        with open(index_path(data_file), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        with open(data_file, "rb") as file:
+            if os.fstat(file.fileno()).st_size != index["size"]:
+                return None
+            data = {}
+            for key, (start, end) in index["sections"].items():
+                file.seek(start)
+                data[key] = json.loads(file.read(end - start))
+        if data.pop("snapshot_id") != index["snapshot_id"]:
+            return None
+    except (OSError, ValueError, KeyError):
+        return None
+    recipes = LazyRecipes()
+    recipes.attach(data_file, index["names"], array("Q", index["spans"]))
+    data["recipes"] = recipes
+    return data
@@ -0,0 +1,313 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+from categories import get_category
+from datetime import date, timedelta
+from normalize import canonical_name
+from plan import DEFAULT_HOUSEHOLD, DEFAULT_SLOT_TYPES, legacy_date, week_start
+# SQLite storage engine. It implements the same interface as journal.Journal (load / record / flush / maybe_compact / close),
+# but keeps the data in normalized, indexed tables so lookups like "all recipes using X" or "grocery list for the week of D"
+# are index queries instead of Python loops over the whole data dict. The database runs in WAL mode so the CLI and
+# the GUI can read it at the same time.
+#
+# To switch an existing install over, import data.json once:  python sqlite_store.py [data.json] [data.db]
+
+SCHEMA_VERSION = 4
+# Version 2 adds recipe_ingredients.canonical, the canonical ingredient name that grocery queries and overrides key on.
+# Version 3 replaces the weekday plan_slots table with plan_entries, one row per filled (household, date, slot).
+# Version 4 records the data schema the tables hold (meta "data_version") and recomputes the canonical names with the
+# current normalize.py, moving checked-off ingredients to them as store.migrate does.
+
+DATA_VERSION = 4
+# The data file schema (store.SCHEMA_VERSION) of the tables: load() reports it, so store.migrate leaves the data alone.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS recipes (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS recipe_ingredients (
+    recipe_id INTEGER NOT NULL REFERENCES recipes(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    canonical TEXT
+);
+CREATE TABLE IF NOT EXISTS plan_entries (
+    household TEXT NOT NULL,
+    date TEXT NOT NULL,
+    slot TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (household, date, slot)
+);
+CREATE TABLE IF NOT EXISTS overrides (
+    ingredient TEXT PRIMARY KEY,
+    category TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS extras (
+    position INTEGER NOT NULL,
+    item TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checked_off (
+    item TEXT PRIMARY KEY
+);
+CREATE INDEX IF NOT EXISTS idx_recipe_ingredients_recipe ON recipe_ingredients(recipe_id, position);
+CREATE INDEX IF NOT EXISTS idx_recipe_ingredients_name ON recipe_ingredients(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_recipe_ingredients_category ON recipe_ingredients(category);
+CREATE INDEX IF NOT EXISTS idx_plan_entries_value ON plan_entries(value);
+CREATE INDEX IF NOT EXISTS idx_overrides_category ON overrides(category);
+"""
+
+
+def database_path(data_file):
+    return os.path.splitext(data_file)[0] + ".db"
+
+
+class SQLiteStorage:
+
+    def __init__(self, path):
+        self.path = path
+        self.pending = []
+        self.pending_lock = threading.Lock()
+        self.lock = threading.RLock()
+        # The GUI flushes on a worker thread, so the connection is shared between threads and every use of it holds self.lock.
+        self.conn = sqlite3.connect(path, timeout=10.0, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+            self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', ?)", (str(DATA_VERSION),))
+            self._upgrade()
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_recipe_ingredients_canonical ON recipe_ingredients(canonical)")
+
+    def _upgrade(self):
+        (version,) = self.conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        if int(version) < 2:
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(recipe_ingredients)")]
+            if "canonical" not in columns:
+                self.conn.execute("ALTER TABLE recipe_ingredients ADD COLUMN canonical TEXT")
+        if int(version) < 4:
+            rows = self.conn.execute("SELECT rowid, name FROM recipe_ingredients").fetchall()
+            self.conn.executemany(
+                "UPDATE recipe_ingredients SET canonical = ?, category = ? WHERE rowid = ?",
+                [(canonical, get_category(canonical), rowid) for rowid, canonical in ((rowid, canonical_name(name)) for rowid, name in rows)])
+            overrides = self.conn.execute("SELECT ingredient, category FROM overrides").fetchall()
+            self.conn.execute("DELETE FROM overrides")
+            self.conn.executemany("INSERT OR REPLACE INTO overrides (ingredient, category) VALUES (?, ?)",
+                                  [(canonical_name(ingredient), category) for ingredient, category in overrides])
+        if int(version) < 3 and self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'plan_slots'").fetchone():
+            # Weekday slots of week N move to the dates of the current week plus N weeks (see plan.legacy_date). The
+            # upgrade is committed with the database, so it runs once.
+            current = week_start(date.today())
+            rows = self.conn.execute("SELECT week, day, meal, value FROM plan_slots WHERE value IS NOT NULL").fetchall()
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO plan_entries (household, date, slot, value) VALUES (?, ?, ?, ?)",
+                [(DEFAULT_HOUSEHOLD, (legacy_date(day, current) + timedelta(weeks=week)).isoformat(), meal, value) for week, day, meal, value in rows])
+            self.conn.execute("DROP TABLE plan_slots")
+        if int(version) < 4:
+            extras = {item for (item,) in self.conn.execute("SELECT item FROM extras")}
+            checked = [item for (item,) in self.conn.execute("SELECT item FROM checked_off")]
+            self.conn.executemany("INSERT OR IGNORE INTO checked_off (item) VALUES (?)",
+                                  [(canonical_name(item),) for item in checked if item not in extras])
+            self.conn.executemany("DELETE FROM checked_off WHERE item = ?",
+                                  [(item,) for item in checked if item not in extras and canonical_name(item) != item])
+        self.conn.execute("UPDATE meta SET value = ? WHERE key = 'schema_version'", (str(SCHEMA_VERSION),))
+
+    # --- Storage interface ------------------------------------------------------------
+
+    def load(self):
+        # Read everything back into the plain data dict shape used by the front ends.
+        with self.lock:
+            return self._load()
+
+    def _load(self):
+        conn = self.conn
+        recipes = {name: [] for (name,) in conn.execute("SELECT name FROM recipes ORDER BY id")}
+        for recipe, ingredient in conn.execute(
+                "SELECT r.name, ri.name FROM recipe_ingredients ri JOIN recipes r ON r.id = ri.recipe_id ORDER BY ri.recipe_id, ri.position"):
+            recipes[recipe].append(ingredient)
+        (data_version,) = conn.execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()
+        data = {
+            "schema_version": int(data_version),
+            "recipes": recipes,
+            "extras": [item for (item,) in conn.execute("SELECT item FROM extras ORDER BY position")],
+            "checked_off": [item for (item,) in conn.execute("SELECT item FROM checked_off ORDER BY rowid")],
+            "category_overrides": dict(conn.execute("SELECT ingredient, category FROM overrides")),
+        }
+        plans = {}
+        for household, day, slot, value in conn.execute("SELECT household, date, slot, value FROM plan_entries ORDER BY household, date"):
+            plans.setdefault(household, {}).setdefault(day, {})[slot] = value
+        data["plans"] = plans
+        data["slot_types"] = self._slot_types()
+        row = conn.execute("SELECT value FROM meta WHERE key = 'last_export'").fetchone()
+        data["last_export"] = json.loads(row[0]) if row else None
+        return data, self.path
+
+    def _slot_types(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'slot_types'").fetchone()
+        return json.loads(row[0]) if row else list(DEFAULT_SLOT_TYPES)
+
+    def record(self, op, **fields):
+        # Changes are queued and applied together in one transaction on flush(), so no write lock is held between saves.
+        with self.pending_lock:
+            self.pending.append((op, fields))
+
+    def flush(self):
+        with self.pending_lock:
+            pending, self.pending = self.pending, []
+        if not pending:
+            return
+        with self.lock, self.conn:
+            for op, fields in pending:
+                self._apply(op, **fields)
+
+    def maybe_compact(self, snapshot):
+        # Nothing to fold: the tables are always the current state. SQLite checkpoints the WAL on its own.
+        pass
+
+    def compact(self, snapshot):
+        pass
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.conn.close()
+
+    # --- Queries ------------------------------------------------------------------------
+
+    def recipes_using(self, ingredient):
+        # Names of all recipes using any spelling of this ingredient, via idx_recipe_ingredients_canonical.
+        with self.lock:
+            return [name for (name,) in self.conn.execute(
+                "SELECT DISTINCT r.name FROM recipe_ingredients ri JOIN recipes r ON r.id = ri.recipe_id "
+                "WHERE ri.canonical = ? ORDER BY r.name", (canonical_name(ingredient),))]
+
+    def grocery_for_week(self, household, day):
+        # (category, canonical ingredient, ingredient) for every ingredient line of every meal slot a household planned in
+        # the week of day, with user overrides applied. The date range is a range scan of the plan_entries primary key.
+        start = week_start(day)
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COALESCE(o.category, ri.category), ri.canonical, ri.name FROM plan_entries p "
+                "JOIN recipes r ON r.name = p.value "
+                "JOIN recipe_ingredients ri ON ri.recipe_id = r.id "
+                "LEFT JOIN overrides o ON o.ingredient = ri.canonical "
+                "WHERE p.household = ? AND p.date >= ? AND p.date < ? ORDER BY p.date, p.slot, ri.position",
+                (household, start.isoformat(), (start + timedelta(days=7)).isoformat())).fetchall()
+
+    # --- Applying journal-style operations ----------------------------------------------
+
+    def _recipe_id(self, name, create=False):
+        if create:
+            self.conn.execute("INSERT OR IGNORE INTO recipes (name) VALUES (?)", (name,))
+        row = self.conn.execute("SELECT id FROM recipes WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _insert_ingredients(self, recipe_id, ingredients, start=0):
+        self.conn.executemany(
+            "INSERT INTO recipe_ingredients (recipe_id, position, name, category, canonical) VALUES (?, ?, ?, ?, ?)",
+            [(recipe_id, position, ingredient, get_category(canonical), canonical)
+             for position, ingredient, canonical in ((position, ingredient, canonical_name(ingredient)) for position, ingredient in enumerate(ingredients, start))])
+
+    def _apply(self, op, **fields):
+        conn = self.conn
+        if op == "plan_set":
+            if fields["value"] is None:
+                conn.execute("DELETE FROM plan_entries WHERE household = ? AND date = ? AND slot = ?",
+                             (fields["household"], fields["date"], fields["slot"]))
+            else:
+                conn.execute(
+                    "INSERT INTO plan_entries (household, date, slot, value) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (household, date, slot) DO UPDATE SET value = excluded.value",
+                    (fields["household"], fields["date"], fields["slot"], fields["value"]))
+        elif op == "plan_clear":
+            conn.execute("DELETE FROM plan_entries WHERE household = ? AND date >= ? AND date < ?",
+                         (fields["household"], fields["start"], fields["end"]))
+        elif op == "add_slot_type":
+            slot_types = self._slot_types()
+            if fields["slot"] not in slot_types:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('slot_types', ?)", (json.dumps(slot_types + [fields["slot"]]),))
+        elif op == "set_recipe":
+            recipe_id = self._recipe_id(fields["name"], create=True)
+            conn.execute("DELETE FROM recipe_ingredients WHERE recipe_id = ?", (recipe_id,))
+            self._insert_ingredients(recipe_id, fields["ingredients"])
+        elif op == "add_ingredient":
+            recipe_id = self._recipe_id(fields["recipe"])
+            (count,) = conn.execute("SELECT COUNT(*) FROM recipe_ingredients WHERE recipe_id = ?", (recipe_id,)).fetchone()
+            self._insert_ingredients(recipe_id, [fields["ingredient"]], start=count)
+        elif op == "remove_ingredient":
+            recipe_id = self._recipe_id(fields["recipe"])
+            conn.execute("DELETE FROM recipe_ingredients WHERE recipe_id = ? AND position = ?", (recipe_id, fields["index"]))
+            conn.execute("UPDATE recipe_ingredients SET position = position - 1 WHERE recipe_id = ? AND position > ?", (recipe_id, fields["index"]))
+        elif op == "rename_recipe":
+            conn.execute("UPDATE recipes SET name = ? WHERE name = ?", (fields["new"], fields["old"]))
+        elif op == "delete_recipe":
+            conn.execute("DELETE FROM recipes WHERE name = ?", (fields["name"],))
+        elif op == "add_extra":
+            (count,) = conn.execute("SELECT COUNT(*) FROM extras").fetchone()
+            conn.execute("INSERT INTO extras (position, item) VALUES (?, ?)", (count, fields["item"]))
+        elif op == "remove_extra":
+            conn.execute("DELETE FROM extras WHERE position = ?", (fields["index"],))
+            conn.execute("UPDATE extras SET position = position - 1 WHERE position > ?", (fields["index"],))
+        elif op == "check":
+            conn.executemany("INSERT OR IGNORE INTO checked_off (item) VALUES (?)", [(item,) for item in fields["items"]])
+        elif op == "uncheck":
+            conn.executemany("DELETE FROM checked_off WHERE item = ?", [(item,) for item in fields["items"]])
+        elif op == "clear_checked":
+            conn.execute("DELETE FROM checked_off")
+        elif op == "mark_exported":
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_export', ?)", (json.dumps(fields["baseline"]),))
+        elif op == "set_override":
+            conn.execute(
+                "INSERT INTO overrides (ingredient, category) VALUES (?, ?) "
+                "ON CONFLICT (ingredient) DO UPDATE SET category = excluded.category",
+                (fields["ingredient"], fields["category"]))
+        else:
+            raise ValueError(f"Unknown storage operation '{op}'")
+
+
+def import_json(data_file, db_path, migrate=None):
+    # One-shot import of an existing data.json (plus any journal records after it) into a fresh SQLite database.
+    from journal import Journal
+    data, source = Journal(data_file, migrate=migrate).load()
+    if data is None:
+        raise FileNotFoundError(f"No data found at '{data_file}'")
+    if os.path.exists(db_path):
+        raise FileExistsError(f"'{db_path}' already exists; refusing to overwrite it")
+    storage = SQLiteStorage(db_path)
+    with storage.conn:
+        storage.conn.execute("UPDATE meta SET value = ? WHERE key = 'data_version'", (str(data.get("schema_version", 1)),))
+    for name, ingredients in data.get("recipes", {}).items():
+        storage.record("set_recipe", name=name, ingredients=ingredients)
+    for slot in data.get("slot_types", []):
+        storage.record("add_slot_type", slot=slot)
+    for household, by_date in data.get("plans", {}).items():
+        for day, meals in by_date.items():
+            for slot, value in meals.items():
+                storage.record("plan_set", household=household, date=day, slot=slot, value=value)
+    for item in data.get("extras", []):
+        storage.record("add_extra", item=item)
+    storage.record("check", items=data.get("checked_off", []))
+    if data.get("last_export"):
+        storage.record("mark_exported", baseline=data["last_export"])
+    for ingredient, category in data.get("category_overrides", {}).items():
+        storage.record("set_override", ingredient=ingredient, category=category)
+    storage.close()
+    return len(data.get("recipes", {}))
+
+
+if __name__ == "__main__":
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    data_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(base_dir, "data.json")
+    db_path = sys.argv[2] if len(sys.argv) > 2 else database_path(data_file)
+    from store import migrate
+    count = import_json(data_file, db_path, migrate=migrate)
+    print(f"Imported {count} recipes from '{data_file}' into '{db_path}'.")
@@ -0,0 +1,126 @@
+# Dashboard counters kept up to date from change events (events.py) instead of being recounted over the whole meal
+# plan. Each event adjusts a few integers, so the cost of a change doesn't depend on the size of the plan or the
+# number of recipes; only loading (and switching weeks) recounts. Meal counts cover the week being shown.
+#
+#   recipes      saved recipes
+#   meals        filled meal slots
+#   ingredients  ingredient lines of the planned recipes, counted once per slot
+#   distinct     distinct canonical ingredients on the grocery list
+#   checked      checked-off share of the grocery list rows (planned ingredients and extras), in percent
+
+
+class PlannerStats:
+
+    def __init__(self, events, data, grocery, week_meals):
+        # week_meals() returns the meal names planned in the week being shown, one per filled slot.
+        self.data = data
+        self.grocery = grocery
+        self.week_meals = week_meals
+        self.values = {"recipes": 0, "meals": 0, "ingredients": 0, "distinct": 0, "checked": 0}
+        self.uses = {}
+        # Meal name -> number of slots it fills.
+        self.on_list = {}
+        # Grocery list row name -> number of rows with that name (an extra can also be a planned ingredient).
+        self.rows = 0
+        self.checked_rows = 0
+        self.listeners = []
+        for event in ("slot_set", "recipe_changed", "recipe_renamed", "extra_added", "extra_removed",
+                      "checked", "unchecked", "checks_cleared", "grocery_item", "loaded"):
+            events.subscribe(event, getattr(self, f"_on_{event}"))
+        events.subscribe("week_selected", self._on_loaded)
+
+    def subscribe(self, callback):
+        # callback(key, value) is called whenever one of the values changes.
+        self.listeners.append(callback)
+
+    def _set(self, key, value):
+        if self.values[key] != value:
+            self.values[key] = value
+            for callback in self.listeners:
+                callback(key, value)
+
+    def _add(self, key, delta):
+        self._set(key, self.values[key] + delta)
+
+    def _size(self, meal):
+        recipe = self.data.recipes.get(meal) if meal is not None else None
+        return len(recipe) if recipe is not None else 0
+
+    def _update_checked(self):
+        self._set("checked", round(100 * self.checked_rows / self.rows) if self.rows else 0)
+
+    def _add_row(self, name, sign):
+        self.on_list[name] = self.on_list.get(name, 0) + sign
+        if not self.on_list[name]:
+            del self.on_list[name]
+        self.rows += sign
+        if name in self.data.checked_off:
+            self.checked_rows += sign
+        self._update_checked()
+
+    # --- Event handlers -----------------------------------------------------------------
+
+    def _on_loaded(self):
+        self.uses = {}
+        for meal in self.week_meals():
+            self.uses[meal] = self.uses.get(meal, 0) + 1
+        self._set("recipes", len(self.data.recipes))
+        self._set("meals", sum(self.uses.values()))
+        self._set("ingredients", sum(count * self._size(meal) for meal, count in self.uses.items()))
+        self._recount_rows()
+
+    def _recount_rows(self):
+        self.on_list = {}
+        for name in self.grocery.ingredients() + self.data.extras:
+            self.on_list[name] = self.on_list.get(name, 0) + 1
+        self.rows = sum(self.on_list.values())
+        self.checked_rows = sum(count for name, count in self.on_list.items() if name in self.data.checked_off)
+        self._set("distinct", len(self.grocery))
+        self._update_checked()
+
+    def _on_slot_set(self, old, new, active, **slot):
+        if not active:
+            return
+        if old:
+            self.uses[old] -= 1
+            if not self.uses[old]:
+                del self.uses[old]
+            self._add("meals", -1)
+            self._add("ingredients", -self._size(old))
+        if new:
+            self.uses[new] = self.uses.get(new, 0) + 1
+            self._add("meals", 1)
+            self._add("ingredients", self._size(new))
+
+    def _on_recipe_changed(self, name, old, new):
+        if old is None:
+            self._add("recipes", 1)
+        if new is None:
+            self._add("recipes", -1)
+        self._add("ingredients", self.uses.get(name, 0) * ((new or 0) - (old or 0)))
+
+    def _on_recipe_renamed(self, old, new, size):
+        # The slots still name the old recipe, so they become custom meals; slots already named new start counting it.
+        self._add("ingredients", (self.uses.get(new, 0) - self.uses.get(old, 0)) * size)
+
+    def _on_extra_added(self, item):
+        self._add_row(item, 1)
+
+    def _on_extra_removed(self, item):
+        self._add_row(item, -1)
+
+    def _on_grocery_item(self, name, present):
+        self._add_row(name, 1 if present else -1)
+        self._set("distinct", len(self.grocery))
+
+    def _on_checked(self, items):
+        self.checked_rows += sum(self.on_list.get(item, 0) for item in items)
+        self._update_checked()
+
+    def _on_unchecked(self, items):
+        self.checked_rows -= sum(self.on_list.get(item, 0) for item in items)
+        self._update_checked()
+
+    def _on_checks_cleared(self):
+        self.checked_rows = 0
+        self._update_checked()
@@ -0,0 +1,20 @@
+import os
+from journal import Journal
+from sqlite_store import SQLiteStorage, database_path
+# Storage backends for the planner data. Every backend offers the same small interface:
+#   load()                 -> (data dict, source path), or (None, None) when there is no data yet
+#   record(op, **fields)   queue one change (see journal.apply_operation for the operations)
+#   flush()                make the queued changes durable
+#   maybe_compact(snapshot) give the backend a chance to fold its log into a snapshot (snapshot() returns the data dict)
+#   compact(snapshot)      fold it into a snapshot now
+#   close()                final flush, waiting for any background work
+
+
+def open_storage(data_file, migrate=None, on_error=None):
+    # Use the SQLite database if one has been imported next to the data file (python sqlite_store.py), otherwise the JSON snapshot + journal.
+    # migrate upgrades an older JSON snapshot to the current schema before the journal is replayed on top of it.
+    # on_error(exception) hears about failures in background writes the caller can't catch (the journal's compactions).
+    db_path = database_path(data_file)
+    if os.path.exists(db_path):
+        return SQLiteStorage(db_path)
+    return Journal(data_file, migrate=migrate, on_error=on_error)
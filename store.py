@@ -0,0 +1,550 @@
+import json
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from categories import category_cache
+from events import Events
+from export import grocery_rows
+from grocery import GroceryList
+from grocery_diff import GroceryDiff
+from ingredients import Recipe, ingredient_table
+from normalize import canonical_name
+from recipe_index import RecipeIndex, parse_query
+from persistence import WriteCoalescer
+from plan import DEFAULT_HOUSEHOLD, DEFAULT_SLOT_TYPES, PlanStore, days, legacy_date, week_dates, week_start
+from snapshot import LazyRecipes
+from sqlite_store import SQLiteStorage
+from stats import PlannerStats
+from storage import open_storage
+# Shared data access for the CLI (main.py) and the GUI (app.py): the in-memory model, one load/save implementation,
+# and every change to the data. Both front ends import from here, so caching and persistence only live in one place.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_FILE = os.path.join(BASE_DIR, "data.json")
+
+SCHEMA_VERSION = 4
+# Version 1 is the original unversioned file. The CLI saved extras under "extras_list" while both loaders read "extras",
+# so extras vanished on every CLI restart; migrate() folds the two keys back together.
+# Version 3 keys category overrides by canonical ingredient name (see normalize.py).
+# Version 4 replaces the single weekday "meal_plan" with dated, per-household "plans" and configurable "slot_types" (see plan.py).
+
+
+@dataclass
+class PlannerData:
+    # The in-memory model. Loading updates these containers in place, so modules that imported them keep valid references.
+    recipes: LazyRecipes = field(default_factory=LazyRecipes)
+    # Recipe name -> Recipe (interned ingredient ids, see ingredients.py). Recipes from an indexed snapshot are only parsed on first access (see snapshot.py).
+    plan: PlanStore = field(default_factory=PlanStore)
+    # (household, date, slot) -> meal name, only for filled slots.
+    extras: list[str] = field(default_factory=list)
+    checked_off: dict[str, None] = field(default_factory=dict)
+    # Checked-off items are an ordered set (a dict with None values) for O(1) membership tests; saved as a plain list.
+    category_overrides: dict[str, str] = field(default_factory=dict)
+    last_export: dict | None = None
+    # The grocery list as last exported (see grocery_diff.py), so "what changed since the export" survives a restart.
+
+    def to_dict(self):
+        return {
+            "schema_version": SCHEMA_VERSION,
+            "recipes": self.recipes,
+            "plans": self.plan.to_dict(),
+            "slot_types": list(self.plan.slot_types),
+            "extras": self.extras,
+            "checked_off": list(self.checked_off),
+            "category_overrides": self.category_overrides,
+            "last_export": self.last_export,
+        }
+
+    def update_from(self, raw):
+        # Replace the contents with a migrated data dict, keeping the same container objects.
+        raw = migrate(raw)
+        self.recipes.assign(raw["recipes"])
+        self.plan.load(raw["plans"], raw["slot_types"])
+        self.extras[:] = raw["extras"]
+        self.checked_off.clear()
+        self.checked_off.update(dict.fromkeys(raw["checked_off"]))
+        self.category_overrides.clear()
+        self.category_overrides.update(raw["category_overrides"])
+        self.last_export = raw["last_export"]
+
+
+def migrate(raw):
+    # Bring a data dict from any earlier schema version up to SCHEMA_VERSION.
+    raw = dict(raw)
+    if raw.get("schema_version", 1) < 2:
+        extras = raw.get("extras") or []
+        raw["extras"] = extras + [item for item in raw.pop("extras_list", []) if item not in extras]
+        # Early GUI builds could save a recipe as a single nested list of ingredients.
+        raw["recipes"] = {name: ingredients[0] if ingredients and isinstance(ingredients[0], list) else ingredients
+                          for name, ingredients in raw.get("recipes", {}).items()}
+    if raw.get("schema_version", 1) < 3:
+        raw["category_overrides"] = {canonical_name(ingredient): category for ingredient, category in raw.get("category_overrides", {}).items()}
+        # Grocery rows are named by canonical ingredient now, so checked-off ingredients move to that name too; an extra
+        # keeps its own row under the name it was entered with, so it stays checked under both.
+        extras = set(raw.get("extras") or [])
+        checked = []
+        for item in raw.get("checked_off", []):
+            checked += [item, canonical_name(item)] if item in extras else [canonical_name(item)]
+        raw["checked_off"] = list(dict.fromkeys(checked))
+    if raw.get("schema_version", 1) < 4:
+        # The weekday plan becomes the current week of the default household. That week is kept in "legacy_week" until
+        # apply_data has written the data back in the new shape, so the plan doesn't move to another week on every load.
+        raw["legacy_week"] = raw.get("legacy_week") or week_start(date.today()).isoformat()
+        legacy_week = date.fromisoformat(raw["legacy_week"])
+        plans = {household: dict(by_date) for household, by_date in (raw.get("plans") or {}).items()}
+        home = plans.setdefault(DEFAULT_HOUSEHOLD, {})
+        for day, meals in (raw.pop("meal_plan", None) or {}).items():
+            if day not in days:
+                continue
+            for slot, meal in meals.items():
+                if meal:
+                    home.setdefault(legacy_date(day, legacy_week).isoformat(), {})[slot] = meal
+        raw["plans"] = plans
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "recipes": raw.get("recipes", {}),
+        "plans": raw.get("plans", {}),
+        "slot_types": raw.get("slot_types") or list(DEFAULT_SLOT_TYPES),
+        "extras": raw.get("extras", []),
+        "checked_off": raw.get("checked_off", []),
+        "category_overrides": raw.get("category_overrides", {}),
+        "last_export": raw.get("last_export"),
+        "legacy_week": raw.get("legacy_week"),
+    }
+
+
+data = PlannerData()
+saved_recipes = data.recipes
+plan = data.plan
+extras_list = data.extras
+checked_off = data.checked_off
+category_overrides = data.category_overrides
+
+
+def get_ingredient_category(ingredient):
+    # Resolve the canonical name through the shared category cache, which checks for a user override first and falls back to keyword matching on a miss.
+    return category_cache.get(canonical_name(ingredient), category_overrides)
+
+
+def get_ingredient_categories(ingredients):
+    # Batch version of get_ingredient_category: every cache miss in the list is classified together in a single classify_many call.
+    return category_cache.get_many([canonical_name(ingredient) for ingredient in ingredients], category_overrides)
+
+
+events = Events()
+# Every change below emits an event (see events.py) once it is made, so views can follow the data without recounting it.
+
+grocery = GroceryList(get_ingredient_categories, on_item=lambda name, present: events.emit("grocery_item", name=name, present=present))
+# Ingredient reference counts for the current meal plan. Every change below keeps it up to date, so grocery screens never rebuild it from scratch.
+
+current_household = DEFAULT_HOUSEHOLD
+current_week = week_start(date.today())
+# The household and week (its Monday) the front ends show. The grocery list and the dashboard counters cover this week.
+
+
+def active_week():
+    # The seven dates of the current week.
+    return week_dates(current_week)
+
+
+def in_active_week(household, day):
+    return household == current_household and week_start(day) == current_week
+
+
+def week_meals():
+    # The meal names planned in the current week, one per filled slot.
+    return [meal for _, _, meal in plan.week(current_household, current_week)]
+
+
+def meal_at(day, slot, household=None):
+    return plan.get(household or current_household, day, slot)
+
+
+stats = PlannerStats(events, data, grocery, week_meals)
+# Dashboard counters (recipes, meals, ingredients, distinct ingredients, checked-off percentage), kept current from the events.
+
+grocery_changes = GroceryDiff(grocery, extras_list)
+# Ingredients added, removed or changed on the grocery list since it was last exported.
+
+recipe_names_revision = 0
+# Bumped whenever a recipe is added, renamed or deleted, so views holding a copy of the names (e.g. the GUI's search index) know to rebuild it.
+
+grocery_revision = 0
+# Bumped whenever the grocery list's contents can change: the meal plan, a recipe, a category override or the extras. Checking items off doesn't count.
+
+recipe_index = RecipeIndex()
+# Canonical ingredient -> recipes using it, for reverse lookups. Built on first query, then kept current by the changes below.
+
+storage = open_storage(DATA_FILE, migrate=migrate, on_error=lambda e: report_save_error(e))
+# Every change is recorded with the storage backend as a small operation record: appended to the journal (journal.py), or applied to the SQLite database once one has been imported (sqlite_store.py).
+# A compaction that fails on its background thread is reported like any other save error (report_save_error, below).
+
+database = storage if isinstance(storage, SQLiteStorage) else None
+# With the SQLite backend, recipe lookups and the grocery lists of weeks not being shown are index queries on the database.
+
+
+worker = None
+# A background.BackgroundWorker set by the GUI (use_worker). Disk reads and writes then run on its thread instead of the Tk main loop.
+
+
+def use_worker(background):
+    global worker
+    worker = background
+
+
+def write_data():
+    # Make the recorded changes durable, then give the journal a chance to fold them into a fresh snapshot in the background.
+    # With a worker the disk write runs on its thread; the snapshot is still taken here, where the data is changed.
+    if worker is not None:
+        try:
+            worker.submit(storage.flush, on_done=lambda result: compact_storage(), on_error=report_save_error)
+            return
+        except RuntimeError:
+            # The interpreter is exiting and has already stopped the worker's thread pool; write here instead.
+            pass
+    try:
+        storage.flush()
+    except Exception as e:
+        report_save_error(e)
+        return
+    compact_storage()
+
+
+def compact_storage():
+    try:
+        storage.maybe_compact(data.to_dict)
+    except Exception as e:
+        report_save_error(e)
+
+
+def report_save_error(e):
+    print(f"Error saving data: {e}")
+
+
+writer = WriteCoalescer(write_data)
+# Coalesces saves: changes only mark the data dirty and are written once per burst (see persistence.py).
+
+
+def read_data():
+    # The slow half of loading: read and parse the data from disk. Touches no shared state, so it can run on a worker thread. Returns (raw, source).
+    return storage.load()
+
+
+def apply_data(raw, source):
+    # The fast half: move loaded data into the shared containers. Runs on the thread that owns the data.
+    if raw is None:
+        return
+    data.update_from(raw)
+    if raw.get("legacy_week"):
+        # The weekday plan was just placed on a week (see migrate); write the data back in the new shape right away, so
+        # the next load doesn't convert it again onto whatever week it is then.
+        try:
+            storage.compact(data.to_dict)
+        except Exception as e:
+            report_save_error(e)
+    category_cache.clear()
+    grocery.rebuild(week_meals(), saved_recipes)
+    grocery_changes.restore(data.last_export, current_household, current_week.isoformat())
+    recipe_index.clear()
+    _recipe_names_changed()
+    _grocery_changed()
+    events.emit("loaded")
+    if source not in (DATA_FILE, getattr(storage, "path", None)):
+        print(f"Warning: Data file corrupted. Recovered from backup '{os.path.basename(source)}'.")
+    print("Data loaded successfully!")
+
+
+def report_load_error(e):
+    if isinstance(e, json.JSONDecodeError):
+        print("Warning: Data file and its backups are corrupted. Starting fresh.")
+    else:
+        print(f"Warning: Could not load data ({e}). Starting fresh.")
+
+
+def load_data():
+    # Load data if it exists, otherwise keep the empty/default values. If the data file is damaged, the backend falls back to the newest good backup.
+    try:
+        apply_data(*read_data())
+    except Exception as e:
+        report_load_error(e)
+
+
+def _recipe_names_changed():
+    global recipe_names_revision
+    recipe_names_revision += 1
+
+
+def _grocery_changed():
+    global grocery_revision
+    grocery_revision += 1
+
+
+def save_data():
+    # Record that the data changed. The writer flushes after its debounce delay, on commit(), or at exit.
+    writer.mark_dirty()
+
+
+def commit():
+    writer.commit()
+
+
+def close():
+    # Final flush before the program exits; returns the write statistics for the session.
+    global worker
+    writer.close()
+    if worker is not None:
+        worker.shutdown()
+        worker = None
+    storage.close()
+    return writer.stats()
+
+
+# --- Queries ------------------------------------------------------------------------------
+
+def grocery_for(household, day):
+    # The grocery list of any household's week: the live one for the week being shown, otherwise built from that week's meals.
+    if in_active_week(household, day):
+        return grocery
+    if database is not None:
+        database.flush()
+        rows = database.grocery_for_week(household, day)
+        categories = {canonical: category for category, canonical, _ in rows}
+        other = GroceryList(lambda names: [categories.get(name) or get_ingredient_category(name) for name in names])
+        other.add(ingredient_table.intern_all([ingredient for _, _, ingredient in rows]))
+        return other
+    other = GroceryList(get_ingredient_categories)
+    other.rebuild([meal for _, _, meal in plan.week(household, day)], saved_recipes)
+    return other
+
+
+def grocery_lists(households, start, weeks):
+    # (household, week start, rows) for a number of consecutive weeks per household, for export.export_batch. Each list
+    # is only built when the export reaches it, so a long batch holds one list in memory at a time.
+    for household in households:
+        for i in range(weeks):
+            week = week_start(start) + timedelta(weeks=i)
+            yield household, week, grocery_rows(grocery_for(household, week), extras_list, checked_off)
+
+
+def find_recipes(query):
+    # Recipe names matching an ingredient query such as "avocado and rice or beef" (see recipe_index.parse_query).
+    if database is not None:
+        database.flush()
+        result = set()
+        for ingredients in parse_query(query):
+            result.update(set.intersection(*(set(database.recipes_using(ingredient)) for ingredient in ingredients)))
+        return sorted(result)
+    recipe_index.ensure(saved_recipes)
+    return recipe_index.search(query)
+
+
+def pantry_matches(limit=10):
+    # Recipes ranked by how much of them is covered by checked-off items and extras.
+    recipe_index.ensure(saved_recipes)
+    return recipe_index.pantry_match(list(checked_off) + extras_list, limit)
+
+
+# --- Changes ------------------------------------------------------------------------------
+# Each change updates the model, the grocery engine and the category cache, records the operation with the storage backend, and marks the data dirty.
+
+def select_week(day=None, household=None):
+    # Show another week (the one containing day) and/or household. The grocery list is rebuilt for it.
+    global current_household, current_week
+    current_household = household or current_household
+    current_week = week_start(day or current_week)
+    grocery.rebuild(week_meals(), saved_recipes)
+    grocery_changes.show(current_household, current_week.isoformat())
+    _grocery_changed()
+    events.emit("week_selected")
+
+
+def _uses(name):
+    # How many slots of the current week are planned with this meal.
+    return sum(1 for meal in week_meals() if meal == name)
+
+
+def _slot_changed(household, day, slot, old_meal, meal_name):
+    active = in_active_week(household, day)
+    if active:
+        grocery.set_slot(old_meal, meal_name, saved_recipes)
+        _grocery_changed()
+    events.emit("slot_set", household=household, date=day, slot=slot, old=old_meal, new=meal_name, active=active)
+
+
+def set_meal(day, slot, meal_name, household=None):
+    # Plan meal_name (None to empty the slot) for a date; household defaults to the current one.
+    household = household or current_household
+    old_meal = plan.set(household, day, slot, meal_name)
+    storage.record("plan_set", household=household, date=day.isoformat(), slot=slot, value=meal_name)
+    _slot_changed(household, day, slot, old_meal, meal_name)
+    save_data()
+
+
+def clear_meal_plan(start=None, end=None, household=None):
+    # Empty every slot with start <= date < end; by default the current week.
+    household = household or current_household
+    start = start or current_week
+    end = end or start + timedelta(days=7)
+    removed = plan.clear_range(household, start, end)
+    storage.record("plan_clear", household=household, start=start.isoformat(), end=end.isoformat())
+    for day, slot, meal_name in removed:
+        _slot_changed(household, day, slot, meal_name, None)
+    save_data()
+
+
+def mark_exported():
+    # The current grocery list was handed to the shopper; later changes are reported against it.
+    exported = {"at": datetime.now().isoformat(sep=" ", timespec="minutes"), "household": current_household, "week": current_week.isoformat()}
+    data.last_export = grocery_changes.baseline(exported)
+    grocery_changes.mark_exported(exported)
+    storage.record("mark_exported", baseline=data.last_export)
+    save_data()
+
+
+def add_slot_type(slot):
+    # A new kind of meal slot (e.g. "Snack"), offered for every day from now on.
+    if slot in plan.slot_types:
+        return
+    plan.add_slot_type(slot)
+    storage.record("add_slot_type", slot=slot)
+    events.emit("slot_types_changed")
+    save_data()
+
+
+def set_recipe(name, ingredients):
+    # Add a recipe, or replace the ingredient list of an existing one.
+    _set_recipe(name, ingredients, _uses(name))
+    save_data()
+
+
+def set_recipes(recipes):
+    # set_recipe for many (name, ingredients) pairs, e.g. a bulk import: the week's meals are counted once, not per recipe.
+    uses = Counter(week_meals())
+    for name, ingredients in recipes:
+        _set_recipe(name, ingredients, uses[name])
+    save_data()
+
+
+def _set_recipe(name, ingredients, uses):
+    recipe = Recipe(name, ingredients)
+    old = saved_recipes.get(name)
+    if old is None:
+        _recipe_names_changed()
+    grocery.update_recipe(old.ids if old is not None else (), recipe.ids, uses)
+    saved_recipes[name] = recipe
+    recipe_index.set(name, recipe)
+    storage.record("set_recipe", name=name, ingredients=list(ingredients))
+    _grocery_changed()
+    events.emit("recipe_changed", name=name, old=len(old) if old is not None else None, new=len(recipe))
+
+
+def add_ingredient(recipe, ingredient):
+    saved_recipes[recipe].append(ingredient)
+    grocery.update_recipe((), (saved_recipes[recipe].ids[-1],), _uses(recipe))
+    recipe_index.set(recipe, saved_recipes[recipe])
+    storage.record("add_ingredient", recipe=recipe, ingredient=ingredient)
+    _grocery_changed()
+    events.emit("recipe_changed", name=recipe, old=len(saved_recipes[recipe]) - 1, new=len(saved_recipes[recipe]))
+    save_data()
+
+
+def remove_ingredient(recipe, index):
+    grocery.update_recipe((saved_recipes[recipe].ids[index],), (), _uses(recipe))
+    removed = saved_recipes[recipe].pop(index)
+    recipe_index.set(recipe, saved_recipes[recipe])
+    storage.record("remove_ingredient", recipe=recipe, index=index)
+    _grocery_changed()
+    events.emit("recipe_changed", name=recipe, old=len(saved_recipes[recipe]) + 1, new=len(saved_recipes[recipe]))
+    save_data()
+    return removed
+
+
+def rename_recipe(old_name, new_name):
+    saved_recipes[new_name] = saved_recipes.pop(old_name)
+    grocery.update_recipe(saved_recipes[new_name].ids, (), _uses(old_name))
+    grocery.update_recipe((), saved_recipes[new_name].ids, _uses(new_name))
+    recipe_index.rename(old_name, new_name)
+    _recipe_names_changed()
+    storage.record("rename_recipe", old=old_name, new=new_name)
+    _grocery_changed()
+    events.emit("recipe_renamed", old=old_name, new=new_name, size=len(saved_recipes[new_name]))
+    save_data()
+
+
+def delete_recipe(name):
+    recipe = saved_recipes.pop(name)
+    grocery.update_recipe(recipe.ids, (), _uses(name))
+    recipe_index.delete(name)
+    _recipe_names_changed()
+    storage.record("delete_recipe", name=name)
+    _grocery_changed()
+    events.emit("recipe_changed", name=name, old=len(recipe), new=None)
+    save_data()
+
+
+def add_extra(item):
+    extras_list.append(item)
+    storage.record("add_extra", item=item)
+    _grocery_changed()
+    events.emit("extra_added", item=item)
+    save_data()
+
+
+def remove_extra(index):
+    removed = extras_list.pop(index)
+    storage.record("remove_extra", index=index)
+    _grocery_changed()
+    events.emit("extra_removed", item=removed)
+    save_data()
+    return removed
+
+
+def check(items):
+    # Check off several items with a single record and a single save.
+    items = [item for item in items if item not in checked_off]
+    if not items:
+        return
+    checked_off.update(dict.fromkeys(items))
+    storage.record("check", items=items)
+    events.emit("checked", items=items)
+    save_data()
+
+
+def uncheck(items):
+    items = [item for item in items if item in checked_off]
+    if not items:
+        return
+    for item in items:
+        del checked_off[item]
+    storage.record("uncheck", items=items)
+    events.emit("unchecked", items=items)
+    save_data()
+
+
+def toggle_checked(item):
+    # Returns True if the item is now checked off.
+    if item in checked_off:
+        uncheck([item])
+        return False
+    check([item])
+    return True
+
+
+def clear_checked():
+    checked_off.clear()
+    storage.record("clear_checked")
+    events.emit("checks_cleared")
+    save_data()
+
+
+def set_override(ingredient, category):
+    # Overrides apply to the canonical name, so they cover every spelling of the ingredient.
+    ingredient = canonical_name(ingredient)
+    category_overrides[ingredient] = category
+    category_cache.invalidate(ingredient)
+    grocery.recategorize(ingredient)
+    storage.record("set_override", ingredient=ingredient, category=category)
+    _grocery_changed()
+    events.emit("override_set", ingredient=ingredient, category=category)
+    save_data()
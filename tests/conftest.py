@@ -0,0 +1,4 @@
+import os
+import sys
+# The modules live in the repository root (python main.py / python app.py); make them importable from the tests.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,51 @@
+from grocery import GroceryList
+from grocery_diff import GroceryDiff
+from ingredients import Recipe
+
+RECIPES = {"Tacos": Recipe("Tacos", ["1 lb ground beef", "8 tortillas", "1 head lettuce"]),
+           "Omelette": Recipe("Omelette", ["3 eggs", "1 cup milk"])}
+EXPORT = {"at": "2024-05-13 09:00", "household": "Home", "week": "2024-05-13"}
+
+
+def make_diff(meals):
+    grocery = GroceryList(lambda names: ["Other"] * len(names))
+    diff = GroceryDiff(grocery, [])
+    grocery.rebuild(meals, RECIPES)
+    diff.show("Home", "2024-05-13")
+    diff.mark_exported(EXPORT)
+    return grocery, diff
+
+
+def show_week(grocery, diff, meals, week, household="Home"):
+    # What store.select_week does.
+    grocery.rebuild(meals, RECIPES)
+    diff.show(household, week)
+
+
+def test_another_week_has_no_changes_against_the_export():
+    grocery, diff = make_diff(["Tacos"])
+    show_week(grocery, diff, ["Omelette"], "2024-05-20")
+    assert diff.changes() is None
+    show_week(grocery, diff, ["Tacos"], "2024-05-13", household="Cabin")
+    assert diff.changes() is None
+
+
+def test_switching_weeks_and_back_reports_nothing():
+    grocery, diff = make_diff(["Tacos"])
+    show_week(grocery, diff, ["Omelette"], "2024-05-20")
+    show_week(grocery, diff, ["Tacos"], "2024-05-13")
+    assert diff.changes() == []
+
+
+def test_changes_made_while_away_show_up_on_return():
+    grocery, diff = make_diff(["Tacos"])
+    show_week(grocery, diff, ["Omelette"], "2024-05-20")
+    show_week(grocery, diff, ["Tacos", "Omelette"], "2024-05-13")
+    assert [(change.kind, change.name) for change in diff.changes()] == [("+", "Egg"), ("+", "Milk")]
+
+
+def test_changes_on_the_exported_week_are_tracked():
+    grocery, diff = make_diff(["Tacos"])
+    grocery.set_slot("Tacos", "Omelette", RECIPES)
+    assert sorted((change.kind, change.name) for change in diff.changes()) == [
+        ("+", "Egg"), ("+", "Milk"), ("-", "Ground Beef"), ("-", "Lettuce"), ("-", "Tortilla")]
@@ -0,0 +1,32 @@
+from store import migrate
+
+V2_DATA = {
+    "schema_version": 2,
+    "recipes": {"Pancakes": ["Batter", "Butter"], "Pasta Bake": ["Pasta", "Tomato Paste", "Paste"]},
+    "meal_plan": {},
+    "extras": ["Beach Towel"],
+    "checked_off": ["Paste", "Pasta", "Batter", "Beach Towel"],
+    "category_overrides": {"Paste": "Baking", "Pasta": "Grains & Pasta", "Batter": "Baking", "Butter": "Dairy",
+                           "Beacon": "Other", "Bacon": "Meat & Protein", "Brine": "Spices & Condiments", "Brie": "Dairy"},
+}
+# Overrides and checked-off items whose names are one edit away from another ingredient's.
+
+
+def test_overrides_with_near_names_survive():
+    assert migrate(V2_DATA)["category_overrides"] == V2_DATA["category_overrides"]
+
+
+def test_checked_off_near_names_stay_separate():
+    assert migrate(V2_DATA)["checked_off"] == ["Paste", "Pasta", "Batter", "Beach Towel"]
+
+
+def test_overrides_and_checked_off_move_to_canonical_names():
+    data = migrate({**V2_DATA, "category_overrides": {"2 bananas": "Snacks", "Onions": "Produce"}, "checked_off": ["Bananas", "Beach Towels"],
+                    "extras": ["Beach Towels"]})
+    assert data["category_overrides"] == {"Banana": "Snacks", "Onion": "Produce"}
+    # An extra stays checked under the name it was entered with as well.
+    assert data["checked_off"] == ["Banana", "Beach Towels", "Beach Towel"]
+
+
+def test_v2_recipes_are_untouched():
+    assert migrate(V2_DATA)["recipes"] == V2_DATA["recipes"]
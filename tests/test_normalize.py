@@ -0,0 +1,65 @@
+import pytest
+from categories import get_category
+from grocery import GroceryList
+from ingredients import ingredient_table
+from normalize import ParsedIngredient, canonical_name, parse_ingredient
+
+NEAR_NAMES = [("Batter", "Butter"), ("Paste", "Pasta"), ("Brine", "Brie"), ("Stick", "Stock"), ("Beach", "Peach"), ("Beacon", "Bacon")]
+# Distinct ingredients one edit apart.
+
+
+@pytest.mark.parametrize("name, known", NEAR_NAMES)
+def test_near_names_stay_distinct(name, known):
+    assert canonical_name(name) == name
+    assert canonical_name(known) == known
+
+
+@pytest.mark.parametrize("name, known", NEAR_NAMES)
+def test_near_names_dont_take_the_known_category(name, known):
+    assert get_category(canonical_name(known)) != "Other"
+    assert get_category(canonical_name(name)) == "Other"
+
+
+@pytest.mark.parametrize("typo, category", [("Bannana", "Produce"), ("Bannanas", "Produce"), ("Zuchinni", "Produce")])
+def test_typos_keep_their_name_but_get_a_category(typo, category):
+    assert canonical_name(typo) == canonical_name(typo.lower())
+    assert canonical_name(typo) not in ("Banana", "Zucchini")
+    assert get_category(canonical_name(typo)) == category
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Turkey/Ground Beef", "Turkey/Ground Beef"),
+    ("turkey/ground beef", "Turkey/Ground Beef"),
+    ("Mac&Cheese", "Mac&Cheese"),
+    ("7-up", "7-Up"),
+    ("2 Half-And-Half Creamers", "Half-And-Half Creamer"),
+])
+def test_separators_keep_words_capitalized(text, expected):
+    assert canonical_name(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [("Bananas", "Banana"), ("2 onions", "Onion"), ("Cookies", "Cookie"), ("100%", "100%")])
+def test_plurals_and_quantities_merge(text, expected):
+    assert canonical_name(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1 head lettuce", ParsedIngredient(1.0, "head", "Lettuce")),
+    ("2 heads of garlic", ParsedIngredient(2.0, "head", "Garlic")),
+    ("3 stalks celery", ParsedIngredient(3.0, "stalk", "Celery")),
+    ("2 sprigs rosemary", ParsedIngredient(2.0, "sprig", "Rosemary")),
+    ("1 pinch salt", ParsedIngredient(1.0, "pinch", "Salt")),
+    ("1 stick butter", ParsedIngredient(1.0, "stick", "Butter")),
+    ("4 ears corn", ParsedIngredient(4.0, "ear", "Corn")),
+    ("1 jar salsa", ParsedIngredient(1.0, "jar", "Salsa")),
+    ("Lettuce", ParsedIngredient(None, None, "Lettuce")),
+])
+def test_count_units_are_parsed(text, expected):
+    assert parse_ingredient(text) == expected
+
+
+def test_heads_of_lettuce_add_up_with_lettuce():
+    grocery = GroceryList(lambda names: ["Produce"] * len(names))
+    grocery.add([ingredient_table.intern(text) for text in ["1 head lettuce", "Lettuce", "2 heads lettuce"]])
+    assert grocery.categorized() == [("Produce", ["Lettuce"])]
+    assert grocery.amount("Lettuce") == "3 head, plus 1 unmeasured"
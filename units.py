@@ -0,0 +1,84 @@
+# Units of measure for ingredient quantities. Every unit belongs to a dimension and has a size in that dimension's base
+# unit (grams for mass, millilitres for volume), so amounts written in different units can be added up. Units that
+# don't convert into anything else (cans, cloves, heads, sprigs, ...) are their own dimension; a bare number ("2 eggs") has
+# the unit "" and counts items.
+
+UNITS = {
+    # unit: (dimension, size in base units, spellings)
+    "g": ("mass", 1.0, ["g", "gram", "grams", "gr"]),
+    "kg": ("mass", 1000.0, ["kg", "kilogram", "kilograms", "kilo", "kilos"]),
+    "oz": ("mass", 28.3495, ["oz", "ounce", "ounces"]),
+    "lb": ("mass", 453.592, ["lb", "lbs", "pound", "pounds"]),
+    "ml": ("volume", 1.0, ["ml", "milliliter", "milliliters", "millilitre", "millilitres"]),
+    "l": ("volume", 1000.0, ["l", "liter", "liters", "litre", "litres"]),
+    "tsp": ("volume", 4.92892, ["tsp", "tsps", "teaspoon", "teaspoons"]),
+    "tbsp": ("volume", 14.7868, ["tbsp", "tbsps", "tbs", "tablespoon", "tablespoons"]),
+    "fl oz": ("volume", 29.5735, ["fl oz", "fluid ounce", "fluid ounces"]),
+    "cup": ("volume", 236.588, ["cup", "cups", "c"]),
+    "pint": ("volume", 473.176, ["pint", "pints", "pt"]),
+    "quart": ("volume", 946.353, ["quart", "quarts", "qt"]),
+    "gallon": ("volume", 3785.41, ["gallon", "gallons", "gal"]),
+    "pinch": ("volume", 0.31, ["pinch", "pinches"]),
+    "dash": ("volume", 0.62, ["dash", "dashes"]),
+    "can": ("can", 1.0, ["can", "cans"]),
+    "clove": ("clove", 1.0, ["clove", "cloves"]),
+    "slice": ("slice", 1.0, ["slice", "slices"]),
+    "piece": ("piece", 1.0, ["piece", "pieces", "pc", "pcs"]),
+    "scoop": ("scoop", 1.0, ["scoop", "scoops"]),
+    "package": ("package", 1.0, ["package", "packages", "pkg", "pack", "packs"]),
+    "bunch": ("bunch", 1.0, ["bunch", "bunches"]),
+    "handful": ("handful", 1.0, ["handful", "handfuls"]),
+    "head": ("head", 1.0, ["head", "heads"]),
+    "stalk": ("stalk", 1.0, ["stalk", "stalks"]),
+    "sprig": ("sprig", 1.0, ["sprig", "sprigs"]),
+    "stick": ("stick", 1.0, ["stick", "sticks"]),
+    "ear": ("ear", 1.0, ["ear", "ears"]),
+    "jar": ("jar", 1.0, ["jar", "jars"]),
+    "bottle": ("bottle", 1.0, ["bottle", "bottles"]),
+    "bag": ("bag", 1.0, ["bag", "bags"]),
+    "": ("count", 1.0, []),
+}
+
+BASE_UNITS = {"mass": [("kg", 1000.0), ("g", 1.0)], "volume": [("l", 1000.0), ("ml", 1.0)]}
+# Units used to show a sum of mixed units, largest first; the first one the total reaches is used.
+
+ALIASES = {spelling: unit for unit, (_, _, spellings) in UNITS.items() for spelling in spellings}
+
+
+def dimension(unit):
+    return UNITS[unit][0]
+
+
+def to_base(amount, unit):
+    return amount * UNITS[unit][1]
+
+
+def format_number(amount):
+    # At most two decimals, no trailing zeros: 2, 0.5, 1.33.
+    return f"{amount:.2f}".rstrip("0").rstrip(".")
+
+
+def format_amount(amount, unit):
+    if unit == "":
+        return format_number(amount)
+    return f"{format_number(amount)} {unit}"
+
+
+def format_total(amounts):
+    # amounts maps unit -> summed amount for one ingredient. Units of the same dimension are added up; a dimension
+    # written in a single unit keeps that unit ("3 cup"), mixed ones are shown in grams or millilitres (or kg/l).
+    by_dimension = {}
+    for unit, amount in amounts.items():
+        by_dimension.setdefault(dimension(unit), {})[unit] = amount
+    parts = []
+    for dim, units in sorted(by_dimension.items()):
+        if len(units) == 1:
+            (unit, amount), = units.items()
+            parts.append(format_amount(amount, unit))
+            continue
+        total = sum(to_base(amount, unit) for unit, amount in units.items())
+        for unit, size in BASE_UNITS[dim]:
+            if total >= size or size == 1.0:
+                parts.append(format_amount(total / size, unit))
+                break
+    return " + ".join(parts)
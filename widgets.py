@@ -0,0 +1,181 @@
+import tkinter as tk
+# Reusable Tk building blocks for app.py.
+
+
+class SearchList:
+    # A search Entry driving a Listbox of names from a shared NameIndex (name_index.py).
+    # Keystrokes are debounced, so a burst of typing runs one search, and the Listbox is updated by diffing the shown
+    # rows against the new result: rows that stay are left alone (keeping the selection), the rest are deleted or
+    # inserted in contiguous runs.
+
+    def __init__(self, search_var, listbox, index, delay=150):
+        # index is a callable returning the current NameIndex, so the owner can rebuild it when the names change.
+        self.search_var = search_var
+        self.listbox = listbox
+        self.index = index
+        self.delay = delay
+        self.shown = []
+        # Positions (in the index's sorted names) of the rows currently in the Listbox.
+        self.timer = None
+        self.names = None
+        search_var.trace_add("write", self._on_write)
+        self.refresh()
+
+    def _on_write(self, *args):
+        if self.timer is not None:
+            self.listbox.after_cancel(self.timer)
+        self.timer = self.listbox.after(self.delay, self.refresh)
+
+    def refresh(self):
+        # Run the current query now and bring the Listbox up to date.
+        self.timer = None
+        index = self.index()
+        if index.names is not self.names:
+            # The names were rebuilt, so the old positions mean nothing; start over.
+            self.listbox.delete(0, tk.END)
+            self.shown = []
+            self.names = index.names
+        self._show(index.search(self.search_var.get()))
+
+    def _show(self, positions):
+        listbox, names = self.listbox, self.names
+        keep = set(positions)
+        # Delete rows that are no longer wanted, bottom up so the row numbers above stay valid.
+        end = len(self.shown)
+        while end > 0:
+            if self.shown[end - 1] in keep:
+                end -= 1
+                continue
+            start = end - 1
+            while start > 0 and self.shown[start - 1] not in keep:
+                start -= 1
+            listbox.delete(start, end - 1)
+            end = start
+        # Insert the missing ones top down, each run at its final row.
+        shown = set(self.shown)
+        row = 0
+        while row < len(positions):
+            if positions[row] in shown:
+                row += 1
+                continue
+            start = row
+            while row < len(positions) and positions[row] not in shown:
+                row += 1
+            listbox.insert(start, *[names[position] for position in positions[start:row]])
+        self.shown = positions
+
+    def selected(self):
+        selection = self.listbox.curselection()
+        return self.listbox.get(selection[0]) if selection else None
+
+    def cancel(self):
+        if self.timer is not None:
+            self.listbox.after_cancel(self.timer)
+            self.timer = None
+
+
+class VirtualList:
+    # A scrollable list of text rows drawn with a fixed pool of Labels, however long the list is. Showing new items
+    # (or scrolling) only reconfigures the Labels whose text or style actually changes; no widget is created or destroyed.
+
+    def __init__(self, parent, rows, make_label, format=str, pady=0, style=None, styles=None, on_click=None):
+        # make_label(parent) creates one pooled Label; format turns an item into its row text. Optionally style(item)
+        # names an entry of styles (Label options such as font and colours) and on_click(index) handles a click on a row.
+        self.format = format
+        self.style = style
+        self.styles = styles or {}
+        self.on_click = on_click
+        self.items = []
+        self.offset = 0
+        self.shown = [("", None)] * rows
+        self.scrollbar = tk.Scrollbar(parent, command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.labels = [make_label(parent) for _ in range(rows)]
+        for row, label in enumerate(self.labels):
+            label.pack(anchor="w", fill="x", pady=pady)
+            label.bind("<MouseWheel>", self._on_wheel)
+            label.bind("<Button-4>", lambda event: self.scroll(-1))
+            label.bind("<Button-5>", lambda event: self.scroll(1))
+            if on_click is not None:
+                label.bind("<Button-1>", lambda event, row=row: self._on_row_click(row))
+
+    def set_items(self, items):
+        # Show a new list. The scroll position is kept where possible, so refreshing a list doesn't jump back to the top.
+        self.items = list(items)
+        self.offset = max(0, min(self.offset, len(self.items) - len(self.labels)))
+        self._render()
+
+    def refresh(self):
+        # Redraw after items changed in place, without a new list; only rows whose text or style differ are touched.
+        self._render()
+
+    def refresh_item(self, index):
+        # Redraw a single item after it changed in place (e.g. checked off); a no-op when it is scrolled out of view.
+        row = index - self.offset
+        if 0 <= row < len(self.labels):
+            self._render_row(row)
+
+    def scroll(self, rows):
+        self.scroll_to(self.offset + rows)
+
+    def scroll_to(self, offset):
+        offset = max(0, min(offset, len(self.items) - len(self.labels)))
+        if offset != self.offset:
+            self.offset = offset
+            self._render()
+
+    def _render(self):
+        for row in range(len(self.labels)):
+            self._render_row(row)
+        if self.items:
+            self.scrollbar.set(self.offset / len(self.items), min(1.0, (self.offset + len(self.labels)) / len(self.items)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _render_row(self, row):
+        index = self.offset + row
+        if index < len(self.items):
+            item = self.items[index]
+            shown = (self.format(item), self.style(item) if self.style is not None else None)
+        else:
+            shown = ("", None)
+        if shown != self.shown[row]:
+            text, style = shown
+            self.labels[row].configure(text=text, **self.styles.get(style, {}))
+            self.shown[row] = shown
+
+    def _on_row_click(self, row):
+        if self.offset + row < len(self.items):
+            self.on_click(self.offset + row)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(round(float(amount) * len(self.items)))
+        elif action == "scroll":
+            self.scroll(int(amount) * (len(self.labels) if unit == "pages" else 1))
+
+    def _on_wheel(self, event):
+        self.scroll(-1 if event.delta > 0 else 1)
+
+
+class CellGrid:
+    # A fixed grid of widgets (one per cell key) whose text follows a set of values. update() compares each value
+    # with what its cell last showed and reconfigures only the cells that differ.
+
+    def __init__(self):
+        self.cells = {}
+        self.texts = {}
+
+    def add(self, key, widget, text):
+        self.cells[key] = widget
+        self.texts[key] = text
+
+    def update(self, texts):
+        # texts maps cell key -> text; keys not given are left alone. Returns how many cells changed.
+        changed = 0
+        for key, text in texts.items():
+            if self.texts[key] != text:
+                self.cells[key].configure(text=text)
+                self.texts[key] = text
+                changed += 1
+        return changed